@@ -0,0 +1,81 @@
+import pandas as pd
+
+from run_events import tag_phases
+
+# memory measures of the worker samples, see in-situ/memory.py
+MEASURES = ["process", "managed", "unmanaged", "spilled"]
+
+
+def load_worker_memory(exp_dir: str) -> pd.DataFrame:
+    """
+    Memory samples of every worker written by the analytics of a run (worker_memory.csv).
+    """
+    return pd.read_csv(f"{exp_dir}/worker_memory.csv")
+
+
+def tag_memory_phases(samples: pd.DataFrame, phases: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds to the memory samples of a run the analytics phase running at their time, e.g.
+    "persist" or "compute:fourier", "none" between the phases.
+
+    Arguments:
+        samples (pd.DataFrame): Memory samples of a run, see load_worker_memory.
+        phases (pd.DataFrame): Phases of the run, see run_events.phase_spans.
+    """
+    phase = tag_phases(samples["unix_time"], phases[phases["source"] == "analytics"])
+    return samples.assign(phase=phase.fillna("none"))
+
+
+def phase_memory(samples: pd.DataFrame, measure: str = "process") -> pd.DataFrame:
+    """
+    Memory of every worker in every phase, in order of the phases: at the start, peak, lowest and
+    at the end of the phase.
+
+    Arguments:
+        samples (pd.DataFrame): Memory samples of a run, tagged with tag_memory_phases.
+        measure (str): Memory measure, see MEASURES.
+    """
+    samples = samples.sort_values("unix_time")
+    memory = samples.groupby(["worker", "phase"], sort=False).agg(
+        phase_start=("unix_time", "min"),
+        start=(measure, "first"),
+        peak=(measure, "max"),
+        low=(measure, "min"),
+        end=(measure, "last"),
+    )
+    return memory.reset_index().sort_values(["worker", "phase_start"]).reset_index(drop=True)
+
+
+def retained_memory(samples: pd.DataFrame, measure: str = "managed", tolerance: float = 0.1) -> pd.DataFrame:
+    """
+    Flags the workers whose memory never comes back down between the analytics phases: the lowest
+    memory of each phase is never below the one of the previous phase, and the lowest memory of
+    the last phase is more than tolerance of the memory limit above the one of the first phase.
+    Managed memory retained like this is e.g. a persisted array that is never released.
+
+    Returns one row per worker, with the lowest memory of the first and last phases, the retained
+    memory and the leak flag.
+
+    Arguments:
+        samples (pd.DataFrame): Memory samples of a run, tagged with tag_memory_phases.
+        measure (str): Memory measure, see MEASURES.
+        tolerance (float): Fraction of the memory limit of the worker.
+    """
+    samples = samples[samples["phase"] != "none"]
+    memory = phase_memory(samples, measure)
+    limits = samples.groupby("worker")["memory_limit"].max()
+
+    rows = []
+    for worker, phases in memory.groupby("worker", sort=False):
+        lows = phases["low"].to_numpy()
+        retained = lows[-1] - lows[0]
+        rows.append({
+            "worker": worker,
+            "phases": len(phases),
+            "first_low": lows[0],
+            "last_low": lows[-1],
+            "retained": retained,
+            "leak": len(phases) > 1 and bool((lows[1:] >= lows[:-1]).all())
+                    and retained > tolerance * limits[worker],
+        })
+    return pd.DataFrame(rows)
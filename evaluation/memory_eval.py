@@ -1,45 +1,24 @@
-import glob
-import pandas as pd
 from matplotlib import pyplot as plt
-import glob
 
+from results_store import ingest, select, load
+from memory_analysis import MEASURES, tag_memory_phases, phase_memory, retained_memory
 
-experiment_ids = ['weak_1748729080']
 
-# Find all directories that match the experiment IDs
-experiment_dirs = []
-for _dir in experiment_ids:
-    experiment_dirs.extend(glob.glob(f"../experiment_result/*{_dir}*"))
-print(f"Found experiment directories: {experiment_dirs}")
+# Index the new runs, then read the monitor samples of the selected runs from the store
+ingest()
+exec_ids = select(name="weak_1748729080")
+print(f"Found experiments: {exec_ids}")
 
-monitor_df = pd.DataFrame()
-
-# Loop through each experiment directory and extract the required information to fill the DataFrame
-for d in experiment_dirs:
-    exec_id = d.split("/")[-1]
-    name = d.split("/")[-1].split(":")[0]
-    total_nodes = int(d.split("/")[-1].split(":")[1])
-    mpi_processes = int(d.split("/")[-1].split(":")[2])
-    problem_size = int(d.split("/")[-1].split(":")[3])
-
-    res_file = f"../experiment_result/{d}/analytics.e"
-    
-
-    monitor_files = glob.glob(f"{d}/monitor*")
-    for m_file in monitor_files:
-        new_df = pd.read_csv(m_file)
-        new_df["exec_id"] = exec_id
-        new_df["type"] = m_file.split("/")[-1].split("_")[1]  # Extract type from filename
-        monitor_df = pd.concat([monitor_df, new_df], ignore_index=True)
-    
+df = load("runs", exec_ids)
+monitor_df = load("monitor", exec_ids)
+worker_memory_df = load("worker_memory", exec_ids)
+phases_df = load("phases", exec_ids)
 
 
 # Plotting the results
 
 
-monitor_df["mpi_processes"] = monitor_df["exec_id"].apply(
-    lambda x: int(x.split(":")[2])
-)
+monitor_df["mpi_processes"] = monitor_df["exec_id"].map(df.set_index("exec_id")["mpi_processes"])
 for mpi_p in monitor_df["mpi_processes"].unique():
     sub_df = monitor_df[monitor_df["mpi_processes"] == mpi_p]
     
@@ -85,3 +64,37 @@ for mpi_p in monitor_df["mpi_processes"].unique():
     
     plt.savefig(f"imgs/memory_vs_time_{mpi_p}.png")
         
+
+
+# Memory of every Dask worker per analytics phase, and the workers that never release it
+for exec_id, samples in worker_memory_df.groupby("exec_id"):
+    samples = tag_memory_phases(samples, phases_df[phases_df["exec_id"] == exec_id])
+    name = exec_id.replace(":", "_")
+
+    print(f"[{exec_id}] Managed memory per phase:")
+    print(phase_memory(samples, "managed").to_string(index=False))
+    retained = retained_memory(samples)
+    print(f"[{exec_id}] Workers retaining managed memory across the phases:")
+    print(retained[retained["leak"]].to_string(index=False))
+
+    # Managed, unmanaged and spilled memory vs time, summed over the workers, with the phases
+    plt.figure(figsize=(10, 6))
+    totals = samples.groupby("unix_time")[MEASURES[1:]].sum() / 1e9
+    plt.stackplot(totals.index, *[totals[measure] for measure in MEASURES[1:]], labels=MEASURES[1:])
+    for phase, phase_df in samples[samples["phase"] != "none"].groupby("phase"):
+        plt.axvspan(phase_df["unix_time"].min(), phase_df["unix_time"].max(), alpha=0.1)
+        plt.text(phase_df["unix_time"].min(), totals.to_numpy().sum(axis=1).max(), phase, rotation=90,
+                 va="top", fontsize="small")
+    plt.xlabel("Time (seconds)")
+    plt.ylabel("Memory (GB)")
+    plt.legend()
+    plt.savefig(f"imgs/worker_memory_vs_time_{name}.png")
+
+    # Managed memory vs time for each worker
+    plt.figure(figsize=(10, 6))
+    for worker, plt_df in samples.groupby("worker"):
+        plt.plot(plt_df["unix_time"], plt_df["managed"] / 1e9, label=worker)
+    plt.xlabel("Time (seconds)")
+    plt.ylabel("Managed Memory (GB)")
+    plt.legend(fontsize="small")
+    plt.savefig(f"imgs/worker_managed_vs_time_{name}.png")
@@ -0,0 +1,78 @@
+import pandas as pd
+from matplotlib import pyplot as plt
+
+from results_store import ingest, select, load
+from run_events import tag_phases, tag_steps
+
+
+# Index the new runs, then read the network samples and phases of the selected runs from the store
+ingest()
+exec_ids = select(name="strong_*", mpi_processes=(1, 32))
+print(f"Found experiments: {exec_ids}")
+
+df = load("runs", exec_ids)
+nics_df = load("nics", exec_ids)
+phases_df = load("phases", exec_ids)
+
+# Bytes moved by each interface between two samples, tagged with the phases of the launcher and of
+# the analytics running in the middle of the interval. The loopback carries the traffic between
+# the processes of a node, e.g. the bridges and the workers of the shared placement.
+nics_df = nics_df.sort_values(["exec_id", "hostname", "nic", "unix_time"])
+by_nic = nics_df.groupby(["exec_id", "hostname", "nic"])
+for column in ["bytes_sent", "bytes_recv", "packets_sent", "packets_recv"]:
+    nics_df[column] = by_nic[column].diff()
+nics_df["middle_time"] = nics_df["unix_time"] - by_nic["unix_time"].diff() / 2
+nics_df = nics_df.dropna(subset=["bytes_sent"])
+nics_df["loopback"] = nics_df["nic"] == "lo"
+
+tagged = []
+for exec_id, run_df in nics_df.groupby("exec_id"):
+    run_phases = phases_df[phases_df["exec_id"] == exec_id]
+    run_df = run_df.copy()
+    run_df["launcher_phase"] = tag_phases(run_df["middle_time"], run_phases[run_phases["source"] == "launcher"])
+    run_df["analytics_phase"] = tag_phases(run_df["middle_time"], run_phases[run_phases["source"] == "analytics"])
+    run_df["step"] = tag_steps(run_df["middle_time"], run_phases)
+    tagged.append(run_df)
+nics_df = pd.concat(tagged, ignore_index=True)
+nics_df[["launcher_phase", "analytics_phase"]] = nics_df[["launcher_phase", "analytics_phase"]].fillna("none")
+nics_df["mpi_processes"] = nics_df["exec_id"].map(df.set_index("exec_id")["mpi_processes"])
+
+# Bytes received by all the nodes in each phase. The analytics phases running during the simulation
+# phase of the launcher overlap the bridge ingestion, the ones after it only move data between workers.
+per_phase = nics_df.groupby(["mpi_processes", "loopback", "launcher_phase", "analytics_phase"])[
+    ["bytes_recv", "packets_recv"]].sum()
+print(per_phase.to_string())
+
+# Bytes received per timestep: measured on the streaming steps, and averaged over the simulation
+# phase of the launcher for the other modes.
+per_step = nics_df.dropna(subset=["step"]).groupby(["mpi_processes", "step"])["bytes_recv"].sum()
+if len(per_step):
+    print(per_step.groupby("mpi_processes").describe().to_string())
+simulation_bytes = nics_df[nics_df["launcher_phase"] == "simulation"].groupby("exec_id")["bytes_recv"].sum()
+df["simulation_bytes_per_step"] = df["exec_id"].map(simulation_bytes) / df["timesteps"]
+print(df[["exec_id", "mpi_processes", "timesteps", "simulation_bytes_per_step"]].to_string())
+
+
+# Plotting the results
+
+# Bytes received on the network per analytics phase, for each number of MPI processes
+network_df = nics_df[~nics_df["loopback"]]
+plot_df = network_df.groupby(["mpi_processes", "analytics_phase"])["bytes_recv"].sum().unstack(fill_value=0) / 1e9
+plot_df.plot(kind="bar", stacked=True, figsize=(10, 6))
+plt.grid(True, linestyle='--', alpha=0.7)
+plt.xlabel("Number of MPI Processes")
+plt.ylabel("Received (GB)")
+plt.savefig("imgs/strong_network_bytes_per_phase.png")
+
+# Received bandwidth vs time for each node
+for exec_id, run_df in network_df.groupby("exec_id"):
+    plt.figure(figsize=(10, 6))
+    for host, plt_df in run_df.groupby("hostname"):
+        plt_df = plt_df.groupby("unix_time")["bytes_recv"].sum()
+        interval = plt_df.index.to_series().diff()
+        plt.plot(plt_df.index, plt_df / interval / 1e6, label=host)
+    plt.xlabel("Time (seconds)")
+    plt.ylabel("Received (MB/s)")
+    plt.legend()
+    plt.savefig(f"imgs/network_recv_vs_time_{exec_id.replace(':', '_')}.png")
+    plt.close()
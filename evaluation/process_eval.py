@@ -0,0 +1,44 @@
+from matplotlib import pyplot as plt
+
+from results_store import ingest, select, load
+
+
+# Index the new runs, then read the process group samples of the selected runs from the store
+ingest()
+exec_ids = select(name="strong_*", mpi_processes=(1, 32))
+print(f"Found experiments: {exec_ids}")
+
+processes_df = load("processes", exec_ids)
+
+# Cores used by each group between two samples, from its cumulative cpu time. The cpu time of the
+# processes that ended is lost, so the negative differences are dropped.
+processes_df = processes_df.sort_values(["exec_id", "hostname", "group", "unix_time"])
+processes_df["cpu_time"] = processes_df["cpu_user"] + processes_df["cpu_system"]
+by_group = processes_df.groupby(["exec_id", "hostname", "group"])
+processes_df["cores"] = by_group["cpu_time"].diff() / by_group["unix_time"].diff()
+processes_df.loc[processes_df["cores"] < 0, "cores"] = float("nan")
+
+# Cpu time of each group over the whole run, on all the nodes
+cpu_time = by_group["cpu_time"].agg(lambda x: x.max() - x.min()).groupby(["exec_id", "group"]).sum()
+print(cpu_time.unstack("group"))
+
+
+# Plotting the results
+
+for exec_id in processes_df["exec_id"].unique():
+    sub_df = processes_df[(processes_df["exec_id"] == exec_id) & (processes_df["group"] != "node")]
+
+    for column, ylabel, scale in [("cores", "CPU Usage (cores)", 1), ("rss", "RSS (GB)", 1e9)]:
+        plt.figure(figsize=(10, 6))
+        for (host, group), plt_df in sub_df.groupby(["hostname", "group"]):
+            host_type = plt_df["type"].values[0]
+            plt.plot(
+                plt_df["unix_time"],
+                plt_df[column] / scale,
+                label=f"{host_type}_{host}_{group}",
+            )
+        plt.xlabel("Time (seconds)")
+        plt.ylabel(ylabel)
+        plt.legend()
+        plt.savefig(f"imgs/process_{column}_vs_time_{exec_id.replace(':', '_')}.png")
+        plt.close()
@@ -0,0 +1,330 @@
+import fnmatch
+import glob
+import json
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from run_events import load_events, analytics_times, grid_dims, process_stats, phase_spans, timesteps
+from transfer_analysis import load_transfers
+from task_analysis import load_task_stream, load_dependencies, task_table
+from memory_analysis import load_worker_memory
+
+RESULTS_DIR = "../experiment_result"
+STORE_DIR = f"{RESULTS_DIR}/results_store"
+
+# runs: one row per run. analytics: compute time of each analytics of a run.
+# monitor: node samples of the monitors of a run. processes: node and process group samples of
+# the monitors of a run, see experiment_code/monitor.py. nics: network interface samples of the
+# monitors of a run. phases: phases of the launcher and of the analytics, see run_events.phase_spans.
+# transfers: transfers between the Dask workers, see in-situ/transfers.py. tasks: tasks of the task
+# stream of the analytics, see task_analysis.task_table. task_dependencies: dependencies between them.
+# worker_memory: memory samples of every Dask worker, see in-situ/memory.py.
+TABLES = ("runs", "analytics", "monitor", "processes", "nics", "phases", "transfers", "tasks", "task_dependencies",
+          "worker_memory")
+
+# explicit schemas, so the part files of runs missing some fields can be read together
+SCHEMAS = {
+    "runs": pa.schema([
+        ("exec_id", pa.string()), ("name", pa.string()), ("launch_time", pa.float64()),
+        ("git_rev", pa.string()), ("backend", pa.string()), ("host_attributes", pa.string()),
+        ("total_nodes", pa.int64()), ("mpi_processes", pa.int64()), ("problem_size", pa.int64()),
+        ("omp_num_threads", pa.int64()), ("dask_workers_per_node", pa.int64()),
+        ("total_dask_workers", pa.int64()), ("nthreads", pa.int64()),
+        ("topology", pa.string()), ("placement", pa.string()), ("analytics", pa.string()),
+        ("deisa", pa.bool_()),
+        ("x_dim", pa.int64()), ("y_dim", pa.int64()), ("z_dim", pa.int64()), ("timesteps", pa.int64()),
+        ("analytics_start", pa.float64()), ("analytics_end", pa.float64()),
+        ("simulation_start", pa.float64()), ("simulation_end", pa.float64()),
+    ]),
+    "analytics": pa.schema([("exec_id", pa.string()), ("label", pa.string()), ("duration", pa.float64())]),
+    "monitor": pa.schema([
+        ("timestamp", pa.string()), ("unix_time", pa.float64()), ("hostname", pa.string()),
+        ("cpu_percent", pa.float64()), ("mem_percent", pa.float64()), ("exec_id", pa.string()), ("type", pa.string()),
+    ]),
+    "phases": pa.schema([
+        ("exec_id", pa.string()), ("source", pa.string()), ("host", pa.string()), ("phase", pa.string()),
+        ("label", pa.string()), ("step", pa.float64()), ("unix_start", pa.float64()), ("unix_end", pa.float64()),
+    ]),
+    "transfers": pa.schema([
+        ("exec_id", pa.string()), ("transfer", pa.int64()), ("direction", pa.string()), ("worker", pa.string()),
+        ("peer", pa.string()), ("start", pa.float64()), ("stop", pa.float64()), ("duration", pa.float64()),
+        ("total", pa.int64()), ("bandwidth", pa.float64()), ("prefix", pa.string()), ("step", pa.int64()),
+        ("nbytes", pa.int64()),
+    ]),
+    "tasks": pa.schema([
+        ("exec_id", pa.string()), ("key", pa.string()), ("prefix", pa.string()), ("worker", pa.string()),
+        ("thread", pa.float64()), ("nbytes", pa.float64()), ("start", pa.float64()), ("compute_start", pa.float64()),
+        ("stop", pa.float64()), ("compute", pa.float64()), ("transfer", pa.float64()), ("disk", pa.float64()),
+    ]),
+    "task_dependencies": pa.schema([("exec_id", pa.string()), ("key", pa.string()), ("dependency", pa.string())]),
+    "worker_memory": pa.schema([
+        ("exec_id", pa.string()), ("unix_time", pa.float64()), ("worker", pa.string()), ("process", pa.float64()),
+        ("managed", pa.float64()), ("unmanaged", pa.float64()), ("unmanaged_old", pa.float64()),
+        ("unmanaged_recent", pa.float64()), ("spilled", pa.float64()), ("memory_limit", pa.float64()),
+    ]),
+}
+
+
+def read_monitor(log_file: str) -> pd.DataFrame:
+    """
+    Samples written by a monitor, log_file being the path of its .bin and .json files without extension.
+    """
+    with open(log_file + ".json", "r") as f:
+        meta = json.load(f)
+    records = np.fromfile(log_file + ".bin", dtype=np.dtype([tuple(field) for field in meta["dtype"]]))
+    samples = pd.DataFrame(records)
+    samples["group"] = np.array(meta["groups"])[samples["group"]]
+    samples["hostname"] = meta["hostname"]
+    return samples
+
+
+def read_nics(log_file: str) -> pd.DataFrame:
+    """
+    Network interface samples written by a monitor, None for the monitors without them.
+    """
+    with open(log_file + ".json", "r") as f:
+        meta = json.load(f)
+    if "nics" not in meta or not os.path.exists(log_file + ".nic.bin"):
+        return None
+    records = np.fromfile(log_file + ".nic.bin", dtype=np.dtype([tuple(field) for field in meta["nic_dtype"]]))
+    samples = pd.DataFrame(records)
+    samples["nic"] = np.array(meta["nics"])[samples["nic"]]
+    samples["hostname"] = meta["hostname"]
+    return samples
+
+
+def _table_dir(table: str, store_dir: str) -> str:
+    return os.path.join(store_dir, table)
+
+
+def _part_file(table: str, exec_id: str, store_dir: str) -> str:
+    return os.path.join(_table_dir(table, store_dir), f"{exec_id}.parquet")
+
+
+def _run_record(d: str, exec_id: str) -> dict:
+    """
+    Launch parameters of a run, from its run.json (see experiment_code/catalog.py). The runs
+    launched before the catalog only have the name:nodes:mpi_np:problem_size of their directory.
+    """
+    if os.path.exists(f"{d}/run.json"):
+        with open(f"{d}/run.json", "r") as f:
+            record = json.load(f)
+        record["host_attributes"] = json.dumps(record.get("host_attributes"))
+        return record
+
+    name, nodes, mpi_np, problem_size = exec_id.split(":")[:4]
+    # the launchers suffix the names with the launch time
+    suffix = name.rsplit("_", 1)[-1]
+    return {"exec_id": exec_id, "name": name, "reserved_nodes": int(nodes), "mpi_np": int(mpi_np),
+            "problem_size": int(problem_size), "launch_time": float(suffix) if suffix.isdigit() else None}
+
+
+def _read_run(d: str) -> dict:
+    """
+    Tables of a single run directory.
+    """
+    exec_id = os.path.basename(os.path.normpath(d))
+    record = _run_record(d, exec_id)
+    events = load_events(d)
+
+    simulation_process = process_stats(d, "simulation", events)
+    has_analytics = os.path.exists(f"{d}/analytics.e")
+    if has_analytics:
+        x_dim, y_dim, z_dim = grid_dims(d, events)
+        times = analytics_times(d, events)
+        analytics_process = process_stats(d, "analytics", events)
+    else:
+        # runs without Deisa, e.g. run_experiment_no_deisa.py
+        x_dim = y_dim = z_dim = None
+        times = {}
+        analytics_process = {"start_date": None, "end_date": None}
+
+    run = {column: record.get(column) for column in SCHEMAS["runs"].names}
+    run.update({
+        "exec_id": exec_id,
+        "total_nodes": record.get("reserved_nodes"),
+        "mpi_processes": record.get("mpi_np"),
+        "deisa": has_analytics,
+        "x_dim": x_dim, "y_dim": y_dim, "z_dim": z_dim, "timesteps": timesteps(events),
+        "analytics_start": analytics_process["start_date"], "analytics_end": analytics_process["end_date"],
+        "simulation_start": simulation_process["start_date"], "simulation_end": simulation_process["end_date"],
+    })
+    if run["launch_time"] is None:
+        run["launch_time"] = run["simulation_start"]
+    runs = pd.DataFrame([run])
+    analytics = pd.DataFrame({"exec_id": exec_id, "label": list(times), "duration": list(times.values())},
+                             columns=["exec_id", "label", "duration"])
+
+    phases = phase_spans(events)
+    phases.insert(0, "exec_id", exec_id)
+
+    transfers = None
+    if os.path.exists(f"{d}/transfers.csv"):
+        transfers = load_transfers(d)
+        transfers.insert(0, "exec_id", exec_id)
+
+    tasks, task_dependencies = None, None
+    if os.path.exists(f"{d}/task_stream.csv"):
+        tasks = task_table(load_task_stream(d))
+        tasks.insert(0, "exec_id", exec_id)
+        task_dependencies = load_dependencies(d)
+        task_dependencies.insert(0, "exec_id", exec_id)
+
+    worker_memory = None
+    if os.path.exists(f"{d}/worker_memory.csv"):
+        worker_memory = load_worker_memory(d)
+        worker_memory.insert(0, "exec_id", exec_id)
+
+    monitor_dfs, processes_dfs, nics_dfs = [], [], []
+    for m_file in sorted(glob.glob(f"{d}/monitor_*")):
+        if m_file.endswith(".bin"):
+            continue
+        node_type = os.path.basename(m_file).split("_")[1]  # head or node
+        if m_file.endswith(".json"):
+            samples = read_monitor(m_file[:-len(".json")])
+            samples["exec_id"] = exec_id
+            samples["type"] = node_type
+            processes_dfs.append(samples)
+            nics = read_nics(m_file[:-len(".json")])
+            if nics is not None:
+                nics["exec_id"] = exec_id
+                nics["type"] = node_type
+                nics_dfs.append(nics)
+            # the node samples, in the columns of the CSV files of the first monitor
+            m_df = samples.loc[samples.group == "node", ["unix_time", "hostname", "cpu_percent", "mem_percent"]]
+            m_df.insert(0, "timestamp", pd.to_datetime(m_df.unix_time, unit="s").dt.strftime("%Y-%m-%d %H:%M:%S"))
+        else:
+            m_df = pd.read_csv(m_file)
+        m_df["exec_id"] = exec_id
+        m_df["type"] = node_type
+        monitor_dfs.append(m_df)
+    monitor = pd.concat(monitor_dfs, ignore_index=True) if monitor_dfs else None
+    processes = pd.concat(processes_dfs, ignore_index=True) if processes_dfs else None
+    nics = pd.concat(nics_dfs, ignore_index=True) if nics_dfs else None
+
+    return {"runs": runs, "analytics": analytics, "monitor": monitor, "processes": processes, "nics": nics,
+            "phases": phases, "transfers": transfers, "tasks": tasks, "task_dependencies": task_dependencies,
+            "worker_memory": worker_memory}
+
+
+def ingest(results_dir: str = RESULTS_DIR, store_dir: str = STORE_DIR) -> list:
+    """
+    Adds the run directories of results_dir that are not in the store yet. Each run is written as
+    one Parquet file per table, named after its exec_id, so the runs already ingested are skipped
+    without being read again. Returns the exec_ids of the new runs.
+
+    Arguments:
+        results_dir (str): Directory holding the run directories.
+        store_dir (str): Directory of the store.
+    """
+    for table in TABLES:
+        os.makedirs(_table_dir(table, store_dir), exist_ok=True)
+
+    ingested = []
+    # the run directories are named name:nodes:mpi_np:problem_size[...]
+    for d in sorted(glob.glob(f"{results_dir}/*:*/")):
+        exec_id = os.path.basename(os.path.normpath(d))
+        if os.path.exists(_part_file("runs", exec_id, store_dir)):
+            continue
+        try:
+            tables = _read_run(d)
+        except (FileNotFoundError, KeyError, IndexError, ValueError) as e:
+            # unfinished or failed run, retried at the next ingestion
+            print(f"Skipping {exec_id}: {e!r}")
+            continue
+
+        # the runs table is written last, so an interrupted ingestion of the run is redone
+        for table in [table for table in TABLES if table != "runs"] + ["runs"]:
+            if tables[table] is None:
+                continue
+            arrow_table = pa.Table.from_pandas(tables[table], schema=SCHEMAS.get(table), preserve_index=False)
+            pq.write_table(arrow_table, _part_file(table, exec_id, store_dir))
+        ingested.append(exec_id)
+
+    print(f"Ingested {len(ingested)} new runs into {store_dir}")
+    return ingested
+
+
+def load(table: str, exec_ids: list = None, store_dir: str = STORE_DIR) -> pd.DataFrame:
+    """
+    Reads a table of the store, restricted to the given runs.
+
+    Arguments:
+        table (str): Name of the table, see TABLES.
+        exec_ids (list, optional): Runs to read. If None, all the runs are read.
+        store_dir (str): Directory of the store.
+    """
+    if table not in TABLES:
+        raise ValueError(f"Unknown table {table}. Available: {list(TABLES)}")
+    if exec_ids is None:
+        files = sorted(glob.glob(os.path.join(_table_dir(table, store_dir), "*.parquet")))
+    else:
+        files = [_part_file(table, exec_id, store_dir) for exec_id in exec_ids]
+        files = [f for f in files if os.path.exists(f)]
+    if not files:
+        return pd.DataFrame()
+    # a single Arrow dataset read of all the part files, they share the schema of the table
+    return pq.read_table(files).to_pandas()
+
+
+def _to_unix_time(date) -> float:
+    if isinstance(date, (int, float)):
+        return float(date)
+    date = pd.Timestamp(date)
+    if date.tzinfo is None:
+        date = date.tz_localize("UTC")
+    return date.timestamp()
+
+
+def select(name: str = None, since=None, until=None, store_dir: str = STORE_DIR, **params) -> list:
+    """
+    exec_ids of the ingested runs matching all the given conditions, sorted by launch time.
+
+    Arguments:
+        name (str, optional): Name of the experiment or sweep, may contain shell wildcards, e.g. "strong_*".
+        since (optional): Runs launched at or after this date, unix time or date string (UTC if no timezone).
+        until (optional): Runs launched at or before this date.
+        store_dir (str): Directory of the store.
+        **params: Conditions on the columns of the runs table, e.g. mpi_processes=(4, 32) for a range,
+            placement=["shared", "dedicated"] for a set of values, or problem_size=0 for a value.
+    """
+    runs = load("runs", store_dir=store_dir)
+    if not len(runs):
+        return []
+    mask = pd.Series(True, index=runs.index)
+    if name is not None:
+        mask &= runs["name"].apply(lambda n: fnmatch.fnmatchcase(n, name))
+    if since is not None:
+        mask &= runs["launch_time"] >= _to_unix_time(since)
+    if until is not None:
+        mask &= runs["launch_time"] <= _to_unix_time(until)
+    for column, value in params.items():
+        if column not in runs:
+            raise ValueError(f"Unknown runs column {column}. Available: {list(runs.columns)}")
+        if isinstance(value, tuple):
+            low, high = value
+            mask &= runs[column].between(low, high)
+        elif isinstance(value, (list, set)):
+            mask &= runs[column].isin(value)
+        else:
+            mask &= runs[column] == value
+    return runs[mask].sort_values("launch_time").exec_id.tolist()
+
+
+def load_runs(exec_ids: list = None, store_dir: str = STORE_DIR) -> pd.DataFrame:
+    """
+    Runs table with one column per analytics label holding its compute time.
+    """
+    runs = load("runs", exec_ids, store_dir)
+    analytics = load("analytics", exec_ids, store_dir)
+    if len(analytics):
+        times = analytics.pivot_table(index="exec_id", columns="label", values="duration")
+        runs = runs.merge(times, left_on="exec_id", right_index=True, how="left")
+    return runs
+
+
+if __name__ == "__main__":
+    ingest()
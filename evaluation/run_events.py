@@ -0,0 +1,184 @@
+import glob
+import os
+import re
+import pandas as pd
+
+# process names of the events and of the legacy stats files
+STATS_FILES = {"simulation": "mpi_process_stats.txt", "analytics": "analytics_process_stats.txt"}
+
+
+def load_events(exp_dir: str) -> pd.DataFrame:
+    """
+    Events written by the launcher and the analytics of a run (events_*.jsonl), empty if the run
+    has no event log.
+
+    Arguments:
+        exp_dir (str): Directory of the run.
+    """
+    files = sorted(glob.glob(os.path.join(exp_dir, "events_*.jsonl")))
+    if not files:
+        return pd.DataFrame(columns=["source", "event"])
+    # no date conversion, unix_time would be parsed as a datetime because of its name
+    return pd.concat([pd.read_json(f, lines=True, convert_dates=False) for f in files], ignore_index=True)
+
+
+def _analytics_lines(exp_dir: str) -> list:
+    with open(os.path.join(exp_dir, "analytics.e"), "r") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def analytics_times(exp_dir: str, events: pd.DataFrame = None) -> dict:
+    """
+    Compute time in seconds of each analytics, by label (e.g. "ekin", "sum over xy", "fourier").
+    The batch runs compute all the outputs in a single call labelled "batch", the task compute
+    time of each output is under "task time <label>". These are summed over the worker threads,
+    not wall times, so they must not be added to the wall times.
+    Taken from the event log, or from the "[Analytics] time" lines of analytics.e for the runs
+    without one.
+
+    Arguments:
+        exp_dir (str): Directory of the run.
+        events (pd.DataFrame, optional): Events of the run, see load_events.
+    """
+    if events is None:
+        events = load_events(exp_dir)
+    computes = events[(events.source == "analytics") & (events.event == "compute")]
+    if len(computes):
+        task_times = events[events.event == "output_task_time"]
+        times = dict(zip(computes.label, computes.duration))
+        times.update(zip("task time " + task_times.label, task_times.duration))
+        return times
+
+    pattern = re.compile(r"\[Analytics\] time (.+): (\S+)$")
+    return {m.group(1): float(m.group(2)) for m in map(pattern.match, _analytics_lines(exp_dir)) if m}
+
+
+def grid_dims(exp_dir: str, events: pd.DataFrame = None) -> tuple:
+    """
+    (x_dim, y_dim, z_dim) of the global grid seen by the analytics.
+
+    Arguments:
+        exp_dir (str): Directory of the run.
+        events (pd.DataFrame, optional): Events of the run, see load_events.
+    """
+    if events is None:
+        events = load_events(exp_dir)
+    received = events[events.event == "arrays_received"]
+    if len(received):
+        row = received.iloc[0]
+        return int(row.x_dim), int(row.y_dim), int(row.z_dim)
+
+    dims = {}
+    for line in _analytics_lines(exp_dir):
+        m = re.match(r"\[Analytics\] ([XYZ])-dim = (\d+)", line)
+        if m:
+            dims[m.group(1)] = int(m.group(2))
+    return dims["X"], dims["Y"], dims["Z"]
+
+
+def timesteps(events: pd.DataFrame) -> int:
+    """
+    Number of timesteps received by the analytics, None for the runs without event log.
+
+    Arguments:
+        events (pd.DataFrame): Events of the run, see load_events.
+    """
+    received = events[events.event == "arrays_received"]
+    if len(received) and "timesteps" in received:
+        return int(received.iloc[0].timesteps)
+    return None
+
+
+def process_stats(exp_dir: str, process: str, events: pd.DataFrame = None) -> dict:
+    """
+    Stats of the simulation or analytics process of a run (start_date, end_date, ...). Taken from
+    the event log, or from the legacy *_process_stats.txt files for the runs without one.
+
+    Arguments:
+        exp_dir (str): Directory of the run.
+        process (str): simulation or analytics.
+        events (pd.DataFrame, optional): Events of the run, see load_events.
+    """
+    if events is None:
+        events = load_events(exp_dir)
+    if "process" in events:
+        stats = events[(events.event == "process_stats") & (events.process == process)]
+    else:
+        stats = events.iloc[:0]
+    if len(stats):
+        return stats.iloc[0]["stats"]
+
+    # the legacy files are the repr of the execo stats dict
+    with open(os.path.join(exp_dir, STATS_FILES[process]), "r") as f:
+        return eval(f.read())
+
+
+def phase_spans(events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Phases of a run, one row per phase event and per streaming step of the analytics, with their
+    unix start and end times.
+
+    Arguments:
+        events (pd.DataFrame): Events of the run, see load_events.
+    """
+    columns = ["source", "host", "phase", "label", "step", "unix_start", "unix_end"]
+    if "kind" not in events:
+        return pd.DataFrame(columns=columns)
+    spans = events[events.kind == "phase"]
+    rows = pd.DataFrame({
+        "source": spans.source,
+        "host": spans.host,
+        "phase": spans.event,
+        "label": spans["label"].astype(object).where(spans["label"].notna(), None) if "label" in spans else None,
+        "step": float("nan"),
+        "unix_start": spans.unix_start,
+        "unix_end": spans.unix_start + spans.duration,
+    }, columns=columns)
+
+    steps = events[events.event == "step"]
+    if len(steps):
+        rows = pd.concat([rows, pd.DataFrame({
+            "source": steps.source,
+            "host": steps.host,
+            "phase": "step",
+            "label": None,
+            "step": steps.step.astype(float),
+            "unix_start": steps.unix_time - steps.duration,
+            "unix_end": steps.unix_time,
+        }, columns=columns)], ignore_index=True)
+    return rows.reset_index(drop=True)
+
+
+def tag_phases(times: pd.Series, phases: pd.DataFrame) -> pd.Series:
+    """
+    Name of the innermost phase running at each unix time, "phase:label" for the labelled phases
+    (e.g. "compute:fourier"), None outside of the phases. The streaming steps are not phases, see
+    tag_steps.
+
+    Arguments:
+        times (pd.Series): Unix times, e.g. of monitor samples.
+        phases (pd.DataFrame): Phases of a single source of a run, see phase_spans.
+    """
+    tags = pd.Series(None, index=times.index, dtype=object)
+    spans = phases[phases.phase != "step"]
+    # the longest phases first, so the innermost phase covering a time is set last
+    spans = spans.assign(length=spans.unix_end - spans.unix_start).sort_values("length", ascending=False)
+    for span in spans.itertuples():
+        name = f"{span.phase}:{span.label}" if isinstance(span.label, str) else span.phase
+        tags[(times >= span.unix_start) & (times < span.unix_end)] = name
+    return tags
+
+
+def tag_steps(times: pd.Series, phases: pd.DataFrame) -> pd.Series:
+    """
+    Streaming step of the analytics running at each unix time, NaN outside of the steps. With
+    several steps in flight, the last started one is used.
+
+    Arguments:
+        times (pd.Series): Unix times, e.g. of monitor samples.
+        phases (pd.DataFrame): Phases of a run, see phase_spans.
+    """
+    tags = pd.Series(float("nan"), index=times.index)
+    for step in phases[phases.phase == "step"].sort_values("unix_start").itertuples():
+        tags[(times >= step.unix_start) & (times < step.unix_end)] = step.step
+    return tags
@@ -1,67 +1,18 @@
-import glob
-import pandas as pd
 from matplotlib import pyplot as plt
-import glob
-import numpy as np
 
+from results_store import ingest, select, load_runs
 
-experiment_ids_deisa = ['strong_1748863610:2:8:0','strong_1748863606:2:4:0','strong_1748863600:2:2:0',
-                        'strong_1748863539:2:1:0','strong_1748863616:2:16:0','strong_1748863691:2:32:0']
 
-experiment_ids_nodeisa = ['strong_nodeisa_1748866343:2:1:0','strong_nodeisa_1748866517:2:2:0',
-                          'strong_nodeisa_1748866533:2:4:0','strong_nodeisa_1748866541:2:8:0',
-                          'strong_nodeisa_1748866560:2:16:0','strong_nodeisa_1748866570:2:32:0']
-  
+# Index the new runs, then select the strong scaling runs with and without Deisa of 2025-06-02 from the store
+ingest()
+exec_ids_deisa = select(name="strong_[0-9]*", since="2025-06-02 11:25", until="2025-06-02 11:30",
+                        total_nodes=2, problem_size=0)
+print(f"Found experiments: {exec_ids_deisa}")
+exec_ids_nodeisa = select(name="strong_nodeisa_*", since="2025-06-02 12:12", until="2025-06-02 12:17",
+                          total_nodes=2, problem_size=0)
+print(f"Found experiments: {exec_ids_nodeisa}")
 
-# Find all directories that match the experiment IDs
-experiment_dirs_deisa = []
-for _dir in experiment_ids_deisa:
-    experiment_dirs_deisa.extend(glob.glob(f"../experiment_result/*{_dir}*"))
-print(f"Found experiment directories: {experiment_dirs_deisa}")
-
-experiment_dirs_nodeisa = []
-for _dir in experiment_ids_nodeisa:
-    experiment_dirs_nodeisa.extend(glob.glob(f"../experiment_result/*{_dir}*"))
-print(f"Found experiment directories: {experiment_dirs_nodeisa}")
-
-# Create a DataFrame to store the results
-df = pd.DataFrame(columns=["name", "exec_id", "total_nodes", "mpi_processes", "problem_size",  
-                           "simulation_start", "simulation_end","deisa"])
-
-monitor_df = pd.DataFrame()
-
-# Loop through each experiment directory and extract the required information to fill the DataFrame
-for d in experiment_dirs_deisa:
-    exec_id = d.split("/")[-1]
-    name = d.split("/")[-1].split(":")[0]
-    total_nodes = int(d.split("/")[-1].split(":")[1])
-    mpi_processes = int(d.split("/")[-1].split(":")[2])
-    problem_size = int(d.split("/")[-1].split(":")[3])
-
-    simulation_process_file = f"{d}/mpi_process_stats.txt"
-    with open(simulation_process_file, "r") as f:
-        simulation_process = eval(f.read())
-
-    df.loc[len(df)] = [
-        name, exec_id, total_nodes, mpi_processes, problem_size, 
-        simulation_process["start_date"], simulation_process["end_date"], True
-    ]
-    
-for d in experiment_dirs_nodeisa:
-    exec_id = d.split("/")[-1]
-    name = d.split("/")[-1].split(":")[0]
-    total_nodes = int(d.split("/")[-1].split(":")[1])
-    mpi_processes = int(d.split("/")[-1].split(":")[2])
-    problem_size = int(d.split("/")[-1].split(":")[3])
-
-    simulation_process_file = f"{d}/mpi_process_stats.txt"
-    with open(simulation_process_file, "r") as f:
-        simulation_process = eval(f.read())
-
-    df.loc[len(df)] = [
-        name, exec_id, total_nodes, mpi_processes, problem_size, 
-        simulation_process["start_date"], simulation_process["end_date"], False
-    ]
+df = load_runs(exec_ids_deisa + exec_ids_nodeisa)
 
 if df.duplicated(['mpi_processes','deisa']).any():
     raise ValueError("There are duplicate MPI processes in the DataFrame. Please check the experiment ids.")
@@ -0,0 +1,118 @@
+import pandas as pd
+
+
+def load_task_stream(exp_dir: str) -> pd.DataFrame:
+    """
+    Task stream rows written by the analytics of a run (task_stream.csv, see in-situ/task_stream.py).
+    """
+    return pd.read_csv(f"{exp_dir}/task_stream.csv", dtype={"key": str, "source": str})
+
+
+def load_dependencies(exp_dir: str) -> pd.DataFrame:
+    """
+    Task dependencies written by the analytics of a run (task_dependencies.csv).
+    """
+    return pd.read_csv(f"{exp_dir}/task_dependencies.csv", dtype=str)
+
+
+def task_table(rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per task of a run: start of its first action, start and stop of its compute, and time
+    spent computing, transferring its inputs and reading or writing to disk.
+
+    Arguments:
+        rows (pd.DataFrame): Task stream rows of a run, see load_task_stream.
+    """
+    rows = rows.assign(duration=rows["stop"] - rows["start"])
+    compute = rows[rows["action"] == "compute"]
+    tasks = rows.groupby("key").agg(prefix=("prefix", "first"), worker=("worker", "first"),
+                                    thread=("thread", "first"), nbytes=("nbytes", "first"),
+                                    start=("start", "min"))
+    tasks["compute_start"] = compute.groupby("key")["start"].min()
+    tasks["stop"] = compute.groupby("key")["stop"].max()
+    tasks["compute"] = compute.groupby("key")["duration"].sum()
+    tasks["transfer"] = rows[rows["action"] == "transfer"].groupby("key")["duration"].sum()
+    tasks["disk"] = rows[rows["action"].str.startswith("disk")].groupby("key")["duration"].sum()
+    tasks[["compute", "transfer", "disk"]] = tasks[["compute", "transfer", "disk"]].fillna(0)
+    return tasks.dropna(subset=["stop"]).reset_index()
+
+
+def add_wait(tasks: pd.DataFrame, dependencies: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds to the tasks the time their last dependency finished (ready) and the wait between then and
+    their first action (wait), the time spent queued on a busy worker. Tasks without dependency in
+    the stream wait 0.
+
+    Arguments:
+        tasks (pd.DataFrame): Tasks of a run, see task_table.
+        dependencies (pd.DataFrame): Task dependencies of the run, see load_dependencies.
+    """
+    stops = tasks.set_index("key")["stop"]
+    deps = dependencies[dependencies["dependency"].isin(stops.index)]
+    ready = deps.assign(stop=deps["dependency"].map(stops)).groupby("key")["stop"].max()
+    tasks = tasks.assign(ready=tasks["key"].map(ready))
+    tasks["wait"] = (tasks["start"] - tasks["ready"]).clip(lower=0).fillna(0)
+    return tasks
+
+
+def prefix_breakdown(tasks: pd.DataFrame) -> pd.DataFrame:
+    """
+    Number of tasks and total compute, transfer, disk and wait time of each task prefix, e.g.
+    rechunk-merge or fft2. The wait is only there if the tasks went through add_wait.
+    """
+    columns = [column for column in ["compute", "transfer", "disk", "wait"] if column in tasks]
+    breakdown = tasks.groupby("prefix")[columns].sum()
+    breakdown.insert(0, "tasks", tasks.groupby("prefix").size())
+    return breakdown.sort_values("compute", ascending=False)
+
+
+def worker_utilisation(tasks: pd.DataFrame) -> pd.DataFrame:
+    """
+    Time each worker spent computing, transferring and idle over the span of the run, and its
+    utilisation, the fraction of its thread time spent computing. The threads of a worker are the
+    ones seen in the task stream.
+    """
+    span = tasks["stop"].max() - tasks["start"].min()
+    workers = tasks.groupby("worker").agg(threads=("thread", "nunique"), tasks=("key", "size"),
+                                          compute=("compute", "sum"), transfer=("transfer", "sum"))
+    workers["span"] = span
+    workers["idle"] = (span * workers["threads"] - workers["compute"]).clip(lower=0)
+    workers["utilisation"] = workers["compute"] / (span * workers["threads"])
+    return workers
+
+
+def critical_path(tasks: pd.DataFrame, dependencies: pd.DataFrame) -> pd.DataFrame:
+    """
+    Critical path of the executed schedule: from the last task to finish, the chain of the
+    dependencies that finished last. Returns its tasks in execution order, with their wait.
+    The finalize tasks added by compute are not in the graphs of the collections and have no
+    recorded dependency, so the path starts from the last task with dependencies, if any.
+
+    Arguments:
+        tasks (pd.DataFrame): Tasks of a run, see task_table.
+        dependencies (pd.DataFrame): Task dependencies of the run, see load_dependencies.
+    """
+    tasks = add_wait(tasks, dependencies).set_index("key")
+    deps = dependencies[dependencies["dependency"].isin(tasks.index)]
+    deps = deps.assign(stop=deps["dependency"].map(tasks["stop"]))
+    # dependency of each task that finished last
+    last = deps.sort_values("stop").groupby("key")["dependency"].last()
+
+    ends = tasks[tasks.index.isin(last.index)]
+    path = [(ends if len(ends) else tasks)["stop"].idxmax()]
+    while path[-1] in last.index and last[path[-1]] not in path:
+        path.append(last[path[-1]])
+    return tasks.loc[path[::-1]].reset_index()
+
+
+def critical_path_summary(path: pd.DataFrame) -> dict:
+    """
+    Length of a critical path and its split between compute, transfer, disk and wait. The rest of
+    the length is spent between the tasks, in the scheduler.
+    """
+    length = path["stop"].iloc[-1] - path["start"].iloc[0]
+    summary = {"tasks": len(path), "length": length}
+    for column in ["compute", "transfer", "disk", "wait"]:
+        summary[column] = path[column].sum()
+    summary["scheduling"] = length - sum(summary[column] for column in ["compute", "transfer", "disk", "wait"])
+    return summary
@@ -0,0 +1,71 @@
+import pandas as pd
+from matplotlib import pyplot as plt
+
+from results_store import ingest, select, load
+from task_analysis import prefix_breakdown, worker_utilisation, critical_path, critical_path_summary, add_wait
+
+
+# Index the new runs, then read the tasks of the selected runs from the store
+ingest()
+exec_ids = select(name="strong_*", mpi_processes=(1, 32))
+print(f"Found experiments: {exec_ids}")
+
+df = load("runs", exec_ids)
+tasks_df = load("tasks", exec_ids)
+dependencies_df = load("task_dependencies", exec_ids)
+
+# Where the time went in each run
+summaries, breakdowns, utilisations = [], [], []
+for exec_id, tasks in tasks_df.groupby("exec_id"):
+    dependencies = dependencies_df[dependencies_df["exec_id"] == exec_id]
+    tasks = add_wait(tasks, dependencies)
+
+    summaries.append(dict(critical_path_summary(critical_path(tasks, dependencies)), exec_id=exec_id))
+    breakdowns.append(prefix_breakdown(tasks).assign(exec_id=exec_id).reset_index())
+    utilisations.append(worker_utilisation(tasks).assign(exec_id=exec_id).reset_index())
+
+mpi_processes = df.set_index("exec_id")["mpi_processes"]
+summary_df = pd.DataFrame(summaries)
+summary_df["mpi_processes"] = summary_df["exec_id"].map(mpi_processes)
+summary_df.sort_values("mpi_processes", inplace=True)
+breakdown_df = pd.concat(breakdowns, ignore_index=True)
+breakdown_df["mpi_processes"] = breakdown_df["exec_id"].map(mpi_processes)
+utilisation_df = pd.concat(utilisations, ignore_index=True)
+utilisation_df["mpi_processes"] = utilisation_df["exec_id"].map(mpi_processes)
+
+print("Critical path:")
+print(summary_df.to_string(index=False))
+print("Time per task prefix:")
+print(breakdown_df.to_string(index=False))
+print("Worker utilisation:")
+print(utilisation_df.groupby("mpi_processes")["utilisation"].describe().to_string())
+
+
+# Plotting the results
+
+# Critical path split vs MPI processes
+plot_df = summary_df.set_index("mpi_processes")[["compute", "transfer", "disk", "wait", "scheduling"]]
+plot_df.plot(kind="bar", stacked=True, figsize=(10, 6))
+plt.grid(True, linestyle='--', alpha=0.7)
+plt.xlabel("Number of MPI Processes")
+plt.ylabel("Time (seconds)")
+plt.savefig("imgs/strong_critical_path_vs_processes.png")
+
+# Compute time per task prefix vs MPI processes
+plot_df = breakdown_df.pivot_table(index="mpi_processes", columns="prefix", values="compute", aggfunc="sum")
+plot_df.plot(kind="bar", stacked=True, figsize=(10, 6))
+plt.grid(True, linestyle='--', alpha=0.7)
+plt.xlabel("Number of MPI Processes")
+plt.ylabel("Compute time (seconds)")
+plt.legend(fontsize="small")
+plt.savefig("imgs/strong_compute_per_prefix_vs_processes.png")
+
+# Worker utilisation vs MPI processes
+plt.figure(figsize=(10, 6))
+plt.boxplot([utilisation_df[utilisation_df["mpi_processes"] == mpi_p]["utilisation"]
+             for mpi_p in summary_df["mpi_processes"]],
+            labels=summary_df["mpi_processes"])
+plt.grid(True, linestyle='--', alpha=0.7)
+plt.xlabel("Number of MPI Processes")
+plt.ylabel("Worker utilisation")
+plt.savefig("imgs/strong_worker_utilisation_vs_processes.png")
@@ -0,0 +1,49 @@
+import json
+
+from results_store import ingest, load
+
+
+def _write_events(path, events):
+    with open(path, "w") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+
+
+def _streaming_run(run_dir):
+    run_dir.mkdir()
+    (run_dir / "analytics.e").write_text("")
+    base = {"source": "analytics", "host": "node-1", "pid": 1}
+    _write_events(run_dir / "events_analytics.jsonl", [
+        dict(base, event="arrays_received", monotonic=10.0, unix_time=1700000010.0,
+             x_dim=64, y_dim=64, z_dim=64, timesteps=3),
+        dict(base, event="compute", kind="phase", monotonic=16.0, unix_time=1700000016.0, start=11.0, end=16.0,
+             duration=5.0, unix_start=1700000011.0, ok=True, analytics="streaming", label="streaming"),
+    ] + [
+        dict(base, event="step", monotonic=12.0 + t, unix_time=1700000012.0 + t, step=t, duration=1.5, stride=1)
+        for t in range(3)
+    ])
+    base = {"source": "launcher", "host": "head", "pid": 2}
+    _write_events(run_dir / "events_launcher.jsonl", [
+        dict(base, event="process_stats", monotonic=20.0, unix_time=1700000020.0, process=process,
+             stats={"start_date": 1700000000.0, "end_date": 1700000020.0})
+        for process in ["simulation", "analytics"]
+    ])
+
+
+def test_ingest_streaming_run(tmp_path):
+    results_dir, store_dir = tmp_path / "results", tmp_path / "store"
+    results_dir.mkdir()
+    _streaming_run(results_dir / "streaming_1700000000:1:4:64")
+
+    assert ingest(str(results_dir), str(store_dir)) == ["streaming_1700000000:1:4:64"]
+
+    runs = load("runs", store_dir=str(store_dir))
+    assert runs.loc[0, "timesteps"] == 3
+    assert runs.loc[0, "analytics_start"] == 1700000000.0
+    phases = load("phases", store_dir=str(store_dir))
+    steps = phases[phases.phase == "step"].sort_values("step")
+    assert steps.step.tolist() == [0.0, 1.0, 2.0]
+    assert steps.unix_start.tolist() == [1700000010.5, 1700000011.5, 1700000012.5]
+    assert steps.unix_end.tolist() == [1700000012.0, 1700000013.0, 1700000014.0]
+    compute = phases[phases.phase == "compute"].iloc[0]
+    assert (compute.unix_start, compute.unix_end) == (1700000011.0, 1700000016.0)
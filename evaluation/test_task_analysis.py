@@ -0,0 +1,28 @@
+import pandas as pd
+
+from task_analysis import critical_path, critical_path_summary, task_table
+
+
+def _rows(tasks):
+    return pd.DataFrame([
+        dict(key=key, prefix=key.split("-")[0], worker="w1", thread=1, status="OK", nbytes=8,
+             action="compute", start=start, stop=stop, source=None)
+        for key, start, stop in tasks
+    ])
+
+
+def test_critical_path_skips_finalize():
+    # a and b feed c, which feeds d; the finalize task of compute has no recorded dependency
+    tasks = task_table(_rows([
+        ("a-1", 0.0, 1.0), ("b-1", 0.0, 2.0), ("c-1", 2.5, 3.0), ("d-1", 3.0, 4.0),
+        ("finalize-hlgfinalizecompute-1", 4.5, 5.0),
+    ]))
+    dependencies = pd.DataFrame([["c-1", "a-1"], ["c-1", "b-1"], ["d-1", "c-1"]], columns=["key", "dependency"])
+
+    path = critical_path(tasks, dependencies)
+
+    assert path["key"].tolist() == ["b-1", "c-1", "d-1"]
+    assert path["wait"].tolist() == [0.0, 0.5, 0.0]
+    summary = critical_path_summary(path)
+    assert summary["tasks"] == 3
+    assert summary["length"] == 4.0
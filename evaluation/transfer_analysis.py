@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+
+def load_transfers(exp_dir: str) -> pd.DataFrame:
+    """
+    Transfer rows written by the analytics of a run (transfers.csv, see in-situ/transfers.py).
+    """
+    return pd.read_csv(f"{exp_dir}/transfers.csv", dtype={"step": "Int64"})
+
+
+def _transfers(rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per incoming transfer, without the prefix and step breakdown.
+    """
+    incoming = rows[rows["direction"] == "incoming"]
+    return incoming.drop_duplicates(["exec_id", "transfer"] if "exec_id" in incoming else "transfer")
+
+
+def transfer_matrix(rows: pd.DataFrame, value: str = "nbytes") -> pd.DataFrame:
+    """
+    Worker to worker matrix of the transfers, senders as rows and receivers as columns.
+
+    Arguments:
+        rows (pd.DataFrame): Transfer rows of a run.
+        value (str): nbytes for the bytes moved, duration for the time spent in the transfers,
+            count for the number of transfers.
+    """
+    if value == "nbytes":
+        incoming = rows[rows["direction"] == "incoming"]
+        return incoming.pivot_table(index="peer", columns="worker", values="nbytes", aggfunc="sum", fill_value=0)
+    transfers = _transfers(rows)
+    aggfunc = "sum" if value == "duration" else "count"
+    return transfers.pivot_table(index="peer", columns="worker", values="duration", aggfunc=aggfunc, fill_value=0)
+
+
+def bandwidth_histogram(rows: pd.DataFrame, bins: int = 50) -> tuple:
+    """
+    Histogram of the bandwidth of the transfers in bytes per second, with logarithmic bins.
+    Returns (counts, bin edges), see numpy.histogram.
+    """
+    bandwidth = _transfers(rows)["bandwidth"].to_numpy(dtype=float)
+    bandwidth = bandwidth[bandwidth > 0]
+    if not len(bandwidth):
+        return np.zeros(bins, dtype=int), np.zeros(bins + 1)
+    edges = np.logspace(np.log10(bandwidth.min()), np.log10(bandwidth.max()), bins + 1)
+    return np.histogram(bandwidth, bins=edges)
+
+
+def per_step(rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    Bytes, transfers and transfer time of each step. The time of a transfer is shared between its
+    steps in proportion to their bytes. The keys that are not chunked by timestep are left out.
+    """
+    incoming = rows[(rows["direction"] == "incoming") & rows["step"].notna()]
+    share = (incoming["nbytes"] / incoming["total"].where(incoming["total"] > 0)).fillna(0)
+    incoming = incoming.assign(time=incoming["duration"] * share)
+    return incoming.groupby("step").agg(
+        nbytes=("nbytes", "sum"),
+        transfers=("transfer", "nunique"),
+        time=("time", "sum"),
+    )
+
+
+def per_worker(rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    Bytes received and sent by each worker, and their time in transfers, to spot the imbalanced workers.
+    """
+    transfers = _transfers(rows)
+    received = transfers.groupby("worker").agg(received=("total", "sum"), receive_time=("duration", "sum"))
+    sent = transfers.groupby("peer").agg(sent=("total", "sum"), send_time=("duration", "sum"))
+    return received.join(sent, how="outer").fillna(0)
@@ -0,0 +1,56 @@
+import numpy as np
+from matplotlib import pyplot as plt
+
+from results_store import ingest, select, load
+from transfer_analysis import transfer_matrix, bandwidth_histogram, per_step, per_worker
+
+
+# Index the new runs, then read the transfers between the workers of the selected runs from the store
+ingest()
+exec_ids = select(name="strong_*", mpi_processes=(1, 32))
+print(f"Found experiments: {exec_ids}")
+
+transfers_df = load("transfers", exec_ids)
+
+
+# Plotting the results
+
+for exec_id, rows in transfers_df.groupby("exec_id"):
+    name = exec_id.replace(":", "_")
+    print(f"[{exec_id}] Bytes and transfer time per worker:")
+    print(per_worker(rows).to_string())
+
+    # Worker to worker bytes
+    matrix = transfer_matrix(rows, "nbytes")
+    plt.figure(figsize=(10, 8))
+    plt.imshow(matrix.to_numpy() / 1e9, cmap="viridis")
+    plt.colorbar(label="Bytes (GB)")
+    plt.xticks(range(len(matrix.columns)), matrix.columns, rotation=90)
+    plt.yticks(range(len(matrix.index)), matrix.index)
+    plt.xlabel("Receiver")
+    plt.ylabel("Sender")
+    plt.tight_layout()
+    plt.savefig(f"imgs/transfer_matrix_{name}.png")
+    plt.close()
+
+    # Bandwidth of the transfers
+    counts, edges = bandwidth_histogram(rows)
+    plt.figure(figsize=(10, 6))
+    plt.bar(edges[:-1] / 1e6, counts, width=np.diff(edges) / 1e6, align="edge")
+    plt.xscale("log")
+    plt.xlabel("Bandwidth (MB/s)")
+    plt.ylabel("Transfers")
+    plt.savefig(f"imgs/transfer_bandwidth_{name}.png")
+    plt.close()
+
+    # Bytes and transfer time per step
+    steps = per_step(rows)
+    fig, ax1 = plt.subplots(figsize=(10, 6))
+    ax1.plot(steps.index, steps["nbytes"] / 1e6, color="blue", label="Bytes")
+    ax1.set_xlabel("Step")
+    ax1.set_ylabel("Transferred (MB)")
+    ax2 = ax1.twinx()
+    ax2.plot(steps.index, steps["time"], color="orange", label="Time")
+    ax2.set_ylabel("Transfer time (seconds)")
+    fig.savefig(f"imgs/transfer_per_step_{name}.png")
+    plt.close(fig)
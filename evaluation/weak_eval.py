@@ -1,102 +1,15 @@
-import glob
-import pandas as pd
 from matplotlib import pyplot as plt
-import glob
 
+from results_store import ingest, select, load, load_runs
 
-experiment_ids = ['weak_1748863919:2:4:2','weak_1748863828:2:2:1','weak_1748863788:2:1:0','weak_1748863964:2:8:3']
 
-# Find all directories that match the experiment IDs
-experiment_dirs = []
-for _dir in experiment_ids:
-    experiment_dirs.extend(glob.glob(f"../experiment_result/*{_dir}*"))
-print(f"Found experiment directories: {experiment_dirs}")
+# Index the new runs, then select the weak scaling runs of 2025-06-02 from the store
+ingest()
+exec_ids = select(name="weak_[0-9]*", since="2025-06-02 11:29", until="2025-06-02 11:33", total_nodes=2)
+print(f"Found experiments: {exec_ids}")
 
-# Create a DataFrame to store the results
-df = pd.DataFrame(columns=["name", "exec_id", "total_nodes", "mpi_processes", "problem_size",  
-                           "x_dim", "y_dim", "z_dim", 
-                           "time_ekin", "time_sum", "time_f",
-                           "analytics_start", "analytics_end",
-                           "simulation_start", "simulation_end"])
-
-monitor_df = pd.DataFrame()
-
-# Loop through each experiment directory and extract the required information to fill the DataFrame
-for d in experiment_dirs:
-    exec_id = d.split("/")[-1]
-    name = d.split("/")[-1].split(":")[0]
-    total_nodes = int(d.split("/")[-1].split(":")[1])
-    mpi_processes = int(d.split("/")[-1].split(":")[2])
-    problem_size = int(d.split("/")[-1].split(":")[3])
-
-    res_file = f"../experiment_result/{d}/analytics.e"
-    
-    data = []
-    with open(res_file, "r") as f:
-        for line in f:
-            if line.strip():
-                data.append(line.strip())
-
-    x_dim = int([
-        lin
-        for lin in data 
-        if lin.startswith("[Analytics] X-dim")
-    ][0].split("=")[-1].strip())
-
-    y_dim = int([
-        lin
-        for lin in data 
-        if lin.startswith("[Analytics] Y-dim")
-    ][0].split("=")[-1].strip())
-
-    z_dim = int([
-        lin
-        for lin in data 
-        if lin.startswith("[Analytics] Z-dim")
-    ][0].split("=")[-1].strip())
-
-    time_ekin = float([
-        lin
-        for lin in data 
-        if lin.startswith("[Analytics] time ekin")
-    ][0].split(":")[-1].strip())
-
-    time_sum = float([
-        lin
-        for lin in data 
-        if lin.startswith("[Analytics] time sum over xy:")
-    ][0].split(":")[-1].strip())
-
-    time_f = float([
-        lin
-        for lin in data 
-        if lin.startswith("[Analytics] time fourier:")
-    ][0].split(":")[-1].strip())
-
-    # read dict in the file
-    analytics_process_file = f"{d}/analytics_process_stats.txt"
-    with open(analytics_process_file, "r") as f:
-        analytics_process = eval(f.read())
-    
-    simulation_process_file = f"{d}/mpi_process_stats.txt"
-    with open(simulation_process_file, "r") as f:
-        simulation_process = eval(f.read())
-
-    df.loc[len(df)] = [
-        name, exec_id, total_nodes, mpi_processes, problem_size, 
-        x_dim, y_dim, z_dim, 
-        time_ekin, time_sum, time_f,
-        analytics_process["start_date"], analytics_process["end_date"],
-        simulation_process["start_date"], simulation_process["end_date"]
-    ]
-
-    monitor_files = glob.glob(f"{d}/monitor*")
-    for m_file in monitor_files:
-        new_df = pd.read_csv(m_file)
-        new_df["exec_id"] = exec_id
-        new_df["type"] = m_file.split("/")[-1].split("_")[1]  # Extract type from filename
-        monitor_df = pd.concat([monitor_df, new_df], ignore_index=True)
-    
+df = load_runs(exec_ids).rename(columns={"ekin": "time_ekin", "sum over xy": "time_sum", "fourier": "time_f"})
+monitor_df = load("monitor", exec_ids)
 
 if df.mpi_processes.duplicated().any():
     raise ValueError("There are duplicate MPI processes in the DataFrame. Please check the experiment ids.")
@@ -111,6 +24,9 @@ df.sort_values(by=["mpi_processes"], inplace=True)
 df["simulation_time"] = df["simulation_end"] - df["simulation_start"]
 df["simulation_analytics_time"] = df["analytics_end"] - df["analytics_start"]
 df["analytics_total_time"] = df["time_ekin"] + df["time_sum"] + df["time_f"]
+if "batch" in df:
+    # the batch runs compute the outputs in a single call, timed as a whole
+    df["analytics_total_time"] = df["analytics_total_time"].fillna(df["batch"])
 
 
 # Plotting the results
@@ -161,9 +77,7 @@ plt.ylabel("Time (seconds)")
 plt.savefig("imgs/weak_analytics_time_vs_processes.png")    
 
 
-monitor_df["mpi_processes"] = monitor_df["exec_id"].apply(
-    lambda x: int(x.split(":")[2])
-)
+monitor_df["mpi_processes"] = monitor_df["exec_id"].map(df.set_index("exec_id")["mpi_processes"])
 for mpi_p in monitor_df["mpi_processes"].unique():
     sub_df = monitor_df[monitor_df["mpi_processes"] == mpi_p]
     
@@ -0,0 +1,295 @@
+import os
+import re
+import signal
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class OarBackend:
+    """
+    Runs the experiment on Grid'5000: nodes are reserved with OAR and the commands are started
+    on them through SSH with execo.
+
+    Arguments:
+        site (str): Grid'5000 site where the nodes are reserved.
+    """
+    def __init__(self, site: str = "grenoble"):
+        self.site = site
+        self.jobs = None
+
+    def alloc_nodes(self, nb_reserved_nodes: int, walltime: int) -> list:
+        """
+        Reserves the nodes and returns them, the first one being the head node.
+
+        Arguments:
+            nb_reserved_nodes (int): Number of nodes to reserve, including the head node. Must be greater than 0.
+            walltime (int): Walltime in seconds. Must be greater than 0.
+        """
+        import execo_g5k
+
+        assert nb_reserved_nodes > 0, "Number of reserved nodes must be greater than 0"
+        assert walltime > 0, "Walltime must be greater than 0"
+        self.jobs = execo_g5k.oarsub(
+            [
+                (
+                    execo_g5k.OarSubmission(f"nodes={nb_reserved_nodes}", walltime=walltime),
+                                            # job_type="exotic",
+                                            # sql_properties="yeti",
+                    self.site,
+                )
+            ]
+        )
+        job_id, site = self.jobs[0]
+        print(f"Job {job_id} reserved on site {site}")
+        return execo_g5k.oar.get_oar_job_nodes(job_id, site)
+
+    def host_attributes(self, node) -> dict:
+        """
+        Grid'5000 reference API description of the node.
+        """
+        import execo_g5k
+        return execo_g5k.get_host_attributes(node)
+
+    def nb_cores(self, node) -> int:
+        return self.host_attributes(node)["architecture"]["nb_cores"]
+
+    def process(self, cmd: str, node):
+        """
+        Process running cmd on the node, not started yet.
+        """
+        import execo
+        return execo.SshProcess(cmd, node)
+
+    def cleanup(self, nodes: list, patterns: tuple):
+        """
+        Kills the processes whose command line matches one of the patterns on every node, e.g. the
+        Dask cluster of the previous run. Killing the SSH processes does not stop the remote commands.
+
+        Arguments:
+            nodes (list): Nodes to clean.
+            patterns (tuple): Regular expressions matched by pkill -f.
+        """
+        cmd = "pkill -f '" + "|".join(patterns) + "'"
+        ProcessGroup([self.process(cmd, node) for node in nodes]).start().wait()
+
+    def release(self):
+        """
+        Deletes the reservation, which also kills every process started on its nodes.
+        """
+        import execo_g5k
+        if self.jobs is not None:
+            execo_g5k.oardel(self.jobs)
+            self.jobs = None
+            print("Job deleted!")
+
+
+def node_name(node) -> str:
+    """
+    Name of a node in the output files and the run records: the address of execo hosts, or the
+    name of a LocalNode, as every local node has the same address.
+    """
+    return getattr(node, "name", node.address)
+
+
+class LocalNode:
+    """
+    Node of the LocalBackend, with the address attribute of execo hosts.
+
+    Arguments:
+        name (str): Name of the node, distinct for every node of the backend.
+        address (str): Address of the node.
+    """
+    def __init__(self, name: str, address: str = "localhost"):
+        self.name = name
+        self.address = address
+
+    def __repr__(self):
+        return f"LocalNode({self.name!r})"
+
+
+class LocalProcess:
+    """
+    Shell command run as a local subprocess, with the start/wait/kill/stats methods and the
+    ended/ok/exit_code attributes of execo processes.
+    The command runs in its own process group, so kill also stops the processes it spawned.
+    """
+    def __init__(self, cmd: str):
+        self.cmd = cmd
+        self.popen = None
+        self.start_date = None
+        self.end_date = None
+        self.exit_code = None
+        self.killed = False
+
+    def start(self):
+        self.start_date = time.time()
+        self.popen = subprocess.Popen(self.cmd, shell=True, start_new_session=True)
+        return self
+
+    def wait(self):
+        self.exit_code = self.popen.wait()
+        if self.end_date is None:
+            self.end_date = time.time()
+        return self
+
+    def running(self) -> bool:
+        if self.popen is None:
+            return False
+        if self.popen.poll() is None:
+            return True
+        # record the exit of a process that ended without being waited for
+        if self.end_date is None:
+            self.wait()
+        return False
+
+    @property
+    def ended(self) -> bool:
+        return self.popen is not None and not self.running()
+
+    @property
+    def ok(self) -> bool:
+        return self.ended and self.exit_code == 0
+
+    def kill(self):
+        if self.running():
+            self.killed = True
+            os.killpg(self.popen.pid, signal.SIGTERM)
+            self.wait()
+
+    def stats(self) -> dict:
+        """
+        Same keys as the stats of execo processes used by the evaluation scripts.
+        """
+        self.running()
+        return {
+            "name": "LocalProcess",
+            "cmd": self.cmd,
+            "start_date": self.start_date,
+            "end_date": self.end_date,
+            "exit_code": self.exit_code,
+            "killed": self.killed,
+            "ok": self.ok,
+        }
+
+
+class LocalBackend:
+    """
+    Runs the experiment on this machine: every node is localhost, named localhost-<i>, and the
+    commands are started as local subprocesses. The walltime is not enforced.
+
+    Arguments:
+        cores (int, optional): Cores per node given to the simulation. Defaults to all the cores.
+    """
+    def __init__(self, cores: int = None):
+        self.cores = cores if cores is not None else os.cpu_count()
+        self.processes = []
+
+    def alloc_nodes(self, nb_reserved_nodes: int, walltime: int) -> list:
+        assert nb_reserved_nodes > 0, "Number of reserved nodes must be greater than 0"
+        return [LocalNode(f"localhost-{i}") for i in range(nb_reserved_nodes)]
+
+    def host_attributes(self, node) -> dict:
+        return {
+            "architecture": {"nb_cores": self.cores},
+            "main_memory": {"ram_size": os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")},
+        }
+
+    def nb_cores(self, node) -> int:
+        return self.cores
+
+    def process(self, cmd: str, node):
+        process = LocalProcess(cmd)
+        self.processes.append(process)
+        return process
+
+    def cleanup(self, nodes: list, patterns: tuple):
+        """
+        Kills the processes started by this backend whose command matches one of the patterns.
+        The processes run in their own process group, so nothing they spawned is left behind.
+        """
+        pattern = re.compile("|".join(patterns))
+        for process in self.processes:
+            if pattern.search(process.cmd):
+                process.kill()
+        self.processes = [process for process in self.processes if process.running()]
+
+    def release(self):
+        """
+        Kills every process started by this backend that is still running.
+        """
+        for process in self.processes:
+            process.kill()
+        self.processes = []
+
+
+class ProcessGroup:
+    """
+    Processes started, waited for and killed together, e.g. the Dask workers of every node.
+    They are started and killed from a thread pool, so the SSH connections of all the nodes are
+    set up at the same time.
+
+    Arguments:
+        processes (list): Processes created by a backend, not started yet.
+        max_threads (int): Maximum number of processes started or killed at the same time.
+    """
+    def __init__(self, processes: list, max_threads: int = 64):
+        self.processes = list(processes)
+        self.max_threads = max_threads
+
+    def __iter__(self):
+        return iter(self.processes)
+
+    def __len__(self):
+        return len(self.processes)
+
+    def _map(self, fn):
+        if not self.processes:
+            return []
+        with ThreadPoolExecutor(min(len(self.processes), self.max_threads)) as pool:
+            return list(pool.map(fn, self.processes))
+
+    def start(self):
+        self._map(lambda process: process.start())
+        return self
+
+    def wait(self):
+        for process in self.processes:
+            process.wait()
+        return self
+
+    def kill(self):
+        self._map(lambda process: process.kill())
+
+    def stats(self) -> list:
+        return [process.stats() for process in self.processes]
+
+    def failed(self) -> list:
+        """
+        Processes that ended with an error.
+        """
+        return [process for process in self.processes if process.ended and not process.ok]
+
+    def check(self, name: str = "process"):
+        """
+        Raises a RuntimeError if a process of the group ended with an error.
+
+        Arguments:
+            name (str): Name of the processes in the error message.
+        """
+        failed = self.failed()
+        if failed:
+            raise RuntimeError(f"{len(failed)}/{len(self)} {name} processes failed: "
+                               + ", ".join(f"{process.cmd} (exit code {process.exit_code})" for process in failed))
+
+
+BACKENDS = {"oar": OarBackend, "local": LocalBackend}
+
+
+def container_cmd(cmd: str, path_to_sif_file: str = None) -> str:
+    """
+    Command running cmd in the Singularity image, or directly if path_to_sif_file is None.
+    """
+    if path_to_sif_file is None:
+        return f'bash -c "{cmd}"'
+    return f'singularity exec {path_to_sif_file} bash -c "{cmd}"'
@@ -0,0 +1,41 @@
+import json
+import os
+import subprocess
+import time
+
+CATALOG_FILE = os.path.expanduser("~") + "/bench/experiment_result/catalog.jsonl"
+
+
+def git_rev(path: str = os.path.dirname(os.path.abspath(__file__))) -> str:
+    """
+    Commit of the repository holding path, with a -dirty suffix if it has uncommitted changes.
+    None if it is not in a git repository.
+    """
+    try:
+        rev = subprocess.run(["git", "-C", path, "rev-parse", "HEAD"],
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "-C", path, "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return rev + "-dirty" if dirty else rev
+
+
+def record_run(output_dir: str, catalog_file: str = CATALOG_FILE, **fields) -> dict:
+    """
+    Records the launch parameters of a run in run.json of its output directory, and appends them to
+    the catalog of all the runs. The launch time and the git revision of the launcher are added.
+    Returns the record.
+
+    Arguments:
+        output_dir (str): Output directory of the run.
+        catalog_file (str): JSON lines catalog of the runs.
+        **fields: JSON serializable launch parameters, e.g. name, mpi_np, problem_size.
+    """
+    record = dict(fields, output_dir=output_dir, launch_time=time.time(), git_rev=git_rev())
+    with open(output_dir + "run.json", "w") as f:
+        json.dump(record, f, default=str)
+    # a single write of a line, so the runs of concurrent launchers do not interleave
+    with open(catalog_file, "a") as f:
+        f.write(json.dumps(record, default=str) + "\n")
+    return record
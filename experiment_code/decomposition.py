@@ -0,0 +1,46 @@
+import math
+
+
+def grid_dims(problem_size: int):
+    """
+    Global grid size used by the experiments for a given problem size.
+    Starts from a 32x32x32 grid and doubles nx and ny alternately, once per problem size step.
+
+    Arguments:
+        problem_size (int): Problem size. Must be greater than or equal to 0.
+    """
+    if problem_size < 0:
+        raise ValueError("problem_size must be greater than or equal to 1")
+    # base values
+    nx = 32
+    ny = 32
+    nz = 32
+    for i in range(problem_size):
+        if i % 2 == 0:
+            nx *= 2
+        else:
+            ny *= 2
+    return nx, ny, nz
+
+
+def mpi_dims(mpi_np: int):
+    """
+    MPI decomposition (mx, my, mz) used by the experiments for a given number of processes.
+    Splits x and y alternately, z is never split.
+
+    Arguments:
+        mpi_np (int): Number of MPI processes. Must be a power of 2.
+    """
+    mx = 1
+    my = 1
+    mz = 1
+    log_n_mpi = math.log2(mpi_np)
+    if not log_n_mpi.is_integer():
+        raise ValueError("mpi_np must be a power of 2")
+    log_n_mpi = int(log_n_mpi)
+    for i in range(log_n_mpi):
+        if i % 2 == 0:
+            mx *= 2
+        else:
+            my *= 2
+    return mx, my, mz
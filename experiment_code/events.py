@@ -0,0 +1,66 @@
+import json
+import os
+import socket
+import time
+from contextlib import contextmanager
+
+
+class EventLog:
+    """
+    Structured timing events of a process, appended as JSON lines to a file. Every event records
+    the monotonic clock of the process, to measure durations, and the unix time, to align the
+    events of processes running on different hosts.
+
+    Arguments:
+        filename (str): Path of the JSON lines file.
+        source (str): Name of the process writing the events, e.g. launcher or analytics.
+    """
+    def __init__(self, filename: str, source: str):
+        self.filename = filename
+        self.source = source
+        self.host = socket.gethostname()
+        self.pid = os.getpid()
+        self.file = open(filename, "a")
+
+    def event(self, name: str, **fields):
+        """
+        Writes an event.
+
+        Arguments:
+            name (str): Name of the event.
+            **fields: JSON serializable fields of the event, values that are not are written as strings.
+        """
+        record = {
+            "source": self.source,
+            "host": self.host,
+            "pid": self.pid,
+            "event": name,
+            "monotonic": time.monotonic(),
+            "unix_time": time.time(),
+        }
+        record.update(fields)
+        self.file.write(json.dumps(record, default=str) + "\n")
+        self.file.flush()
+
+    @contextmanager
+    def phase(self, name: str, **fields):
+        """
+        Context manager writing a phase event when the block ends, with its start, end and duration.
+        Failed phases are recorded with ok set to False.
+
+        Arguments:
+            name (str): Name of the phase.
+            **fields: JSON serializable fields of the event.
+        """
+        start, unix_start = time.monotonic(), time.time()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            end = time.monotonic()
+            self.event(name, kind="phase", start=start, end=end, duration=end - start,
+                       unix_start=unix_start, ok=ok, **fields)
+
+    def close(self):
+        self.file.close()
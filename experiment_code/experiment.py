@@ -1,9 +1,14 @@
-import execo
-import execo_g5k
 import time
 import os
 import configparser
 import re
+import json
+import select
+import ctypes
+import ctypes.util
+from contextlib import contextmanager
+
+from backends import ProcessGroup, container_cmd, node_name
 
 def get_configs(config_file):
     """ 
@@ -37,39 +42,186 @@ def extract_scheduler_path(filename):
     return None  # if no match is found
 
 
-def alloc_nodes(nb_reserved_nodes: int, walltime: int):
+class PhaseTimer:
     """
-    Allocates nodes for the simulation. The first node is the head node and the others are execution nodes.
-    If nb_reserved_nodes is 1, the head node is the only node reserved.
+    Records the start and end unix times of the phases of an experiment.
 
     Arguments:
-        nb_reserved_nodes (int): Number of nodes to reserve, including the head node. Must be greater than 0.
-        walltime (int): Walltime in seconds. Must be greater than 0.
-    """    
-    assert nb_reserved_nodes > 0, "Number of reserved nodes must be greater than 0"
-    assert walltime > 0, "Walltime must be greater than 0"
-    jobs = execo_g5k.oarsub(
-        [
-            (
-                execo_g5k.OarSubmission(f"nodes={nb_reserved_nodes}", walltime=walltime),
-                                        # job_type="exotic",
-                                        # sql_properties="yeti",
-                "grenoble",
-            )
-        ]
-    )
-    return jobs
+        events (EventLog, optional): Event log where the phases are also written, see events.py.
+    """
+    def __init__(self, events=None):
+        self.phases = []
+        self.events = events
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.time()
+        try:
+            if self.events is None:
+                yield
+            else:
+                with self.events.phase(name):
+                    yield
+        finally:
+            self.phases.append((name, start, time.time()))
+
+    def event(self, name: str, **fields):
+        """
+        Writes an event to the event log, if any.
+        """
+        if self.events is not None:
+            self.events.event(name, **fields)
+
+    def save(self, filename: str):
+        """
+        Writes the recorded phases as a csv file.
+
+        Arguments:
+            filename (str): Path of the csv file.
+        """
+        with open(filename, "w") as f:
+            f.write("phase,start,end,duration\n")
+            for name, start, end in self.phases:
+                f.write(f"{name},{start},{end},{end - start}\n")
+
+
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+
+
+def _inotify_fd(directory: str):
+    """
+    Non blocking inotify file descriptor watching the files created in directory, or None if
+    inotify is not available.
+    """
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, directory.encode(), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def wait_for_file(path: str, timeout: float = None, poll: float = 0.1):
+    """
+    Waits for a file to exist. Wakes up on the inotify events of its directory, and every poll
+    seconds for the files written by other nodes on a network file system, which inotify does not see.
+
+    Arguments:
+        path (str): Path of the file.
+        timeout (float, optional): Maximum wait in seconds. If None, waits forever.
+        poll (float): Maximum time between two checks in seconds.
+    """
+    fd = _inotify_fd(os.path.dirname(os.path.abspath(path)))
+    start = time.time()
+    try:
+        while not os.path.exists(path):
+            wait = poll
+            if timeout is not None:
+                remaining = timeout - (time.time() - start)
+                if remaining <= 0:
+                    raise TimeoutError(f"{path} was not created after {timeout}s")
+                wait = min(wait, remaining)
+            if fd is None:
+                time.sleep(wait)
+            elif select.select([fd], [], [], wait)[0]:
+                os.read(fd, 4096)
+    finally:
+        if fd is not None:
+            os.close(fd)
+
+
+def scheduler_address(scheduler_file: str, timeout: float = None) -> str:
+    """
+    Address of the scheduler, read from its scheduler file once the file is complete.
+
+    Arguments:
+        scheduler_file (str): Path to the scheduler file.
+        timeout (float, optional): Maximum wait in seconds. If None, waits forever.
+    """
+    start = time.time()
+    wait_for_file(scheduler_file, timeout)
+    while True:
+        try:
+            with open(scheduler_file) as f:
+                return json.load(f)["address"]
+        except (ValueError, KeyError):
+            # the scheduler is still writing the file
+            if timeout is not None and time.time() - start > timeout:
+                raise TimeoutError(f"{scheduler_file} is not a valid scheduler file after {timeout}s")
+            time.sleep(0.01)
+
+
+def wait_for_workers(scheduler_file: str, nb_workers: int, timeout: float = None) -> int:
+    """
+    Waits until nb_workers Dask workers are registered to the scheduler and returns the number
+    of registered workers.
+
+    Arguments:
+        scheduler_file (str): Path to the scheduler file.
+        nb_workers (int): Number of workers to wait for.
+        timeout (float, optional): Maximum wait in seconds. If None, waits forever.
+    """
+    from distributed import Client
+
+    address = scheduler_address(scheduler_file, timeout)
+    with Client(address, timeout=timeout) as client:
+        client.wait_for_workers(nb_workers, timeout=timeout)
+        return len(client.scheduler_info()["workers"])
+
+
+def reset_cluster(scheduler_file: str, nb_workers: int, restart: bool = False, timeout: float = None) -> bool:
+    """
+    Resets a running Dask cluster between two runs. The datasets published by the previous run are
+    removed and the memory freed by the workers is returned to the system. The workers are
+    restarted in place by their nannies if the previous run left tasks on the scheduler or if
+    restart is set. Returns True if the workers were restarted.
+
+    Arguments:
+        scheduler_file (str): Path to the scheduler file of the cluster.
+        nb_workers (int): Number of workers to wait for once the cluster is reset.
+        restart (bool): Always restart the workers.
+        timeout (float, optional): Maximum wait in seconds. If None, waits forever.
+    """
+    from distributed import Client
+
+    # nested, so it is sent by value: the workers cannot import this module
+    def trim_memory() -> int:
+        import gc
+        gc.collect()
+        return ctypes.CDLL(ctypes.util.find_library("c")).malloc_trim(0)
+
+    address = scheduler_address(scheduler_file, timeout)
+    with Client(address, timeout=timeout) as client:
+        for name in client.list_datasets():
+            client.unpublish_dataset(name)
+        leftover_tasks = client.run_on_scheduler(lambda dask_scheduler: len(dask_scheduler.tasks))
+        if restart or leftover_tasks:
+            client.restart()
+        else:
+            client.run(trim_memory)
+        client.wait_for_workers(nb_workers, timeout=timeout)
+    return restart or leftover_tasks > 0
+
 
-def run_scheduler(node, scheduler_file: str, output_dir: str, 
-                  path_to_sif_file: str) -> execo.SshProcess:
+def run_scheduler(backend, node, scheduler_file: str, output_dir: str, 
+                  path_to_sif_file: str, timeout: float = None):
     """
     Run the Dask scheduler in the given node.
 
     Arguments:
+        backend: Backend starting the processes, see backends.py.
         node: The node where the scheduler will be run.
         scheduler_file (str): Path to the scheduler file.
         output_dir (str): Directory where the output files will be saved.
-        path_to_sif_file (str): Path to the Singularity image file.
+        path_to_sif_file (str): Path to the Singularity image file, None to run without container.
+        timeout (float, optional): Maximum wait for the scheduler file in seconds. If None, waits forever.
     """
     if os.path.exists(scheduler_file):
         os.remove(scheduler_file)
@@ -82,90 +234,118 @@ def run_scheduler(node, scheduler_file: str, output_dir: str,
         "sync"
     )
 
-    scheduler_process = execo.SshProcess(
-        f'singularity exec {path_to_sif_file} bash -c "{scheduler_cmd}"',
-        node,
-    )
+    scheduler_process = backend.process(container_cmd(scheduler_cmd, path_to_sif_file), node)
     scheduler_process.start()
 
-    # Wait for the scheduler to start by checking the scheduler file
-    while not os.path.exists(scheduler_file):
-        time.sleep(1)
+    # Wait for the scheduler to start by watching the scheduler file
+    wait_for_file(scheduler_file, timeout)
     
     return scheduler_process
 
-def run_workers(nodes, head_node_ip: str, dask_workers_per_node: int, scheduler_file: str, output_dir: str, 
-                path_to_sif_file: str) -> execo.SshProcess:
+def auto_topology(host_attributes: dict, simulation_cores: int, max_threads_per_worker: int = 8,
+                  memory_fraction: float = 0.5) -> dict:
     """
-    Run the Dask workers in the given nodes.
+    Dask worker layout of a node: the fewest workers of at most max_threads_per_worker threads on the
+    cores left by the simulation (at least one), the cores left over being reported as idle_cores.
 
     Arguments:
+        host_attributes (dict): Host attributes of the node, see backend.host_attributes.
+        simulation_cores (int): Number of cores used by the simulation on the node.
+        max_threads_per_worker (int): Maximum number of threads per worker.
+        memory_fraction (float): Fraction of the RAM of the node given to the workers.
+    """
+    nb_cores = host_attributes["architecture"]["nb_cores"]
+    ram_size = host_attributes["main_memory"]["ram_size"]
+    free_cores = max(nb_cores - simulation_cores, 1)
+    nworkers = -(-free_cores // max_threads_per_worker)
+    nthreads = free_cores // nworkers
+    return {
+        "nb_cores": nb_cores,
+        "ram_size": ram_size,
+        "simulation_cores": simulation_cores,
+        "nworkers": nworkers,
+        "nthreads": nthreads,
+        "idle_cores": free_cores - nworkers * nthreads,
+        "memory_limit": int(ram_size * memory_fraction / nworkers),
+    }
+
+
+def run_workers(backend, nodes, head_node_ip: str, dask_workers_per_node: int, scheduler_file: str, output_dir: str, 
+                path_to_sif_file: str, nthreads: int = 1, memory_limit="28GB", cmd_prefix: str = ""):
+    """
+    Run the Dask workers in the given nodes, all started at the same time.
+    Returns the ProcessGroup of the workers of every node.
+
+    Arguments:
+        backend: Backend starting the processes, see backends.py.
         nodes (list): List of nodes where the workers will be run.
         head_node_ip (str): IP address of the head node.
         dask_workers_per_node (int): Number of Dask workers per node.
         scheduler_file (str): Path to the scheduler file.
         output_dir (str): Directory where the output files will be saved.
-        path_to_sif_file (str): Path to the Singularity image file.
+        path_to_sif_file (str): Path to the Singularity image file, None to run without container.
+        nthreads (int): Number of threads per worker.
+        memory_limit: Memory limit per worker, in bytes or as a string like "28GB".
+        cmd_prefix (str): Prefix of the worker command, e.g. taskset -c 8-31 to pin the workers.
     """
     worker_cmd = (
         f"dask worker "
         f"tcp://{head_node_ip}:8786 "
         # f"--dashboard-address {head_node.address}:8787 "
         f"--nworkers {dask_workers_per_node} "
-        "--memory-limit 28GB "
-        "--nthreads 1 "
+        f"--memory-limit {memory_limit} "
+        f"--nthreads {nthreads} "
         "--local-directory /tmp "
         f"--scheduler-file {scheduler_file} "
         f"> {output_dir}worker.e 2>&1"
     )
 
-    for node in nodes:
-        worker_process = execo.SshProcess(
-            f'singularity exec {path_to_sif_file} bash -c "{worker_cmd}"',
-            node,
-        )
-        worker_process.start()
-
-    return worker_process
+    worker_processes = ProcessGroup(
+        [backend.process(f"{cmd_prefix} {container_cmd(worker_cmd, path_to_sif_file)}".strip(), node)
+         for node in nodes]
+    )
+    return worker_processes.start()
 
-def run_analytics(node, total_dask_workers: int, deisa_path: str, analytics_py_file: str, 
-                  scheduler_file: str, output_dir: str, path_to_sif_file: str) -> execo.SshProcess:
+def run_analytics(backend, node, total_dask_workers: int, deisa_path: str, analytics_py_file: str, 
+                  scheduler_file: str, output_dir: str, path_to_sif_file: str, 
+                  analytics_args: str = "", analytics: str = None):
     """
     Run the analytics script in the given node.
 
     Arguments:
+        backend: Backend starting the processes, see backends.py.
         node: The node where the analytics will be run.
         total_dask_workers (int): Total number of Dask workers.
         deisa_path (str): Path to the DEISA directory.
         analytics_py_file (str): Path to the analytics Python file.
         scheduler_file (str): Path to the scheduler file.
         output_dir (str): Directory where the output files will be saved.
-        path_to_sif_file (str): Path to the Singularity image file.
+        path_to_sif_file (str): Path to the Singularity image file, None to run without container.
+        analytics_args (str): Extra command line options passed to the analytics script.
+        analytics (str, optional): Comma separated names of the analytics to run, see in-situ/registry.py.
+            If None, the analytics script runs its default set.
     """    
+    if analytics is not None:
+        analytics_args = f"--analytics {analytics} {analytics_args}"
 
     py_cmd = (
         f'export PYTHONPATH={deisa_path}:$PYTHONPATH; '
-        f'python3 {analytics_py_file} {total_dask_workers} {scheduler_file} {output_dir} > {output_dir}analytics.e 2>&1'
-    )
-    analytics_cmd = (
-        f'singularity exec {path_to_sif_file} bash -c "{py_cmd}"'
-    )
-
-    analytics_process = execo.SshProcess(
-        analytics_cmd,
-        node,
+        f'python3 {analytics_py_file} {total_dask_workers} {scheduler_file} {output_dir} {analytics_args} '
+        f'> {output_dir}analytics.e 2>&1'
     )
+    analytics_process = backend.process(container_cmd(py_cmd, path_to_sif_file), node)
     analytics_process.start()
     
     return analytics_process
 
-def run_simulation(head_node, nodes: list, mpi_np: int, cores_per_node: int, deisa_path, 
+def run_simulation(backend, head_node, nodes: list, mpi_np: int, cores_per_node: int, deisa_path, 
                    sim_executable: str, simulation_ini: str, pdi_deisa_yml: str, output_dir: str, 
-                   path_to_sif_file: str, omp_num_threads=1) -> execo.SshProcess:
+                   path_to_sif_file: str, omp_num_threads=1, mpi_binding: str = "--map-by node"):
     """
     Run the simulation in the given nodes.
 
     Arguments:
+        backend: Backend starting the processes, see backends.py.
         head_node: The head node where the simulation will be run.
         nodes (list): List of nodes where the simulation will be run.
         mpi_np (int): Number of MPI processes.
@@ -175,11 +355,17 @@ def run_simulation(head_node, nodes: list, mpi_np: int, cores_per_node: int, dei
         simulation_ini (str): Path to the simulation ini file.
         pdi_deisa_yml (str): Path to the PDI DEISA YAML file.
         output_dir (str): Directory where the output files will be saved.
-        path_to_sif_file (str): Path to the Singularity image file.
+        path_to_sif_file (str): Path to the Singularity image file, None to run without container.
+        omp_num_threads (int): Number of OpenMP threads per MPI process.
+        mpi_binding (str): mpirun mapping and binding options, see placement.py.
     """
     
     # host_list = ",".join([f"{node.address}" for node in nodes])
-    host_list = ",".join([f"{node.address}:{cores_per_node}" for node in nodes])
+    # the local nodes share their address, their slots are merged
+    slots = {}
+    for node in nodes:
+        slots[node.address] = slots.get(node.address, 0) + cores_per_node
+    host_list = ",".join([f"{address}:{n}" for address, n in slots.items()])
     # host_list = ",".join([f"{node.address}" for node in nodes])
 
     simulation_cmd = (
@@ -196,29 +382,29 @@ def run_simulation(head_node, nodes: list, mpi_np: int, cores_per_node: int, dei
     mpi_cmd = (
         'mpirun '
         f"--host {host_list} "
-        f"--map-by node "
+        f"{mpi_binding} "
         f"-np {mpi_np} "
-        f'singularity exec {path_to_sif_file} bash -c "{simulation_cmd}" '
+        f'{container_cmd(simulation_cmd, path_to_sif_file)} '
         f'> {output_dir}simulation.e 2>&1'
     )
 
-    mpi_process = execo.SshProcess(
-        mpi_cmd,
-        head_node,
-    )
+    mpi_process = backend.process(mpi_cmd, head_node)
     mpi_process.start()
 
     return mpi_process
 
-def run_monitor(nodes: list, output_dir: str, interval: int, path_to_sif_file: str, path_to_monitor_file: str) -> execo.SshProcess:
+def run_monitor(backend, nodes: list, output_dir: str, interval: float, path_to_sif_file: str, path_to_monitor_file: str):
     """
-    Run the monitor script in the given nodes.
+    Run the monitor script in the given nodes, all started at the same time. Each monitor writes
+    monitor_<head|node>_<node name>.bin and .json, see monitor.py and backends.node_name.
+    Returns the ProcessGroup of the monitors of every node.
 
     Arguments:
+        backend: Backend starting the processes, see backends.py.
         nodes (list): List of nodes where the monitor will be run.
         output_dir (str): Directory where the output files will be saved.
-        interval (int): Interval in seconds for monitoring.
-        path_to_sif_file (str): Path to the Singularity image file.
+        interval (float): Sampling interval in seconds, can be below a second.
+        path_to_sif_file (str): Path to the Singularity image file, None to run without container.
         path_to_monitor_file (str): Path to the monitor Python file.
     """
     monitoring_processes = []
@@ -226,20 +412,12 @@ def run_monitor(nodes: list, output_dir: str, interval: int, path_to_sif_file: s
         node = nodes[i]
         
         if i == 0:
-            log_file = output_dir + "monitor_head_" + node.address
+            log_file = output_dir + "monitor_head_" + node_name(node)
         else:
-            log_file = output_dir + "monitor_node_" + node.address
-        
-        monitor_cmd = (
-            f'singularity exec {path_to_sif_file} '
-            f'bash -c "python {path_to_monitor_file} {log_file} {interval}"'
-        )
-        monitor_process = execo.SshProcess(
-            monitor_cmd,
-            node,
-        )
-        monitor_process.start()
-        monitoring_processes.append(monitor_process)
+            log_file = output_dir + "monitor_node_" + node_name(node)
         
-    return monitoring_processes
+        monitor_cmd = container_cmd(f"python {path_to_monitor_file} {log_file} {interval}", path_to_sif_file)
+        monitoring_processes.append(backend.process(monitor_cmd, node))
+
+    return ProcessGroup(monitoring_processes).start()
 
@@ -1,30 +1,311 @@
-import psutil
+import json
+import os
+import re
+import signal
 import socket
-from datetime import datetime
 import sys
+import time
+
+import numpy as np
+import psutil
+
+# Process groups, in matching order: a process belongs to the first group whose pattern is found in
+# its command line, or else to the group of its closest matching ancestor, e.g. the worker
+# processes spawned by a nanny. The shells wrapping the commands only inherit their group.
+GROUPS = (
+    ("analytics", re.compile(r"bench_deisa\.py")),
+    ("scheduler", re.compile(r"dask scheduler")),
+    ("worker", re.compile(r"dask worker")),
+    ("mpi", re.compile(r"\b(mpirun|orted|prted)\b")),
+    ("simulation", re.compile(r"build/main")),
+    ("monitor", re.compile(r"monitor\.py")),
+)
+# group codes of the samples, 0 is the whole node
+GROUP_NAMES = ("node",) + tuple(name for name, _ in GROUPS)
+SHELLS = ("sh", "bash", "dash")
+# groups whose processes fork and exec the commands of other groups, e.g. the MPI ranks
+LAUNCHERS = ("mpi",)
+
+# one row per group and sample. The counters are cumulative: cpu times in seconds, bytes and
+# context switches since the start of the processes (of the node for the node rows).
+# cpu_percent, mem_percent and the network counters are only set on the node rows, as they are
+# not available per process, and ctx_voluntary then holds all the context switches of the node.
+SAMPLE_DTYPE = np.dtype([
+    ("unix_time", "f8"),
+    ("group", "u1"),
+    ("nprocs", "u2"),
+    ("cpu_percent", "f4"),
+    ("mem_percent", "f4"),
+    ("cpu_user", "f8"),
+    ("cpu_system", "f8"),
+    ("rss", "u8"),
+    ("ctx_voluntary", "u8"),
+    ("ctx_involuntary", "u8"),
+    ("read_bytes", "u8"),
+    ("write_bytes", "u8"),
+    ("net_sent", "u8"),
+    ("net_recv", "u8"),
+])
+
+
+# one row per network interface and sample, cumulative counters since the interface is up
+NIC_DTYPE = np.dtype([
+    ("unix_time", "f8"),
+    ("nic", "u1"),
+    ("bytes_sent", "u8"),
+    ("bytes_recv", "u8"),
+    ("packets_sent", "u8"),
+    ("packets_recv", "u8"),
+    ("dropin", "u8"),
+    ("dropout", "u8"),
+])
+
+
+def _is_shell(cmdline: list) -> bool:
+    return bool(cmdline) and os.path.basename(cmdline[0]) in SHELLS
+
+
+class ProcessGroups:
+    """
+    Classifies the processes of the node in GROUPS, caching the group of every pid seen. A process
+    sampled between its fork and its exec still has the command line of its parent, e.g. an MPI
+    rank forked by prted. So the pids classified as a launcher, from an ancestor or as a shell are
+    pending: their command line is read again at every refresh, and they are re-classified once
+    it changes. The command lines of the other pids are only read once.
+    """
+    def __init__(self):
+        self.processes = {}  # pid -> (psutil.Process, group code or None)
+        self.pending = {}  # pid -> command line, of the pids that may be re-classified
+
+    def _match(self, cmdline: list):
+        if not cmdline or _is_shell(cmdline):
+            return None
+        cmd = " ".join(cmdline)
+        for code, (_, pattern) in enumerate(GROUPS, start=1):
+            if pattern.search(cmd):
+                return code
+        return None
+
+    def _group(self, pid: int, infos: dict, seen: set):
+        if pid in self.processes:
+            return self.processes[pid][1]
+        if pid not in infos or pid in seen:
+            return None
+        seen.add(pid)
+        process, cmdline, ppid = infos[pid]
+        group = self._match(cmdline)
+        if group is None:
+            group = self._group(ppid, infos, seen)
+            pending = group is not None or _is_shell(cmdline)
+        else:
+            pending = GROUP_NAMES[group] in LAUNCHERS
+        self.processes[pid] = (process, group)
+        if pending:
+            self.pending[pid] = cmdline
+        else:
+            self.pending.pop(pid, None)
+        return group
+
+    def refresh(self) -> dict:
+        """
+        Returns the live processes of every group, {group code: [psutil.Process]}.
+        """
+        infos = {}
+        for p in psutil.process_iter():
+            if p.pid in self.processes and p.pid not in self.pending:
+                continue
+            try:
+                cmdline = p.cmdline()
+            except (psutil.AccessDenied, psutil.ZombieProcess):
+                cmdline = None
+            except psutil.NoSuchProcess:
+                continue
+            if p.pid in self.pending:
+                if cmdline == self.pending[p.pid]:
+                    continue
+                # exec'd since classified
+                del self.processes[p.pid]
+                del self.pending[p.pid]
+            try:
+                infos[p.pid] = (p, cmdline, p.ppid())
+            except psutil.NoSuchProcess:
+                continue
+        for pid in infos:
+            self._group(pid, infos, set())
+
+        groups = {}
+        for pid, (process, group) in list(self.processes.items()):
+            if not process.is_running():
+                del self.processes[pid]
+                self.pending.pop(pid, None)
+            elif group is not None:
+                groups.setdefault(group, []).append(process)
+        return groups
+
+
+def _node_sample(row):
+    cpu = psutil.cpu_times()
+    mem = psutil.virtual_memory()
+    disk = psutil.disk_io_counters()
+    net = psutil.net_io_counters()
+    ctx = psutil.cpu_stats()
+    row["group"] = 0
+    row["nprocs"] = min(len(psutil.pids()), np.iinfo("u2").max)
+    row["cpu_percent"] = psutil.cpu_percent(interval=None)
+    row["mem_percent"] = mem.percent
+    row["cpu_user"], row["cpu_system"] = cpu.user, cpu.system
+    row["rss"] = mem.used
+    row["ctx_voluntary"], row["ctx_involuntary"] = ctx.ctx_switches, 0
+    if disk is not None:
+        row["read_bytes"], row["write_bytes"] = disk.read_bytes, disk.write_bytes
+    row["net_sent"], row["net_recv"] = net.bytes_sent, net.bytes_recv
+
+
+def _nic_sample(row, now: float, nic: int, counters):
+    row["unix_time"] = now
+    row["nic"] = nic
+    row["bytes_sent"], row["bytes_recv"] = counters.bytes_sent, counters.bytes_recv
+    row["packets_sent"], row["packets_recv"] = counters.packets_sent, counters.packets_recv
+    row["dropin"], row["dropout"] = counters.dropin, counters.dropout
+
+
+def _group_sample(row, group: int, processes: list):
+    row["group"] = group
+    row["cpu_percent"] = row["mem_percent"] = np.nan
+    nprocs = 0
+    for process in processes:
+        try:
+            with process.oneshot():
+                cpu = process.cpu_times()
+                rss = process.memory_info().rss
+                ctx = process.num_ctx_switches()
+                try:
+                    io = process.io_counters()
+                except (psutil.AccessDenied, AttributeError):
+                    io = None
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+        nprocs += 1
+        row["cpu_user"] += cpu.user
+        row["cpu_system"] += cpu.system
+        row["rss"] += rss
+        row["ctx_voluntary"] += ctx.voluntary
+        row["ctx_involuntary"] += ctx.involuntary
+        if io is not None:
+            row["read_bytes"] += io.read_bytes
+            row["write_bytes"] += io.write_bytes
+    row["nprocs"] = nprocs
+
+
+class Ring:
+    """
+    Rows of a numpy dtype buffered in memory and appended to a binary file when full or flushed.
+
+    Arguments:
+        filename (str): Path of the binary file.
+        dtype (np.dtype): Type of the rows.
+        size (int): Number of rows buffered before a write.
+    """
+    def __init__(self, filename: str, dtype: np.dtype, size: int):
+        self.rows = np.zeros(size, dtype=dtype)
+        self.size = 0
+        self.file = open(filename, "ab")
+
+    def next_row(self):
+        """
+        Zeroed row, a view on the ring.
+        """
+        if self.size == len(self.rows):
+            self.flush()
+        self.rows[self.size] = 0
+        row = self.rows[self.size]
+        self.size += 1
+        return row
+
+    def flush(self):
+        self.rows[:self.size].tofile(self.file)
+        self.file.flush()
+        self.size = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+class Monitor:
+    """
+    Samples the node, every process group and every network interface at a fixed interval into
+    rings of rows, written whenever a ring is full and when the monitor stops: SAMPLE_DTYPE records
+    to log_file.bin and NIC_DTYPE records to log_file.nic.bin. log_file.json describes the records,
+    read them back with numpy.fromfile.
+
+    Arguments:
+        log_file (str): Path of the output files, without extension.
+        interval (float): Sampling interval in seconds, can be below a second.
+        ring_size (int): Number of rows buffered before a write.
+    """
+    def __init__(self, log_file: str, interval: float, ring_size: int = 4096):
+        self.log_file = log_file
+        self.interval = interval
+        self.groups = ProcessGroups()
+        # the interfaces of the node at the start, later ones are not sampled
+        self.nics = sorted(psutil.net_io_counters(pernic=True))
+        with open(log_file + ".json", "w") as f:
+            json.dump({
+                "hostname": socket.gethostname(),
+                "interval": interval,
+                "groups": list(GROUP_NAMES),
+                "dtype": SAMPLE_DTYPE.descr,
+                "nics": self.nics,
+                "nic_dtype": NIC_DTYPE.descr,
+            }, f)
+        self.samples = Ring(log_file + ".bin", SAMPLE_DTYPE, ring_size)
+        self.nic_samples = Ring(log_file + ".nic.bin", NIC_DTYPE, ring_size)
+
+    def sample(self):
+        now = time.time()
+        row = self.samples.next_row()
+        row["unix_time"] = now
+        _node_sample(row)
+        for group, processes in self.groups.refresh().items():
+            row = self.samples.next_row()
+            row["unix_time"] = now
+            _group_sample(row, group, processes)
+
+        counters = psutil.net_io_counters(pernic=True)
+        for code, nic in enumerate(self.nics):
+            if nic in counters:
+                _nic_sample(self.nic_samples.next_row(), now, code, counters[nic])
+
+    def run(self):
+        psutil.cpu_percent(interval=None)
+        next_sample = time.monotonic()
+        try:
+            while True:
+                self.sample()
+                # a late sample delays the next ones instead of being caught up
+                next_sample = max(next_sample + self.interval, time.monotonic())
+                time.sleep(max(0.0, next_sample - time.monotonic()))
+        finally:
+            self.samples.close()
+            self.nic_samples.close()
 
-if len(sys.argv) != 3:
-    print("Usage: python monitor.py <log_file> <interval_in_seconds>")
-    sys.exit(1)
 
-LOG_FILE = sys.argv[1]
-INTERVAL = int(sys.argv[2])
+def _stop(signum, frame):
+    # the monitor is stopped with a signal, exiting through the finally of run writes the rings
+    sys.exit(0)
 
-hostname = socket.gethostname()
 
-f = open(LOG_FILE, "a")
-f.write("timestamp,unix_time,hostname,cpu_percent,mem_percent\n")  # header (optional)
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4):
+        print("Usage: python monitor.py <log_file> <interval_in_seconds> [ring_size]")
+        sys.exit(1)
 
-try:
-    while True:
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        unix_time = datetime.now().timestamp()
-        cpu_usage = psutil.cpu_percent(interval=INTERVAL)
-        mem = psutil.virtual_memory()
-        mem_usage = mem.percent
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGHUP, _stop)
 
-        log_line = f"{timestamp},{unix_time},{hostname},{cpu_usage},{mem_usage}\n"
-        f.write(log_line)
-        f.flush()  # ensure data is written immediately
-except KeyboardInterrupt:
-    print("Monitoring stopped by user.")
\ No newline at end of file
+    monitor = Monitor(sys.argv[1], float(sys.argv[2]), *[int(arg) for arg in sys.argv[3:]])
+    try:
+        monitor.run()
+    except KeyboardInterrupt:
+        print("Monitoring stopped by user.")
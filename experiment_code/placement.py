@@ -0,0 +1,101 @@
+from backends import node_name
+
+POLICIES = ("shared", "dedicated", "partitioned")
+
+
+def _cpu_list(start: int, stop: int) -> str:
+    """
+    Cpu list of the cores [start, stop) for taskset and mpirun.
+    """
+    return f"{start}-{stop - 1}" if stop - start > 1 else str(start)
+
+
+class Placement:
+    """
+    Where the simulation ranks and the Dask workers run. The Deisa bridges run inside the
+    simulation ranks, so they use the cores of their rank.
+
+    Arguments:
+        policy (str): Placement policy, see POLICIES.
+        simulation_nodes (list): Nodes running the simulation ranks.
+        worker_nodes (list): Nodes running the Dask workers.
+        mpi_binding (str): mpirun mapping and binding options of the simulation ranks.
+        worker_prefix (str): Command prefix binding the Dask workers to their cores.
+        simulation_cores (str): Cpu list of the simulation on each node, None if not pinned.
+        worker_cores (str): Cpu list of the workers on each node, None if not pinned.
+        simulation_cores_per_worker_node (int): Cores used by the simulation on a node running workers.
+    """
+    def __init__(self, policy, simulation_nodes, worker_nodes, mpi_binding, worker_prefix="",
+                 simulation_cores=None, worker_cores=None, simulation_cores_per_worker_node=0):
+        self.policy = policy
+        self.simulation_nodes = list(simulation_nodes)
+        self.worker_nodes = list(worker_nodes)
+        self.mpi_binding = mpi_binding
+        self.worker_prefix = worker_prefix
+        self.simulation_cores = simulation_cores
+        self.worker_cores = worker_cores
+        self.simulation_cores_per_worker_node = simulation_cores_per_worker_node
+
+    def to_dict(self) -> dict:
+        return {
+            "policy": self.policy,
+            "simulation_nodes": [node_name(node) for node in self.simulation_nodes],
+            "worker_nodes": [node_name(node) for node in self.worker_nodes],
+            "mpi_binding": self.mpi_binding,
+            "worker_prefix": self.worker_prefix,
+            "simulation_cores": self.simulation_cores,
+            "worker_cores": self.worker_cores,
+            "simulation_cores_per_worker_node": self.simulation_cores_per_worker_node,
+        }
+
+
+def plan_placement(policy: str, nodes: list, nb_cores: int, mpi_np: int, omp_num_threads: int = 1,
+                   nb_worker_nodes: int = None) -> Placement:
+    """
+    Places the simulation ranks and the Dask workers on the nodes.
+    - shared: ranks and workers on every node, without pinning (the original behaviour);
+    - dedicated: ranks on the first nodes and workers on the last nb_worker_nodes nodes;
+    - partitioned: ranks and workers on every node, each rank pinned to omp_num_threads cores at
+      the start of the node and the workers pinned to the remaining cores.
+
+    Arguments:
+        policy (str): Placement policy, see POLICIES.
+        nodes (list): Nodes available for the simulation and the workers.
+        nb_cores (int): Number of cores per node.
+        mpi_np (int): Number of MPI processes.
+        omp_num_threads (int): Number of OpenMP threads per MPI process.
+        nb_worker_nodes (int, optional): Dedicated policy only, number of nodes running the workers.
+            Defaults to half of the nodes.
+    """
+    if policy == "shared":
+        ranks_per_node = -(-mpi_np // len(nodes))
+        return Placement(policy, nodes, nodes, "--map-by node",
+                         simulation_cores_per_worker_node=min(ranks_per_node * omp_num_threads, nb_cores))
+
+    if policy == "dedicated":
+        if len(nodes) < 2:
+            raise ValueError("The dedicated placement requires at least 2 nodes besides the head node")
+        if nb_worker_nodes is None:
+            nb_worker_nodes = len(nodes) // 2
+        if not 1 <= nb_worker_nodes < len(nodes):
+            raise ValueError("nb_worker_nodes must be between 1 and the number of nodes - 1")
+        return Placement(policy, nodes[:-nb_worker_nodes], nodes[-nb_worker_nodes:], "--map-by node")
+
+    if policy == "partitioned":
+        ranks_per_node = -(-mpi_np // len(nodes))
+        simulation_cores = ranks_per_node * omp_num_threads
+        if simulation_cores >= nb_cores:
+            raise ValueError(f"The simulation needs {simulation_cores} cores per node, "
+                             f"no core of the {nb_cores} would be left to the workers")
+        simulation_cpus = _cpu_list(0, simulation_cores)
+        worker_cpus = _cpu_list(simulation_cores, nb_cores)
+        return Placement(
+            policy, nodes, nodes,
+            f"--map-by ppr:{ranks_per_node}:node:PE={omp_num_threads} --bind-to core --cpu-set {simulation_cpus}",
+            worker_prefix=f"taskset -c {worker_cpus}",
+            simulation_cores=simulation_cpus,
+            worker_cores=worker_cpus,
+            simulation_cores_per_worker_node=simulation_cores,
+        )
+
+    raise ValueError(f"Unknown placement policy {policy}. Available: {list(POLICIES)}")
@@ -1,10 +1,14 @@
-import execo_g5k
 import os
+import json
+import shutil
 import socket
-import time
-import math
 
 from experiment import *
+from backends import BACKENDS, OarBackend, node_name
+from placement import POLICIES, plan_placement
+from events import EventLog
+from catalog import record_run
+from decomposition import grid_dims, mpi_dims
 
 # this will be /home/lmascare
 HOME_DIR = os.path.expanduser("~")
@@ -18,119 +22,221 @@ DEISA_PATH = HOME_DIR + "/bench/deisa/"
 PATH_TO_MONITOR_FILE = HOME_DIR + "/bench/experiment_code/monitor.py"
 
 
-def run_experiment(reserved_nodes: int, s_ini_file: str, pdi_deisa_yml: str, name: str, walltime=10*60, 
-                   dask_workers_per_node=1, total_dask_workers=None, omp_num_threads=1,monitoring=False):
+# processes left on the nodes by a run, killed before the next run on the same nodes
+RUN_PROCESSES = ("bench_deisa.py", "monitor.py", "pdirun")
+CLUSTER_PROCESSES = ("dask scheduler", "dask worker") + RUN_PROCESSES
+
+
+def start_cluster(backend, head_node, nodes: list, scheduler_file: str, output_dir: str, phases,
+                  dask_workers_per_node=1, total_dask_workers=None, path_to_sif_file=PATH_TO_SIF_FILE,
+                  startup_timeout=300, exp_name="", nthreads=1, memory_limit="28GB", worker_prefix=""):
     """
-    Run experiment with the given parameters.
+    Starts the Dask scheduler on the head node and the workers on the nodes, and waits for
+    total_dask_workers workers to register. Returns the ProcessGroup of the workers.
 
     Arguments:
-        reserved_nodes (int): Total number of nodes to reserve, including the head node.
+        backend: Backend starting the processes, see backends.py.
+        head_node: Node running the scheduler.
+        nodes (list): Nodes running the Dask workers.
+        scheduler_file (str): Path to the scheduler file.
+        output_dir (str): Directory where the scheduler and worker logs will be saved.
+        phases (PhaseTimer): Records the time of each phase.
+        dask_workers_per_node (int): Number of Dask workers per node.
+        total_dask_workers (int, optional): Number of workers to wait for. If None, it will be len(nodes).
+        path_to_sif_file (str, optional): Path to the Singularity image file, None to run without container.
+        startup_timeout (float): Maximum wait in seconds for the scheduler and for the workers to register.
+        exp_name (str): Name of the run in the logs.
+        nthreads (int): Number of threads per worker.
+        memory_limit: Memory limit per worker, in bytes or as a string like "28GB".
+        worker_prefix (str): Prefix of the worker command, see placement.Placement.
+    """
+    if total_dask_workers is None:
+        total_dask_workers = len(nodes)
+
+    # Getting the ip addresses of the nodes
+    head_node_ip = socket.gethostbyname(head_node.address)
+    nodes_ips = []
+    for node in nodes:
+        nodes_ips.append(socket.gethostbyname(node.address))
+    print(f"[{exp_name}] Head node IP: {head_node_ip}")
+    print(f"[{exp_name}] Other nodes IPs: {nodes_ips}")
+
+    # Running the scheduler
+    print(f"[{exp_name}] Initializing the scheduler...")
+    with phases.phase("scheduler"):
+        run_scheduler(backend, head_node, scheduler_file, output_dir, path_to_sif_file, startup_timeout)
+    print(f"[{exp_name}] Scheduler started!")
+
+    # Running the Dask workers, the analytics only start once they are all registered
+    print(f"[{exp_name}] Initializing the workers...")
+    with phases.phase("workers"):
+        worker_processes = run_workers(backend, nodes, head_node_ip, dask_workers_per_node, scheduler_file,
+                                       output_dir, path_to_sif_file, nthreads, memory_limit, worker_prefix)
+        try:
+            nb_workers = wait_for_workers(scheduler_file, total_dask_workers, startup_timeout)
+        except TimeoutError:
+            # report the nodes whose workers died rather than the timeout
+            worker_processes.check("worker")
+            raise
+    print(f"[{exp_name}] Workers started! {nb_workers} workers registered")
+    return worker_processes
+
+
+def run_on_nodes(backend, head_node, nodes: list, s_ini_file: str, pdi_deisa_yml: str, exp_name: str,
+                 output_dir: str, phases, dask_workers_per_node=1, total_dask_workers=None, omp_num_threads=1,
+                 monitoring=False, analytics_args="", analytics=None, path_to_sif_file=PATH_TO_SIF_FILE,
+                 startup_timeout=300, warm_scheduler_file=None, topology="fixed", placement="shared",
+                 name=None, problem_size=None, monitor_interval=1.0):
+    """
+    Run the scheduler, workers, analytics and simulation of an experiment on already reserved nodes.
+    The Dask cluster is torn down at the end, so the nodes can be reused by another run.
+    With warm_scheduler_file, the run reuses an already running Dask cluster instead: it is only
+    reset (see reset_cluster) before the run and left running after it.
+
+    Arguments:
+        backend: Backend starting the processes, see backends.py.
+        head_node: Node running the scheduler, the analytics and mpirun.
+        nodes (list): Nodes running the simulation and the Dask workers.
         s_ini_file (str): Path to the simulation ini file.
         pdi_deisa_yml (str): Path to the PDI DEISA YAML file.
-        name (str): Name of the experiment.
-        walltime (int): Walltime for the reservation in seconds.
+        exp_name (str): Name of the run in the logs.
+        output_dir (str): Directory where the output files will be saved.
+        phases (PhaseTimer): Records the time of each phase.
         dask_workers_per_node (int): Number of Dask workers per node.
-        total_dask_workers (int, optional): Total number of Dask workers. If None, it will be reserved_nodes - 1.
+        total_dask_workers (int, optional): Total number of Dask workers. If None, it will be the number of
+            nodes running workers.
+        omp_num_threads (int): Number of OpenMP threads of the simulation.
+        monitoring (bool): Run the monitor on every node.
+        analytics_args (str): Extra command line options passed to the analytics script.
+        analytics (str, optional): Comma separated names of the analytics to run. If None, the default set is run.
+        path_to_sif_file (str, optional): Path to the Singularity image file, None to run without container.
+        startup_timeout (float): Maximum wait in seconds for the scheduler and for the workers to register.
+        warm_scheduler_file (str, optional): Path to the scheduler file of a running Dask cluster to reuse.
+        topology (str): Layout of the Dask workers. fixed: dask_workers_per_node single threaded workers
+            of 28GB. auto: derived from the cores and RAM of the nodes and from the cores used by the
+            simulation (see experiment.auto_topology), every worker started is then used by the analytics.
+            The chosen layout is saved in topology.json.
+        placement (str): Placement policy of the simulation ranks and the Dask workers, see placement.py.
+            The chosen placement is saved in placement.json.
+        name (str, optional): Name of the experiment or sweep in the run catalog. If None, the first
+            field of exp_name.
+        problem_size (int, optional): Problem size of the run in the run catalog.
+        monitor_interval (float): Sampling interval in seconds of the monitors.
     """
-    if reserved_nodes < 2:
-        raise ValueError("reserved_nodes must be greater than or equal to 2")
-    
-    if walltime <= 0:
-        raise ValueError("walltime must be greater than 0")
-    
-    if dask_workers_per_node < 1:
-        raise ValueError("dask_workers_per_node must be greater than or equal to 1")
-    
-    if total_dask_workers is None:
-        total_dask_workers = reserved_nodes - 1
-    elif total_dask_workers > reserved_nodes - 1:
-        raise ValueError("total_dask_workers must be less than or equal to reserved_nodes - 1")   
-    
     scheduler_file = extract_scheduler_path(pdi_deisa_yml)
     if scheduler_file is None:
         raise FileNotFoundError(
             f"Scheduler file not found in {pdi_deisa_yml}. Please check the file and try again.")
 
-    try:
-        # Alloc the nodes
-        jobs = alloc_nodes(reserved_nodes, walltime)
-        job_id, site = jobs[0]
-
-        print(f"[{exp_name}] Job {job_id} reserved on site {site}")
+    print(f"[{exp_name}] Head node: {head_node}")
+    print(f"[{exp_name}] Other nodes: {nodes}")
 
-        nodes = execo_g5k.oar.get_oar_job_nodes(job_id, site)
-        head_node, nodes = nodes[0], nodes[1:]
-
-        print(f"[{exp_name}] Head node: {head_node}")
-        print(f"[{exp_name}] Other nodes: {nodes}")
-
-        cores_per_node = execo_g5k.get_host_attributes(head_node)["architecture"]["nb_cores"]
-        total_simulation_cores = cores_per_node * len(nodes)
-
-        # print(f"[{exp_name}] Total simulation cores: {total_simulation_cores}")
+    try:
+        cores_per_node = backend.nb_cores(head_node)
 
         print(f"[{exp_name}] OMP_NUM_THREADS set to {omp_num_threads}")
         
         # Run monitoring if enabled
         if monitoring:
             print(f"[{exp_name}] Monitoring enabled. Starting monitoring process...")
-            monitor_processes = run_monitor([head_node]+nodes, output_dir, 1, PATH_TO_SIF_FILE, PATH_TO_MONITOR_FILE)
+            monitor_processes = run_monitor(backend, [head_node]+nodes, output_dir, monitor_interval, path_to_sif_file,
+                                            PATH_TO_MONITOR_FILE)
             print(f"[{exp_name}] Monitoring process started!")
 
         # Read the simulation configuration file
         configs = get_configs(s_ini_file)
+        mx = int(configs["mx"])
+        my = int(configs["my"])
+        mz = int(configs["mz"])
+        mpi_np = mx * my * mz
 
-        # Getting the ip addresses of the nodes
-        head_node_ip = socket.gethostbyname(head_node.address)
-        nodes_ips = []
-        for node in nodes:
-            nodes_ips.append(socket.gethostbyname(node.address))
-        print(f"[{exp_name}] Head node IP: {head_node_ip}")
-        print(f"[{exp_name}] Other nodes IPs: {nodes_ips}")
-
-        # Running the scheduler
-        print(f"[{exp_name}] Initializing the scheduler...")
-        run_scheduler(head_node, scheduler_file, output_dir, PATH_TO_SIF_FILE)
-        print(f"[{exp_name}] Scheduler started!")
-
-        # Running the Dask workers
-        print(f"[{exp_name}] Initializing the workers...")
-        run_workers(nodes, head_node_ip, dask_workers_per_node, scheduler_file, output_dir, PATH_TO_SIF_FILE)
-        print(f"[{exp_name}] Workers started!")
-
-        time.sleep(5)  # wait for the workers to start
+        plan = plan_placement(placement, nodes, cores_per_node, mpi_np, omp_num_threads)
+        print(f"[{exp_name}] Placement: {plan.to_dict()}")
+        with open(output_dir + "placement.json", "w") as f:
+            json.dump(plan.to_dict(), f)
+        total_simulation_cores = cores_per_node * len(plan.simulation_nodes)
+        if total_dask_workers is None:
+            total_dask_workers = len(plan.worker_nodes)
+
+        nthreads, memory_limit = 1, "28GB"
+        if topology == "auto" and warm_scheduler_file is None:
+            layout = auto_topology(backend.host_attributes(plan.worker_nodes[0]), plan.simulation_cores_per_worker_node)
+            dask_workers_per_node, nthreads, memory_limit = layout["nworkers"], layout["nthreads"], layout["memory_limit"]
+            total_dask_workers = dask_workers_per_node * len(plan.worker_nodes)
+            print(f"[{exp_name}] Auto topology: {layout}")
+            with open(output_dir + "topology.json", "w") as f:
+                json.dump(dict(layout, topology="auto", total_dask_workers=total_dask_workers), f)
+        elif warm_scheduler_file is None:
+            with open(output_dir + "topology.json", "w") as f:
+                json.dump({"topology": "fixed", "nworkers": dask_workers_per_node, "nthreads": nthreads,
+                           "memory_limit": memory_limit, "total_dask_workers": total_dask_workers}, f)
+
+        record_run(output_dir,
+                   exec_id=exp_name,
+                   name=name if name is not None else exp_name.split(":")[0],
+                   backend=type(backend).__name__,
+                   nodes=[node_name(head_node)] + [node_name(node) for node in nodes],
+                   reserved_nodes=len(nodes) + 1,
+                   mpi_np=mpi_np,
+                   problem_size=problem_size,
+                   grid=[int(configs["nx"]), int(configs["ny"]), int(configs["nz"])],
+                   omp_num_threads=omp_num_threads,
+                   dask_workers_per_node=dask_workers_per_node,
+                   total_dask_workers=total_dask_workers,
+                   nthreads=nthreads,
+                   memory_limit=memory_limit,
+                   topology=topology if warm_scheduler_file is None else "warm",
+                   placement=placement,
+                   analytics=analytics,
+                   analytics_args=analytics_args,
+                   host_attributes=backend.host_attributes(head_node))
+
+        if warm_scheduler_file is None:
+            worker_processes = start_cluster(backend, head_node, plan.worker_nodes, scheduler_file, output_dir, phases,
+                                             dask_workers_per_node, total_dask_workers, path_to_sif_file,
+                                             startup_timeout, exp_name, nthreads, memory_limit, plan.worker_prefix)
+        else:
+            # the simulation and the analytics find the warm cluster at the scheduler file of this run
+            print(f"[{exp_name}] Resetting the Dask cluster of {warm_scheduler_file}...")
+            with phases.phase("reset"):
+                restarted = reset_cluster(warm_scheduler_file, total_dask_workers, timeout=startup_timeout)
+                if os.path.abspath(warm_scheduler_file) != os.path.abspath(scheduler_file):
+                    shutil.copyfile(warm_scheduler_file, scheduler_file)
+            print(f"[{exp_name}] Dask cluster reset! Workers restarted: {restarted}")
+            worker_processes = None
 
         # Running the analytics
         print(f"[{exp_name}] Initializing the analytics...")
-        analytics_process = run_analytics(head_node, total_dask_workers, DEISA_PATH, ANALYTICS_PY_FILE, scheduler_file, 
-                                        output_dir, PATH_TO_SIF_FILE)
+        analytics_process = run_analytics(backend, head_node, total_dask_workers, DEISA_PATH, ANALYTICS_PY_FILE, scheduler_file, 
+                                        output_dir, path_to_sif_file, analytics_args, analytics)
         print(f"[{exp_name}] Analytics started!")
 
         # Running the simulation
         print(f"[{exp_name}] Initializing the simulation...")
-        mx = int(configs["mx"])
-        my = int(configs["my"])
-        mz = int(configs["mz"])
-        mpi_np = mx * my * mz
         assert mpi_np <= total_simulation_cores, "mpi_np must be less than or equal to total_simulation_cores"
         print(f"[{exp_name}] Running simulation with {mpi_np} MPI processes")
-        mpi_process = run_simulation(head_node, nodes, mpi_np, cores_per_node, DEISA_PATH, SIM_EXECUTABLE, s_ini_file, 
-                            pdi_deisa_yml, output_dir, PATH_TO_SIF_FILE, omp_num_threads)
+        mpi_process = run_simulation(backend, head_node, plan.simulation_nodes, mpi_np, cores_per_node, DEISA_PATH, SIM_EXECUTABLE, s_ini_file, 
+                            pdi_deisa_yml, output_dir, path_to_sif_file, omp_num_threads, plan.mpi_binding)
         print(f"[{exp_name}] Simulation started!")
 
         # Waiting for everything to finish
         print(f"[{exp_name}] Waiting for the simulation to finish...")
-        mpi_process.wait()
+        with phases.phase("simulation"):
+            mpi_process.wait()
         print(f"[{exp_name}] Simulation finished!")
         print(f"[{exp_name}] Waiting for the analytics to finish...")
-        analytics_process.wait()
+        with phases.phase("analytics"):
+            analytics_process.wait()
         print(f"[{exp_name}] Analytics finished!")
 
+        # the workers of every node are stopped once the analytics are done, unless they are reused
+        if worker_processes is not None:
+            worker_processes.kill()
+
         if monitoring:
             #kill the monitoring processes
             print(f"[{exp_name}] Stopping monitoring processes...")
-            for monitor_process in monitor_processes:
-                monitor_process.kill()
+            monitor_processes.kill()
             print(f"[{exp_name}] Monitoring processes stopped!")
 
         mpi_process_stats = mpi_process.stats()
@@ -139,47 +245,109 @@ def run_experiment(reserved_nodes: int, s_ini_file: str, pdi_deisa_yml: str, nam
              open(output_dir + "analytics_process_stats.txt", "w") as f_analytics:
             f_mpi.write(str(mpi_process_stats))
             f_analytics.write(str(analytics_process_stats))
+        if worker_processes is not None:
+            with open(output_dir + "worker_process_stats.txt", "w") as f_workers:
+                f_workers.write(str(worker_processes.stats()))
 
-    except Exception as e:
-        print(f"[{exp_name}] An error occurred: {e}")
+        phases.event("process_stats", process="simulation", stats=mpi_process_stats)
+        phases.event("process_stats", process="analytics", stats=analytics_process_stats)
+        if worker_processes is not None:
+            for stats in worker_processes.stats():
+                phases.event("process_stats", process="worker", stats=stats)
 
     finally:
-        # Delete the job
-        execo_g5k.oardel(jobs)
-        print(f"[{exp_name}] Job deleted!")
+        # stop what is left of the run, so the next run on these nodes starts from scratch
+        with phases.phase("teardown"):
+            backend.cleanup([head_node] + nodes, CLUSTER_PROCESSES if warm_scheduler_file is None else RUN_PROCESSES)
 
-        # delete scheduler file
-        if os.path.exists(scheduler_file):
+        # delete scheduler file, unless it is the one of the warm cluster
+        if os.path.exists(scheduler_file) and scheduler_file != warm_scheduler_file:
             os.remove(scheduler_file)
             print(f"[{exp_name}] Scheduler file {scheduler_file} deleted!")
 
 
+def run_experiment(reserved_nodes: int, s_ini_file: str, pdi_deisa_yml: str, name: str, walltime=10*60, 
+                   dask_workers_per_node=1, total_dask_workers=None, omp_num_threads=1,monitoring=False,
+                   analytics_args="", analytics=None, backend=None, path_to_sif_file=PATH_TO_SIF_FILE,
+                   startup_timeout=300, exp_name=None, output_dir=None, warm_scheduler_file=None,
+                   topology="fixed", placement="shared", problem_size=None, monitor_interval=1.0):
+    """
+    Run experiment with the given parameters.
+
+    Arguments:
+        reserved_nodes (int): Total number of nodes to reserve, including the head node.
+        s_ini_file (str): Path to the simulation ini file.
+        pdi_deisa_yml (str): Path to the PDI DEISA YAML file.
+        name (str): Name of the experiment.
+        walltime (int): Walltime for the reservation in seconds.
+        dask_workers_per_node (int): Number of Dask workers per node.
+        total_dask_workers (int, optional): Total number of Dask workers. If None, it will be the number of nodes
+            running workers, reserved_nodes - 1 with the shared placement.
+        analytics_args (str): Extra command line options passed to the analytics script.
+        analytics (str, optional): Comma separated names of the analytics to run. If None, the default set is run.
+        backend (optional): Backend reserving the nodes and starting the processes, see backends.py.
+            If None, the nodes are reserved with OAR.
+        path_to_sif_file (str, optional): Path to the Singularity image file, None to run without container.
+        startup_timeout (float): Maximum wait in seconds for the scheduler and for the workers to register.
+        exp_name (str, optional): Name of the run in the logs. If None, it will be name.
+        output_dir (str, optional): Directory where the output files will be saved.
+            If None, it will be the directory of s_ini_file.
+        warm_scheduler_file (str, optional): Path to the scheduler file of an already running Dask cluster
+            to reuse, e.g. started by hand next to the local backend. If None, a new cluster is started.
+        topology (str): Layout of the Dask workers, fixed or auto, see run_on_nodes.
+        placement (str): Placement policy of the simulation ranks and the Dask workers, see placement.py.
+        problem_size (int, optional): Problem size of the run, recorded in the run catalog.
+        monitor_interval (float): Sampling interval in seconds of the monitors.
+    """
+    if reserved_nodes < 2:
+        raise ValueError("reserved_nodes must be greater than or equal to 2")
+    
+    if walltime <= 0:
+        raise ValueError("walltime must be greater than 0")
+    
+    if dask_workers_per_node < 1:
+        raise ValueError("dask_workers_per_node must be greater than or equal to 1")
+    
+    if total_dask_workers is not None and total_dask_workers > reserved_nodes - 1:
+        raise ValueError("total_dask_workers must be less than or equal to reserved_nodes - 1")   
+
+    if exp_name is None:
+        exp_name = name
+    if output_dir is None:
+        output_dir = os.path.dirname(os.path.abspath(s_ini_file)) + "/"
+
+    if backend is None:
+        backend = OarBackend()
+
+    phases = PhaseTimer(EventLog(output_dir + "events_launcher.jsonl", "launcher"))
+    phases.event("run", exp_name=exp_name, reserved_nodes=reserved_nodes, dask_workers_per_node=dask_workers_per_node,
+                 omp_num_threads=omp_num_threads, topology=topology, placement=placement)
+    try:
+        # Alloc the nodes
+        with phases.phase("alloc"):
+            nodes = backend.alloc_nodes(reserved_nodes, walltime)
+        head_node, nodes = nodes[0], nodes[1:]
+
+        run_on_nodes(backend, head_node, nodes, s_ini_file, pdi_deisa_yml, exp_name, output_dir, phases,
+                     dask_workers_per_node, total_dask_workers, omp_num_threads, monitoring,
+                     analytics_args, analytics, path_to_sif_file, startup_timeout, warm_scheduler_file,
+                     topology, placement, name, problem_size, monitor_interval)
+
+    except Exception as e:
+        print(f"[{exp_name}] An error occurred: {e}")
+
+    finally:
+        phases.save(output_dir + "phases.csv")
+        phases.events.close()
+
+        # Delete the job, or stop the local processes
+        backend.release()
+        print(f"[{exp_name}] Resources released!")
+
 
 def produce_config_files(output_dir: str, mpi_np: int, problem_size: int):
-    if problem_size < 0:
-        raise ValueError("problem_size must be greater than or equal to 1")
-    # base values
-    nx=32
-    ny=32
-    nz=32
-    for i in range(problem_size):
-        if i%2 == 0:
-            nx *= 2
-        else:
-            ny *= 2
-
-    mx = 1
-    my = 1
-    mz = 1
-    log_n_mpi = math.log2(mpi_np)
-    if not log_n_mpi.is_integer():
-        raise ValueError("mpi_np must be a power of 2")
-    log_n_mpi = int(log_n_mpi)
-    for i in range(log_n_mpi):
-        if i%2 == 0:
-            mx *= 2
-        else:
-            my *= 2
+    nx, ny, nz = grid_dims(problem_size)
+    mx, my, mz = mpi_dims(mpi_np)
 
     #write the simulation ini file in output_dir
     simulation_ini_file = output_dir + f"{mpi_np}_{problem_size}.ini"
@@ -234,13 +402,36 @@ if __name__ == "__main__":
                         help="Total number of Dask workers (default: None, which means reserved_nodes - 1).")
     parser.add_argument("--monitoring", "-m", action="store_true", 
                         help="Enable monitoring of the experiment (default: False).")
+    parser.add_argument("--monitor_interval", type=float, default=1.0,
+                        help="Sampling interval in seconds of the monitors, can be below a second (default: 1).")
     parser.add_argument("--omp_num_threads", "-omp_t", type=int, default=1,
                         help="Number of OpenMP threads to use in the simulation (default: 1).")
+    parser.add_argument("--analytics_args", "-aa", type=str, default="",
+                        help="Extra options passed to the analytics script, e.g. \"--ekin_kernel fused\" (default: none).")
+    parser.add_argument("--analytics", "-a", type=str, default=None,
+                        help="Comma separated analytics to run, e.g. ekin,sum_over_xy,spectrum "
+                             "(default: None, which means the analytics script default set).")
+    parser.add_argument("--backend", "-b", type=str, default="oar", choices=sorted(BACKENDS),
+                        help="oar: reserve Grid'5000 nodes with OAR and start the processes through SSH. "
+                             "local: run everything as subprocesses of this machine (default: oar).")
+    parser.add_argument("--no_singularity", action="store_true",
+                        help="Run the commands without the Singularity image, e.g. with the local backend "
+                             "(default: False).")
+    parser.add_argument("--startup_timeout", type=float, default=300,
+                        help="Maximum wait in seconds for the scheduler and the workers to start (default: 300).")
+    parser.add_argument("--warm_scheduler_file", type=str, default=None,
+                        help="Scheduler file of an already running Dask cluster to reuse instead of starting "
+                             "one (default: None).")
+    parser.add_argument("--topology", type=str, default="fixed", choices=["fixed", "auto"],
+                        help="fixed: --dask_workers_per_node single threaded workers of 28GB. auto: workers, threads "
+                             "and memory limit derived from the nodes and the cores left by the simulation "
+                             "(default: fixed).")
+    parser.add_argument("--placement", type=str, default="shared", choices=POLICIES,
+                        help="shared: simulation and workers on every node, not pinned. dedicated: simulation and "
+                             "workers on separate nodes. partitioned: simulation and workers on every node, pinned "
+                             "to separate cores (default: shared).")
     args = parser.parse_args()
 
-    if args.total_dask_workers is None:
-        args.total_dask_workers = args.reserved_nodes - 1
-
     exp_name = f"{args.name}:{args.reserved_nodes}:{args.mpi_np}:{args.problem_size}"
     output_dir = HOME_DIR + f"/bench/experiment_result/{exp_name}/"
     if not os.path.exists(output_dir): #create output directory if it does not exist
@@ -264,4 +455,16 @@ if __name__ == "__main__":
                    dask_workers_per_node=args.dask_workers_per_node,
                    total_dask_workers=args.total_dask_workers,
                    omp_num_threads=args.omp_num_threads,
-                   monitoring=args.monitoring)
\ No newline at end of file
+                   monitoring=args.monitoring,
+                   analytics_args=args.analytics_args,
+                   analytics=args.analytics,
+                   backend=BACKENDS[args.backend](),
+                   path_to_sif_file=None if args.no_singularity else PATH_TO_SIF_FILE,
+                   startup_timeout=args.startup_timeout,
+                   exp_name=exp_name,
+                   output_dir=output_dir,
+                   warm_scheduler_file=args.warm_scheduler_file,
+                   topology=args.topology,
+                   placement=args.placement,
+                   problem_size=args.problem_size,
+                   monitor_interval=args.monitor_interval)
\ No newline at end of file
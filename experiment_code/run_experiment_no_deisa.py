@@ -1,10 +1,10 @@
-import execo_g5k
 import os
 import socket
-import time
-import math
 
 from experiment import *
+from backends import BACKENDS, OarBackend, node_name
+from catalog import record_run
+from decomposition import grid_dims, mpi_dims
 
 # this will be /home/lmascare
 HOME_DIR = os.path.expanduser("~")
@@ -19,7 +19,8 @@ PATH_TO_MONITOR_FILE = HOME_DIR + "/bench/experiment_code/monitor.py"
 
 
 def run_experiment(reserved_nodes: int, s_ini_file: str, pdi_deisa_yml: str, name: str, walltime=10*60, 
-                   omp_num_threads=1,monitoring=False):
+                   omp_num_threads=1,monitoring=False, backend=None, path_to_sif_file=PATH_TO_SIF_FILE,
+                   problem_size=None):
     """
     Run experiment with the given parameters.
 
@@ -29,6 +30,10 @@ def run_experiment(reserved_nodes: int, s_ini_file: str, pdi_deisa_yml: str, nam
         pdi_deisa_yml (str): Path to the PDI DEISA YAML file.
         name (str): Name of the experiment.
         walltime (int): Walltime for the reservation in seconds.
+        backend (optional): Backend reserving the nodes and starting the processes, see backends.py.
+            If None, the nodes are reserved with OAR.
+        path_to_sif_file (str, optional): Path to the Singularity image file, None to run without container.
+        problem_size (int, optional): Problem size of the run, recorded in the run catalog.
     """
     if reserved_nodes < 2:
         raise ValueError("reserved_nodes must be greater than or equal to 2")
@@ -36,20 +41,18 @@ def run_experiment(reserved_nodes: int, s_ini_file: str, pdi_deisa_yml: str, nam
     if walltime <= 0:
         raise ValueError("walltime must be greater than 0")
 
+    if backend is None:
+        backend = OarBackend()
+
     try:
         # Alloc the nodes
-        jobs = alloc_nodes(reserved_nodes, walltime)
-        job_id, site = jobs[0]
-
-        print(f"[{exp_name}] Job {job_id} reserved on site {site}")
-
-        nodes = execo_g5k.oar.get_oar_job_nodes(job_id, site)
+        nodes = backend.alloc_nodes(reserved_nodes, walltime)
         head_node, nodes = nodes[0], nodes[1:]
 
         print(f"[{exp_name}] Head node: {head_node}")
         print(f"[{exp_name}] Other nodes: {nodes}")
 
-        cores_per_node = execo_g5k.get_host_attributes(head_node)["architecture"]["nb_cores"]
+        cores_per_node = backend.nb_cores(head_node)
         total_simulation_cores = cores_per_node * len(nodes)
 
         # print(f"[{exp_name}] Total simulation cores: {total_simulation_cores}")
@@ -59,7 +62,7 @@ def run_experiment(reserved_nodes: int, s_ini_file: str, pdi_deisa_yml: str, nam
         # Run monitoring if enabled
         if monitoring:
             print(f"[{exp_name}] Monitoring enabled. Starting monitoring process...")
-            monitor_processes = run_monitor([head_node]+nodes, output_dir, 1, PATH_TO_SIF_FILE, PATH_TO_MONITOR_FILE)
+            monitor_processes = run_monitor(backend, [head_node]+nodes, output_dir, 1, path_to_sif_file, PATH_TO_MONITOR_FILE)
             print(f"[{exp_name}] Monitoring process started!")
 
         # Read the simulation configuration file
@@ -81,8 +84,19 @@ def run_experiment(reserved_nodes: int, s_ini_file: str, pdi_deisa_yml: str, nam
         mpi_np = mx * my * mz
         assert mpi_np <= total_simulation_cores, "mpi_np must be less than or equal to total_simulation_cores"
         print(f"[{exp_name}] Running simulation with {mpi_np} MPI processes")
-        mpi_process = run_simulation(head_node, nodes, mpi_np, cores_per_node, DEISA_PATH, SIM_EXECUTABLE, s_ini_file, 
-                            pdi_deisa_yml, output_dir, PATH_TO_SIF_FILE, omp_num_threads)
+        record_run(output_dir,
+                   exec_id=exp_name,
+                   name=name,
+                   backend=type(backend).__name__,
+                   nodes=[node_name(head_node)] + [node_name(node) for node in nodes],
+                   reserved_nodes=reserved_nodes,
+                   mpi_np=mpi_np,
+                   problem_size=problem_size,
+                   grid=[int(configs["nx"]), int(configs["ny"]), int(configs["nz"])],
+                   omp_num_threads=omp_num_threads,
+                   host_attributes=backend.host_attributes(head_node))
+        mpi_process = run_simulation(backend, head_node, nodes, mpi_np, cores_per_node, DEISA_PATH, SIM_EXECUTABLE, s_ini_file, 
+                            pdi_deisa_yml, output_dir, path_to_sif_file, omp_num_threads)
         print(f"[{exp_name}] Simulation started!")
 
         # Waiting for everything to finish
@@ -94,8 +108,7 @@ def run_experiment(reserved_nodes: int, s_ini_file: str, pdi_deisa_yml: str, nam
         if monitoring:
             #kill the monitoring processes
             print(f"[{exp_name}] Stopping monitoring processes...")
-            for monitor_process in monitor_processes:
-                monitor_process.kill()
+            monitor_processes.kill()
             print(f"[{exp_name}] Monitoring processes stopped!")
 
         mpi_process_stats = mpi_process.stats()
@@ -106,36 +119,14 @@ def run_experiment(reserved_nodes: int, s_ini_file: str, pdi_deisa_yml: str, nam
         print(f"[{exp_name}] An error occurred: {e}")
 
     finally:
-        # Delete the job
-        execo_g5k.oardel(jobs)
-        print(f"[{exp_name}] Job deleted!")
+        # Delete the job, or stop the local processes
+        backend.release()
+        print(f"[{exp_name}] Resources released!")
 
 
 def produce_config_files(output_dir: str, mpi_np: int, problem_size: int):
-    if problem_size < 0:
-        raise ValueError("problem_size must be greater than or equal to 1")
-    # base values
-    nx=32
-    ny=32
-    nz=32
-    for i in range(problem_size):
-        if i%2 == 0:
-            nx *= 2
-        else:
-            ny *= 2
-
-    mx = 1
-    my = 1
-    mz = 1
-    log_n_mpi = math.log2(mpi_np)
-    if not log_n_mpi.is_integer():
-        raise ValueError("mpi_np must be a power of 2")
-    log_n_mpi = int(log_n_mpi)
-    for i in range(log_n_mpi):
-        if i%2 == 0:
-            mx *= 2
-        else:
-            my *= 2
+    nx, ny, nz = grid_dims(problem_size)
+    mx, my, mz = mpi_dims(mpi_np)
 
     #write the simulation ini file in output_dir
     simulation_ini_file = output_dir + f"{mpi_np}_{problem_size}.ini"
@@ -185,6 +176,12 @@ if __name__ == "__main__":
                         help="Enable monitoring of the experiment (default: False).")
     parser.add_argument("--omp_num_threads", "-omp_t", type=int, default=1,
                         help="Number of OpenMP threads to use in the simulation (default: 1).")
+    parser.add_argument("--backend", "-b", type=str, default="oar", choices=sorted(BACKENDS),
+                        help="oar: reserve Grid'5000 nodes with OAR and start the processes through SSH. "
+                             "local: run everything as subprocesses of this machine (default: oar).")
+    parser.add_argument("--no_singularity", action="store_true",
+                        help="Run the commands without the Singularity image, e.g. with the local backend "
+                             "(default: False).")
     args = parser.parse_args()
 
     exp_name = f"{args.name}:{args.reserved_nodes}:{args.mpi_np}:{args.problem_size}"
@@ -208,4 +205,7 @@ if __name__ == "__main__":
                    name=args.name,
                    walltime=args.walltime,
                    omp_num_threads=args.omp_num_threads,
-                   monitoring=args.monitoring)
\ No newline at end of file
+                   monitoring=args.monitoring,
+                   backend=BACKENDS[args.backend](),
+                   path_to_sif_file=None if args.no_singularity else PATH_TO_SIF_FILE,
+                   problem_size=args.problem_size)
\ No newline at end of file
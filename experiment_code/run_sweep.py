@@ -0,0 +1,199 @@
+import os
+import time
+
+from experiment import PhaseTimer
+from backends import BACKENDS
+from placement import POLICIES
+from events import EventLog
+from run_experiment import (HOME_DIR, PATH_TO_SIF_FILE, CLUSTER_PROCESSES, produce_config_files, run_on_nodes,
+                            start_cluster)
+
+
+def parse_point(point: str, default_nodes: int) -> dict:
+    """
+    Parses a sweep point "mpi_np:problem_size[:dask_workers_per_node[:omp_num_threads[:reserved_nodes]]]".
+
+    Arguments:
+        point (str): The sweep point.
+        default_nodes (int): Number of nodes, including the head node, of the points that do not set it.
+    """
+    values = [int(v) for v in point.split(":")]
+    if not 2 <= len(values) <= 5:
+        raise ValueError(f"Invalid sweep point {point}")
+    values += [1, 1, default_nodes][len(values) - 2:]
+    return dict(zip(["mpi_np", "problem_size", "dask_workers_per_node", "omp_num_threads", "reserved_nodes"], values))
+
+
+def run_sweep(points: list, name: str, walltime: int, backend, monitoring=False, analytics_args="",
+              analytics=None, path_to_sif_file=PATH_TO_SIF_FILE, startup_timeout=300, warm=False,
+              topology="fixed", placement="shared", monitor_interval=1.0):
+    """
+    Runs the sweep points back to back on a single reservation of the largest number of nodes
+    they need. Each point runs on the head node and the first reserved_nodes - 1 other nodes, and
+    the Dask cluster is torn down and restarted between points.
+    With warm, the Dask cluster is kept running between consecutive points with the same nodes and
+    workers per node, and only reset before each of them (see experiment.reset_cluster).
+
+    Arguments:
+        points (list): Sweep points, see parse_point.
+        name (str): Name of the sweep.
+        walltime (int): Walltime for the reservation in seconds, for all the points.
+        backend: Backend reserving the nodes and starting the processes, see backends.py.
+        monitoring (bool): Run the monitor on every node.
+        analytics_args (str): Extra command line options passed to the analytics script.
+        analytics (str, optional): Comma separated names of the analytics to run. If None, the default set is run.
+        path_to_sif_file (str, optional): Path to the Singularity image file, None to run without container.
+        startup_timeout (float): Maximum wait in seconds for the scheduler and for the workers to register.
+        warm (bool): Reuse the Dask cluster between points.
+        topology (str): Layout of the Dask workers, fixed or auto, see run_experiment.run_on_nodes.
+            The warm cluster always uses the fixed layout.
+        placement (str): Placement policy of the simulation ranks and the Dask workers, see placement.py.
+            The warm cluster always uses the shared placement.
+        monitor_interval (float): Sampling interval in seconds of the monitors.
+    """
+    reserved_nodes = max(point["reserved_nodes"] for point in points)
+    if min(point["reserved_nodes"] for point in points) < 2:
+        raise ValueError("reserved_nodes must be greater than or equal to 2")
+
+    # the output directories are created first, so a name clash does not waste the reservation
+    runs = []
+    for point in points:
+        exp_name = (f"{name}:{point['reserved_nodes']}:{point['mpi_np']}:{point['problem_size']}:"
+                    f"{point['dask_workers_per_node']}:{point['omp_num_threads']}")
+        output_dir = HOME_DIR + f"/bench/experiment_result/{exp_name}/"
+        if os.path.exists(output_dir):
+            raise FileExistsError(
+                f"Output directory {output_dir} already exists. Please remove it or choose a different name.")
+        runs.append((point, exp_name, output_dir))
+
+    # warm cluster: (reserved_nodes, dask_workers_per_node) it was started for, and its scheduler file
+    cluster_dir = HOME_DIR + f"/bench/experiment_result/{name}_cluster/"
+    cluster_layout, cluster_scheduler_file = None, None
+
+    sweep_phases = PhaseTimer()
+    try:
+        with sweep_phases.phase("alloc"):
+            all_nodes = backend.alloc_nodes(reserved_nodes, walltime)
+        head_node, other_nodes = all_nodes[0], all_nodes[1:]
+
+        for i, (point, exp_name, output_dir) in enumerate(runs):
+            print(f"[{name}] Point {i + 1}/{len(runs)}: {exp_name}")
+            os.makedirs(output_dir)
+            simulation_ini_file, pdi_deisa_yml_file = produce_config_files(
+                output_dir, point["mpi_np"], point["problem_size"])
+
+            nodes = other_nodes[:point["reserved_nodes"] - 1]
+
+            phases = PhaseTimer(EventLog(output_dir + "events_launcher.jsonl", "launcher"))
+            phases.event("run", exp_name=exp_name, sweep=name, **point, topology=topology, placement=placement,
+                         warm=warm)
+            try:
+                layout = (point["reserved_nodes"], point["dask_workers_per_node"])
+                if warm and layout != cluster_layout:
+                    if cluster_layout is not None:
+                        backend.cleanup(all_nodes, CLUSTER_PROCESSES)
+                    cluster_layout, cluster_scheduler_file = None, cluster_dir + "scheduler.json"
+                    os.makedirs(cluster_dir, exist_ok=True)
+                    try:
+                        with sweep_phases.phase(f"cluster:{layout[0]}:{layout[1]}"):
+                            start_cluster(backend, head_node, nodes, cluster_scheduler_file, cluster_dir, phases,
+                                          dask_workers_per_node=point["dask_workers_per_node"],
+                                          path_to_sif_file=path_to_sif_file,
+                                          startup_timeout=startup_timeout,
+                                          exp_name=name)
+                    except Exception:
+                        # a partly started cluster would be left running for the rest of the sweep
+                        backend.cleanup(all_nodes, CLUSTER_PROCESSES)
+                        raise
+                    cluster_layout = layout
+
+                with sweep_phases.phase(exp_name):
+                    run_on_nodes(backend, head_node, nodes,
+                                 simulation_ini_file, pdi_deisa_yml_file, exp_name, output_dir, phases,
+                                 dask_workers_per_node=point["dask_workers_per_node"],
+                                 omp_num_threads=point["omp_num_threads"],
+                                 monitoring=monitoring,
+                                 analytics_args=analytics_args,
+                                 analytics=analytics,
+                                 path_to_sif_file=path_to_sif_file,
+                                 startup_timeout=startup_timeout,
+                                 warm_scheduler_file=cluster_scheduler_file if warm else None,
+                                 topology=topology,
+                                 placement=placement,
+                                 name=name,
+                                 problem_size=point["problem_size"],
+                                 monitor_interval=monitor_interval)
+            except Exception as e:
+                # the next points still run on the reservation
+                print(f"[{exp_name}] An error occurred: {e}")
+            finally:
+                phases.save(output_dir + "phases.csv")
+                phases.events.close()
+
+    finally:
+        backend.release()
+        print(f"[{name}] Resources released!")
+
+    return sweep_phases
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a sweep of experiments on a single reservation.")
+    parser.add_argument("--points", "-p", type=str, required=True,
+                        help="Comma separated sweep points mpi_np:problem_size[:dask_workers_per_node"
+                             "[:omp_num_threads[:reserved_nodes]]], e.g. 8:0,16:0,32:0:1:1:3.")
+    parser.add_argument("--reserved_nodes", "-n", type=int, default=2,
+                        help="Number of nodes (including head node) of the points that do not set it (default: 2).")
+    parser.add_argument("--name", "-nm", type=str, required=True, help="Name of the sweep.")
+    parser.add_argument("--walltime", "-t", type=int, default=60*60,
+                        help="Walltime in seconds for the whole sweep (default: 3600).")
+    parser.add_argument("--monitoring", "-m", action="store_true",
+                        help="Enable monitoring of the experiments (default: False).")
+    parser.add_argument("--monitor_interval", type=float, default=1.0,
+                        help="Sampling interval in seconds of the monitors, can be below a second (default: 1).")
+    parser.add_argument("--analytics_args", "-aa", type=str, default="",
+                        help="Extra options passed to the analytics script, e.g. \"--ekin_kernel fused\" (default: none).")
+    parser.add_argument("--analytics", "-a", type=str, default=None,
+                        help="Comma separated analytics to run, e.g. ekin,sum_over_xy,spectrum "
+                             "(default: None, which means the analytics script default set).")
+    parser.add_argument("--backend", "-b", type=str, default="oar", choices=sorted(BACKENDS),
+                        help="oar: reserve Grid'5000 nodes with OAR and start the processes through SSH. "
+                             "local: run everything as subprocesses of this machine (default: oar).")
+    parser.add_argument("--no_singularity", action="store_true",
+                        help="Run the commands without the Singularity image, e.g. with the local backend "
+                             "(default: False).")
+    parser.add_argument("--startup_timeout", type=float, default=300,
+                        help="Maximum wait in seconds for the scheduler and the workers to start (default: 300).")
+    parser.add_argument("--warm", "-w", action="store_true",
+                        help="Keep the Dask cluster running between points with the same nodes and workers per node, "
+                             "and only reset it between them (default: False).")
+    parser.add_argument("--topology", type=str, default="fixed", choices=["fixed", "auto"],
+                        help="fixed: single threaded workers of 28GB. auto: workers, threads and memory limit derived "
+                             "from the nodes and the cores left by the simulation of each point (default: fixed).")
+    parser.add_argument("--placement", type=str, default="shared", choices=POLICIES,
+                        help="shared: simulation and workers on every node, not pinned. dedicated: simulation and "
+                             "workers on separate nodes. partitioned: simulation and workers on every node, pinned "
+                             "to separate cores (default: shared).")
+    args = parser.parse_args()
+    if args.warm and args.topology == "auto":
+        parser.error("--topology auto can not be used with --warm")
+    if args.warm and args.placement != "shared":
+        parser.error("--warm requires --placement shared")
+
+    name = f"{args.name}_{int(time.time())}"
+    points = [parse_point(point, args.reserved_nodes) for point in args.points.split(",")]
+    print(f"[{name}] {len(points)} points on {max(p['reserved_nodes'] for p in points)} nodes")
+
+    sweep_phases = run_sweep(points, name, args.walltime, BACKENDS[args.backend](),
+                             monitoring=args.monitoring,
+                             analytics_args=args.analytics_args,
+                             analytics=args.analytics,
+                             path_to_sif_file=None if args.no_singularity else PATH_TO_SIF_FILE,
+                             startup_timeout=args.startup_timeout,
+                             warm=args.warm,
+                             topology=args.topology,
+                             placement=args.placement,
+                             monitor_interval=args.monitor_interval)
+    sweep_phases.save(HOME_DIR + f"/bench/experiment_result/{name}_sweep_phases.csv")
@@ -9,146 +9,295 @@
 #
 ###################################################################################################
 
-from deisa import Deisa
 import os
 import sys
+import argparse
 import dask
-import dask.array as da
-from dask.distributed import performance_report
+from dask.distributed import performance_report, get_task_stream, wait
 import time
 from distributed.diagnostics import MemorySampler
-from pprint import pformat
 import matplotlib.pyplot as plt
 
-# Initialize Deisa
-if len(sys.argv) < 4:
-    raise Exception("[Analytics] Number of dask workers not set. Usage: python3 bench_deisa.py <n_dask_workers> <scheduler_file_name> <output_dir>")
-else:
-    nb_workers = int(sys.argv[1])
-    scheduler_file_name=str(sys.argv[2])
-    output_dir = str(sys.argv[3])
+import numpy as np
+
+from kernels import EKIN_KERNELS, FFT_KERNELS, radial_bins
+from registry import ANALYTICS, DEFAULT_ANALYTICS, Context, get_analytics, select
+from streaming import stream_timesteps
+from timing import output_task_times
+from transfers import save_transfers
+from task_stream import save_task_stream, save_dependencies
+from memory import WorkerMemorySampler
+from stride import AdaptiveStride, latest_available_step
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "experiment_code"))
+from events import EventLog
+
+# the body runs behind a main guard, LocalCluster spawns its workers by importing this script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deisa in-situ analytics benchmark.")
+    parser.add_argument("nb_workers", type=int, help="Number of Dask workers.")
+    parser.add_argument("scheduler_file_name", type=str, help="Path to the scheduler file.")
+    parser.add_argument("output_dir", type=str, help="Directory where the output files will be saved.")
+    parser.add_argument("--ekin_kernel", type=str, default="naive", choices=sorted(EKIN_KERNELS),
+                        help="Kernel used to compute the kinetic energy (default: naive).")
+    parser.add_argument("--fft", type=str, default="plane", choices=sorted(FFT_KERNELS),
+                        help="plane: gather each xy plane before fft2. "
+                             "slab: row ffts, one transpose, column ffts (default: plane).")
+    parser.add_argument("--analytics", type=str, default=DEFAULT_ANALYTICS,
+                        help=f"Comma separated analytics to run, among {', '.join(sorted(ANALYTICS))}. Only the "
+                             f"z planes they read are fetched. Each block holds every variable, so selecting "
+                             f"variables does not reduce the transfers (default: {DEFAULT_ANALYTICS}).")
+    parser.add_argument("--z_pos", type=int, default=None, help="Z plane of the analytics (default: Z-dim / 3).")
+    parser.add_argument("--t_stride", type=int, default=1, help="Stride between the analysed timesteps (default: 1).")
+    parser.add_argument("--check_contract", action="store_true",
+                        help="Send the selection to the Deisa bridges, so blocks that are not read are never shipped "
+                             "(default: False).")
+    parser.add_argument("--mode", type=str, default="persist", choices=["persist", "batch", "streaming"],
+                        help="persist: persist ekin for the whole run, then compute the outputs one by one. "
+                             "batch: compute all the outputs in a single compute call. "
+                             "streaming: compute the outputs one timestep at a time, which bounds the intermediate "
+                             "results on the workers. Only the synthetic source also releases the blocks of the "
+                             "analysed timesteps, the Deisa blocks stay on the workers (default: persist).")
+    parser.add_argument("--max_inflight", type=int, default=2,
+                        help="Streaming mode only, number of timesteps processed at the same time (default: 2).")
+    parser.add_argument("--adaptive_stride", action="store_true",
+                        help="Streaming mode only, raise or lower the stride between analysed timesteps to keep "
+                             "the lag behind the simulation under --target_lag (default: False).")
+    parser.add_argument("--target_lag", type=int, default=10,
+                        help="Adaptive stride only, maximum lag in timesteps (default: 10).")
+    parser.add_argument("--max_stride", type=int, default=16,
+                        help="Adaptive stride only, maximum stride (default: 16).")
+    parser.add_argument("--source", type=str, default="deisa", choices=["deisa", "synthetic"],
+                        help="deisa: blocks sent by the simulation. synthetic: blocks scattered to the workers by a "
+                             "producer thread at --rate, "
+                             "see synthetic.py. With synthetic, scheduler_file_name may be \"local\" to start a "
+                             "LocalCluster (default: deisa).")
+    parser.add_argument("--mpi_np", type=int, default=32,
+                        help="Synthetic source only, number of simulated ranks (default: 32).")
+    parser.add_argument("--problem_size", type=int, default=0,
+                        help="Synthetic source only, problem size as in run_experiment.py (default: 0).")
+    parser.add_argument("--timesteps", type=int, default=500,
+                        help="Synthetic source only, number of timesteps (default: 500).")
+    parser.add_argument("--rate", type=float, default=10.0,
+                        help="Synthetic source only, timesteps produced per second (default: 10).")
+    args = parser.parse_args()
+    if args.adaptive_stride and args.mode != "streaming":
+        parser.error("--adaptive_stride requires --mode streaming")
+
+    # Initialize Deisa
+    nb_workers = args.nb_workers
+    scheduler_file_name = args.scheduler_file_name
+    output_dir = args.output_dir
     print(f"[Analytics] parameters: dask workers - {nb_workers}, schedueler_file - {scheduler_file_name}, output_dir - {output_dir}", flush=True)
+    print(f"[Analytics] ekin kernel: {args.ekin_kernel}, fft: {args.fft}, mode: {args.mode}", flush=True)
+
+    # timing events of every phase, read by the evaluation scripts
+    events = EventLog(f"{output_dir}events_analytics.jsonl", "analytics")
+    events.event("start", args=vars(args))
+
+    with events.phase("deisa_init"):
+        if args.source == "deisa":
+            from deisa import Deisa
+            deisa = Deisa(scheduler_file_name=scheduler_file_name, 
+                          nb_workers=nb_workers,
+                          use_ucx=False)
+        else:
+            from synthetic import SyntheticDeisa
+            print(f"[Analytics] synthetic source: {args.mpi_np} ranks, problem size {args.problem_size}, "
+                  f"{args.timesteps} timesteps at {args.rate}/s", flush=True)
+            deisa = SyntheticDeisa(scheduler_file_name, nb_workers, mpi_np=args.mpi_np, problem_size=args.problem_size,
+                                   timesteps=args.timesteps, rate=args.rate)
+
+    print("[Analytics] deisa initialized",flush=True)
+
+    print("[Analytics] getting client", flush=True)
+    client = deisa.get_client()
+    # Get client
+    print("[Analytics] getting deisa array", flush=True)
+    with events.phase("get_arrays"):
+        arrays = deisa.get_deisa_arrays()
+
+    print("[Analytics] arrays received", flush=True)
+
+    # Select data
+    gt = arrays["global_t"][:, :, :, :, :]
+    mx = len(gt[0, 0, 0, 0, :])
+    my = len(gt[0, 0, 0, :, 0])
+    mz = len(gt[0, 0, :, 0, 0])
+
+    mt = len(gt[:, 0, 0, 0, 0])
+
+    assert isinstance(mx, int)
+    assert isinstance(my, int)
+    assert isinstance(mz, int)
+    print("[Analytics] X-dim =", mx, flush=True)
+    print("[Analytics] Y-dim =", my, flush=True)
+    print("[Analytics] Z-dim =", mz, flush=True)
+    events.event("arrays_received", x_dim=mx, y_dim=my, z_dim=mz, timesteps=mt)
+    z_pos = args.z_pos if args.z_pos is not None else int(mz / 3)
+    print("[Analytics] getting slice at z =", z_pos, flush=True)
+
+    t_stride = args.t_stride
+
+    analytics = get_analytics(args.analytics.split(","))
+
+
+    # collections whose graphs are computed, their task dependencies are saved with the task stream
+    collections = []
+
+
+    def persist(x):
+        collections.append(x)
+        # persist only submits the graph, the phase waits for the data so it covers its materialization
+        with events.phase("persist"):
+            persisted = client.persist(x)
+            wait(persisted)
+        return persisted
+
+
+    context = Context(mz, z_pos, EKIN_KERNELS[args.ekin_kernel], FFT_KERNELS[args.fft],
+                      persist=persist if args.mode == "persist" else None)
+
+    # only the variables and planes read by the analytics are fetched
+    with events.phase("selection"):
+        selection = select(arrays["global_t"], analytics, context, t_stride, template=gt)
+    print(f"[Analytics] analytics: {[a.name for a in analytics]}, variables: {selection.variables} "
+          f"({len(selection.variables)}/{gt.shape[1]}), planes: {selection.planes}", flush=True)
+
+    # Check contract
+    if args.check_contract:
+        with events.phase("check_contract"):
+            arrays.check_contract()
+
+    # Construct a lazy task graph
+    ms = MemorySampler()
+
+    with performance_report(filename=f"{output_dir}dask-report.html"), dask.config.set(
+        array_optimize=None
+    ), ms.sample("collection 1"), get_task_stream(client) as run_task_stream, WorkerMemorySampler(
+        client, f"{output_dir}worker_memory.csv"
+    ):
+        print(f"[Analytics] starting computation at {time.time()}", flush=True)
+
+        if args.source == "synthetic" and args.mode != "streaming":
+            # the synthetic blocks only exist once produced, the whole run is read at once
+            with events.phase("wait_data"):
+                deisa.wait_for_step(mt - 1)
+
+        if args.mode == "persist":
+            # in persist mode, the ekin shared by the analytics is persisted when first built
+            # better to lessen the memory used by .persist methods
+            # also in general, we do not need to persist in chains of computation, in this specific case,
+            # I think we do sum_over_xy deletes ekin_persisted, causing later computations to be recomputed
+            # thus making it fail -- also, not super clear why rechunking is needed.
+            outputs = {a.name: a.fn(selection) for a in analytics}
+            collections.extend(outputs.values())
+
+            # output task graph
+            # outputs["sum_over_xy"].visualize(filename="sum_over_xy")
+            # selection.array.visualize(filename="slice")
+            # outputs["fourier"].visualize(filename="fourier_amplitudes")
+
+            results = {}
+            for a in analytics:
+                ts = time.time()
+                with events.phase("compute", analytics=a.name, label=a.label):
+                    results[a.name] = outputs[a.name].compute()
+                te = time.time()
+                print(f"[Analytics] time {a.label}: {te-ts}")
+
+        elif args.mode == "batch":
+            # a single graph for all the outputs, so the shared inputs are only read once
+            outputs = {a.label: a.fn(selection) for a in analytics}
+            collections.extend(outputs.values())
+
+            with get_task_stream(client) as task_stream:
+                ts = time.time()
+                with events.phase("compute", analytics="batch", label="batch"):
+                    results = dict(zip([a.name for a in analytics], dask.compute(*outputs.values())))
+                te = time.time()
+
+            # the outputs are computed together, so their wall times overlap: the task compute time of
+            # each output is reported instead, the wall time is the one of the whole batch
+            for label, task_time in output_task_times(task_stream.data, outputs).items():
+                events.event("output_task_time", label=label, duration=task_time)
+                print(f"[Analytics] task time {label}: {task_time}")
+            print(f"[Analytics] time batch: {te-ts}")
+
+        else:
+            # only the intermediate results of a few timesteps live on the workers at any time, results
+            # are gathered step by step. The Deisa blocks are not released, only the synthetic ones are
+            def build_outputs(t):
+                if args.source == "synthetic":
+                    deisa.wait_for_step(t * t_stride)
+                step = selection.timestep(t)
+                step_outputs = {a.name: a.fn(step) for a in analytics}
+                collections.extend(step_outputs.values())
+                return step_outputs
+
+            controller = AdaptiveStride(args.target_lag, args.max_stride) if args.adaptive_stride else None
+            if args.source == "synthetic":
+                latest_step = deisa.latest_step
+            else:
+                latest_step = lambda: latest_available_step(client, gt)
+
+            steps = {a.name: [] for a in analytics}
+            analysed_steps = []
+            ts = time.time()
+            with events.phase("compute", analytics="streaming", label="streaming"):
+                for t, step_results, elapsed in stream_timesteps(client, build_outputs, selection.array.shape[0],
+                                                                 max_inflight=args.max_inflight, controller=controller):
+                    for name, result in step_results.items():
+                        steps[name].append(result)
+                    analysed_steps.append(t * t_stride)
+                    if args.source == "synthetic":
+                        deisa.release(t * t_stride)
+                    events.event("step", step=t * t_stride, duration=elapsed,
+                                 stride=controller.stride if controller is not None else t_stride)
+                    print(f"[Analytics] step {t} time: {elapsed}", flush=True)
+                    if controller is not None:
+                        controller.update(latest_step(), t * t_stride)
+            te = time.time()
+            print(f"[Analytics] time streaming: {te-ts}")
+
+            if controller is not None:
+                controller.save(f"{output_dir}stride.csv")
+
+            # every analytics has time as first axis
+            results = {name: np.concatenate(step_results) for name, step_results in steps.items()}
+
+
+    with events.phase("diagnostics"):
+        # diagnostics info
+        l1 = client.run(lambda dask_worker: dask_worker.transfer_outgoing_log)
+        l2 = client.run(lambda dask_worker: dask_worker.transfer_incoming_log)
+
+        save_transfers(f"{output_dir}transfers.csv", incoming=l2, outgoing=l1)
+        save_task_stream(f"{output_dir}task_stream.csv", run_task_stream.data)
+        save_dependencies(f"{output_dir}task_dependencies.csv", collections, run_task_stream.data)
+
+        with open(f"{output_dir}results.txt", "w") as f3:
+            for a in analytics:
+                print(f"{a.result}={results[a.name]!r}", file=f3)
+            if args.adaptive_stride:
+                print(f"{analysed_steps=}", file=f3)
+            if "spectrum" in results:
+                _, kvals, _ = radial_bins(my, mx)
+                print(f"{kvals=}", file=f3)
+
+        # cluster total of the MemorySampler, the per worker samples are in worker_memory.csv
+        ms.to_pandas(align=True).to_csv(f"{output_dir}memory_sampler.csv")
+        res = ms.plot(align=True)
+        if isinstance(res, plt.Axes):
+            res = res.get_figure()
+
+        res.savefig(f"{output_dir}plot.png")
 
-deisa = Deisa(scheduler_file_name=scheduler_file_name, 
-              nb_workers=nb_workers,
-              use_ucx=False)
-
-print("[Analytics] deisa initialized",flush=True)
-
-print("[Analytics] getting client", flush=True)
-client = deisa.get_client()
-# Get client
-print("[Analytics] getting deisa array", flush=True)
-arrays = deisa.get_deisa_arrays()
-
-print("[Analytics] arrays received", flush=True)
-
-# Select data
-gt = arrays["global_t"][:, :, :, :, :]
-mx = len(gt[0, 0, 0, 0, :])
-my = len(gt[0, 0, 0, :, 0])
-mz = len(gt[0, 0, :, 0, 0])
-
-mt = len(gt[:, 0, 0, 0, 0])
-
-assert isinstance(mx, int)
-assert isinstance(my, int)
-assert isinstance(mz, int)
-print("[Analytics] X-dim =", mx, flush=True)
-print("[Analytics] Y-dim =", my, flush=True)
-print("[Analytics] Z-dim =", mz, flush=True)
-z_pos = int(mz / 3)
-print("[Analytics] getting slice at z =", z_pos, flush=True)
-
-t_stride = 1
-
-slice = arrays["global_t"][0:mt:t_stride, :, z_pos, :, :]
-
-# Check contract
-# arrays.check_contract()
-
-# Construct a lazy task graph
-id = 0
-iu = 2
-iv = 3
-iw = 4
-ms = MemorySampler()
-
-with performance_report(filename=f"{output_dir}dask-report.html"), dask.config.set(
-    array_optimize=None
-), ms.sample("collection 1"):
-    print(f"[Analytics] starting computation at {time.time()}", flush=True)
-    ekin_deisa = (
-        0.5
-        * slice[:, id, :, :]
-        * (
-            slice[:, iu, :, :] * slice[:, iu, :, :]
-            + slice[:, iv, :, :] * slice[:, iv, :, :]
-            + slice[:, iw, :, :] * slice[:, iw, :, :]
-        )
-        / (mz * mz)
-    )
-    # better to lessen the memory used by .persist methods
-    # also in general, we do not need to persist in chains of computation, in this specific case,
-    # I think we do sum_over_xy deletes ekin_persisted, causing later computations to be recomputed
-    # thus making it fail -- also, not super clear why rechunking is needed.
-    ekin_persisted = client.persist(ekin_deisa)
-
-    sum_over_xy = ekin_persisted.sum(axis=(1, 2))
-
-    ekin_deisa_rechunked = ekin_persisted.rechunk(
-        {0: 1, 1: -1, 2: -1}
-    )  # no chunking along dim 0, 1, and 2
-
-    # npix = ekin_deisa_rechunked.shape[1]
-    ekin_fft2 = da.fft.fft2(ekin_deisa_rechunked)  # fft over the last two axes
-    fourier_amplitudes = da.absolute(ekin_fft2) ** 2
-    # fourier_amplitudes = fourier_amplitudes.reshape(mt/t_stride, mx*my)
-    # kfreq = da.fft.fftfreq(npix) * npix
-    # kfreq2D = da.meshgrid(kfreq, kfreq)
-    # knrm = da.sqrt(kfreq2D[0] ** 2 + kfreq2D[1] ** 2)
-    # knrm = knrm.flatten()
-    # kbins = da.arange(0.5, npix // 2 + 1, 1.0)
-    # kvals = 0.5 * (kbins[1:] + kbins[:-1])
-
-    # output task graph
-    # sum_over_xy.visualize(filename="sum_over_xy")
-    # slice.visualize(filename="slice")
-    # fourier_amplitudes.visualize(filename="fourier_amplitudes")
-
-    ts = time.time()
-    res2 = ekin_persisted.compute()
-    te = time.time()
-    print(f"[Analytics] time ekin: {te-ts}")
-
-    ts = time.time()
-    res3 = sum_over_xy.compute()
-    te = time.time()
-    print(f"[Analytics] time sum over xy: {te-ts}")
-
-    ts = time.time()
-    res4 = fourier_amplitudes.compute()
-    te = time.time()
-    print(f"[Analytics] time fourier: {te-ts}")
-
-
-# diagnostics info
-l1 = client.run(lambda dask_worker: dask_worker.transfer_outgoing_log)
-l2 = client.run(lambda dask_worker: dask_worker.transfer_incoming_log)
-
-with open(f"{output_dir}outgoing.txt", "w") as f1, open(f"{output_dir}incoming.txt", "w") as f2, open(
-    f"{output_dir}results.txt", "w"
-) as f3:
-    f1.write(pformat(l1))
-    f2.write(pformat(l2))
-    print(f"{res2=}\n{res3=}\n{res4=}", file=f3)
-
-res = ms.plot(align=True)
-if isinstance(res, plt.Axes):
-    res = res.get_figure()
-
-res.savefig(f"{output_dir}plot.png")
-
-print("[Analytics] Done ", flush=True)
-# deisa.wait_for_last_bridge_and_shutdown()
-client.close()
+    print("[Analytics] Done ", flush=True)
+    with events.phase("teardown"):
+        # deisa.wait_for_last_bridge_and_shutdown()
+        if args.source == "synthetic":
+            deisa.close()
+        else:
+            client.close()
+    events.close()
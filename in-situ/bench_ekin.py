@@ -0,0 +1,76 @@
+"""
+Before/after benchmark of the ekin kernels on a LocalCluster.
+
+A random global_t array with the same decomposition as the experiments is persisted on the
+workers, then the ekin of a z slice is persisted with each kernel. Graph size, wall time and
+peak cluster memory are reported for each kernel.
+
+Usage: python3 bench_ekin.py --mpi_np 32 --problem_size 0 --timesteps 50
+"""
+import os
+import sys
+import time
+import argparse
+import dask
+import dask.array as da
+from dask.distributed import Client, LocalCluster, wait
+from distributed.diagnostics import MemorySampler
+
+from kernels import EKIN_KERNELS
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "experiment_code"))
+from decomposition import grid_dims, mpi_dims
+
+NVAR = 9
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the ekin kernels on a LocalCluster.")
+    parser.add_argument("--mpi_np", "-np", type=int, default=32, help="Number of simulation ranks (default: 32).")
+    parser.add_argument("--problem_size", "-ps", type=int, default=0, help="Problem size (default: 0).")
+    parser.add_argument("--timesteps", "-nt", type=int, default=50, help="Number of timesteps (default: 50).")
+    parser.add_argument("--n_workers", "-w", type=int, default=4, help="Number of local Dask workers (default: 4).")
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="Repetitions per kernel (default: 3).")
+    args = parser.parse_args()
+
+    nx, ny, nz = grid_dims(args.problem_size)
+    mx, my, mz = mpi_dims(args.mpi_np)
+    chunks = (1, NVAR, nz // mz, ny // my, nx // mx)
+    print(f"[Bench] global_t shape {(args.timesteps, NVAR, nz, ny, nx)}, chunks {chunks}", flush=True)
+
+    cluster = LocalCluster(n_workers=args.n_workers, threads_per_worker=1)
+    client = Client(cluster)
+
+    gt = da.random.random((args.timesteps, NVAR, nz, ny, nx), chunks=chunks)
+    gt = client.persist(gt)
+    wait(gt)
+
+    z_pos = int(nz / 3)
+    slice = gt[:, :, z_pos, :, :]
+
+    ms = MemorySampler()
+    results = {}
+    with dask.config.set(array_optimize=None):
+        for kernel_name, kernel in EKIN_KERNELS.items():
+            ekin = kernel(slice, 0, 2, 3, 4, nz)
+            graph_size = len(ekin.__dask_graph__()) - len(slice.__dask_graph__())
+
+            times = []
+            with ms.sample(kernel_name, measure="managed", interval=0.05):
+                for _ in range(args.repeat):
+                    ts = time.time()
+                    ekin_persisted = client.persist(ekin)
+                    wait(ekin_persisted)
+                    te = time.time()
+                    times.append(te - ts)
+                    del ekin_persisted
+
+            results[kernel_name] = (graph_size, min(times))
+
+    memory = ms.to_pandas()
+    baseline = memory.min().min()
+    for kernel_name, (graph_size, best_time) in results.items():
+        peak = (memory[kernel_name].max() - baseline) / 2**20
+        print(f"[Bench] {kernel_name}: tasks {graph_size}, best time {best_time:.4f}s, peak managed memory {peak:.1f} MiB")
+
+    client.close()
+    cluster.close()
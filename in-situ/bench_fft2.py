@@ -0,0 +1,75 @@
+"""
+Benchmark of the fft stages on a LocalCluster: whole-plane rechunk + fft2 against the slab
+decomposed fft.
+
+For each problem size, a random ekin array with the grid and the decomposition generated by
+produce_config_files (32*2^k grids) is persisted on the workers, then the fourier amplitudes
+are persisted with each fft kernel. Wall time and bytes exchanged between workers are reported.
+
+Usage: python3 bench_fft2.py --mpi_np 32 --problem_sizes 0,1,2,3 --timesteps 50
+"""
+import os
+import sys
+import time
+import argparse
+import dask
+import dask.array as da
+from dask.distributed import Client, LocalCluster, wait
+
+from kernels import FFT_KERNELS
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "experiment_code"))
+from decomposition import grid_dims, mpi_dims
+
+
+def transferred_bytes(client):
+    logs = client.run(lambda dask_worker: list(dask_worker.transfer_incoming_log))
+    return sum(entry["total"] for log in logs.values() for entry in log)
+
+
+def clear_transfer_logs(client):
+    client.run(lambda dask_worker: dask_worker.transfer_incoming_log.clear())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the fft kernels on a LocalCluster.")
+    parser.add_argument("--mpi_np", "-np", type=int, default=32, help="Number of simulation ranks (default: 32).")
+    parser.add_argument("--problem_sizes", "-ps", type=str, default="0,1,2,3",
+                        help="Comma separated problem sizes (default: 0,1,2,3).")
+    parser.add_argument("--timesteps", "-nt", type=int, default=50, help="Number of timesteps (default: 50).")
+    parser.add_argument("--n_workers", "-w", type=int, default=4, help="Number of local Dask workers (default: 4).")
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="Repetitions per kernel (default: 3).")
+    args = parser.parse_args()
+
+    # keep every transfer of a run in the worker logs
+    with dask.config.set({"distributed.admin.low-level-log-length": 10**6}):
+        cluster = LocalCluster(n_workers=args.n_workers, threads_per_worker=1)
+        client = Client(cluster)
+
+    mx, my, mz = mpi_dims(args.mpi_np)
+    with dask.config.set(array_optimize=None):
+        for problem_size in [int(p) for p in args.problem_sizes.split(",")]:
+            nx, ny, nz = grid_dims(problem_size)
+            chunks = (1, ny // my, nx // mx)
+            ekin = client.persist(da.random.random((args.timesteps, ny, nx), chunks=chunks))
+            wait(ekin)
+
+            for kernel_name, kernel in FFT_KERNELS.items():
+                fourier_amplitudes = kernel(ekin)
+                times = []
+                for _ in range(args.repeat):
+                    clear_transfer_logs(client)
+                    ts = time.time()
+                    persisted = client.persist(fourier_amplitudes)
+                    wait(persisted)
+                    te = time.time()
+                    times.append(te - ts)
+                    del persisted
+                nbytes = transferred_bytes(client)
+                print(f"[Bench] problem size {problem_size} ({ny}x{nx}), {kernel_name}: "
+                      f"best time {min(times):.4f}s, transferred {nbytes / 2**20:.1f} MiB", flush=True)
+
+            del ekin
+
+    client.close()
+    cluster.close()
@@ -0,0 +1,139 @@
+"""
+Benchmark of the node-local shared memory handoff against the TCP path on a LocalCluster.
+
+Producer processes stand in for the simulation ranks of one node (no MPI, no PDI). Each one
+produces a block per timestep, with the shape of a rank block of global_t:
+- tcp: the block is scattered to the worker, as the Deisa bridges do, and its future is
+  published in a distributed Queue;
+- shm: the block is copied into the rank's ShmRing and the worker maps it without copying.
+For every (timestep, rank), a task summing the block runs on the worker. The time until all the
+sums are gathered is reported for each transport.
+
+Usage: python3 bench_shm.py --ranks 4 --problem_size 2 --timesteps 100
+"""
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+import numpy as np
+from dask.distributed import Client, LocalCluster, Queue, Event
+
+from shm_ring import ShmRing, read_block
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "experiment_code"))
+from decomposition import grid_dims, mpi_dims
+
+NVAR = 9
+TIMEOUT = 60
+
+
+def tcp_producer(scheduler_address, worker, rank, timesteps, block_shape):
+    client = Client(scheduler_address)
+    queue = Queue(f"bench-shm-blocks-{rank}", client=client)
+    block = np.random.random(block_shape)
+    for step in range(timesteps):
+        block[0, 0, 0, 0] = step
+        queue.put(client.scatter(block, workers=[worker], direct=True))
+    # the futures are released when this client closes
+    Event("bench-shm-done", client=client).wait()
+    client.close()
+
+
+def shm_producer(ring_name, rank, timesteps, block_shape, slots):
+    ring = ShmRing(ring_name, block_shape, slots=slots)
+    block = np.random.random(block_shape)
+    for step in range(timesteps):
+        block[0, 0, 0, 0] = step
+        ring.put(block, step, timeout=TIMEOUT)
+
+
+def block_sum(block):
+    return block.sum()
+
+
+def shm_block_sum(ring_name, step, block_shape, slots):
+    return read_block(ring_name, step, block_shape, slots=slots, timeout=TIMEOUT).sum()
+
+
+def run_tcp(client, worker, ranks, timesteps, block_shape):
+    producers = [
+        multiprocessing.Process(target=tcp_producer,
+                                args=(client.scheduler.address, worker, rank, timesteps, block_shape))
+        for rank in range(ranks)
+    ]
+    queues = [Queue(f"bench-shm-blocks-{rank}", client=client) for rank in range(ranks)]
+    done = Event("bench-shm-done", client=client)
+    done.clear()
+
+    ts = time.time()
+    for producer in producers:
+        producer.start()
+    sums = []
+    for step in range(timesteps):
+        for queue in queues:
+            sums.append(client.submit(block_sum, queue.get(timeout=TIMEOUT), workers=[worker]))
+    client.gather(sums)
+    te = time.time()
+
+    done.set()
+    for producer in producers:
+        producer.join()
+    return te - ts
+
+
+def run_shm(client, worker, ranks, timesteps, block_shape, slots):
+    # the rings are created (and removed) here, the producers attach to them
+    rings = [ShmRing(f"bench_shm_{os.getpid()}_{rank}", block_shape, slots=slots, create=True)
+             for rank in range(ranks)]
+    producers = [
+        multiprocessing.Process(target=shm_producer, args=(ring.name, rank, timesteps, block_shape, slots))
+        for rank, ring in enumerate(rings)
+    ]
+
+    ts = time.time()
+    for producer in producers:
+        producer.start()
+    sums = []
+    for step in range(timesteps):
+        for ring in rings:
+            sums.append(client.submit(shm_block_sum, ring.name, step, block_shape, slots,
+                                      workers=[worker], pure=False))
+    client.gather(sums)
+    te = time.time()
+
+    for producer in producers:
+        producer.join()
+    for ring in rings:
+        ring.close()
+    return te - ts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the shared memory handoff against TCP.")
+    parser.add_argument("--ranks", "-r", type=int, default=4, help="Number of producer ranks on the node (default: 4).")
+    parser.add_argument("--problem_size", "-ps", type=int, default=2, help="Problem size (default: 2).")
+    parser.add_argument("--timesteps", "-nt", type=int, default=100, help="Number of timesteps (default: 100).")
+    parser.add_argument("--slots", "-s", type=int, default=4, help="Slots per shared memory ring (default: 4).")
+    args = parser.parse_args()
+
+    nx, ny, nz = grid_dims(args.problem_size)
+    mx, my, mz = mpi_dims(args.ranks)
+    block_shape = (NVAR, nz // mz, ny // my, nx // mx)
+    block_mib = np.prod(block_shape) * 8 / 2**20
+    print(f"[Bench] {args.ranks} ranks, block shape {block_shape} ({block_mib:.2f} MiB)", flush=True)
+
+    # a single worker, co-located with every producer
+    cluster = LocalCluster(n_workers=1, threads_per_worker=args.ranks)
+    client = Client(cluster)
+    worker = list(client.scheduler_info()["workers"])[0]
+
+    total_mib = block_mib * args.ranks * args.timesteps
+    for transport, elapsed in [
+        ("tcp", run_tcp(client, worker, args.ranks, args.timesteps, block_shape)),
+        ("shm", run_shm(client, worker, args.ranks, args.timesteps, block_shape, args.slots)),
+    ]:
+        print(f"[Bench] {transport}: {elapsed:.4f}s, {total_mib / elapsed:.1f} MiB/s", flush=True)
+
+    client.close()
+    cluster.close()
@@ -0,0 +1,217 @@
+from functools import lru_cache
+
+import numpy as np
+import dask.array as da
+
+
+def ekin_naive(slice, id, iu, iv, iw, mz):
+    """
+    Kinetic energy built from dask slices of each variable, as originally written in bench_deisa.py.
+    Every product creates its own temporary chunk.
+
+    Arguments:
+        slice: Dask array (t, nvar, y, x) taken from global_t at a given z.
+        id, iu, iv, iw (int): Indices of the density and the three momentum variables.
+        mz (int): Z dimension of the global grid.
+    """
+    return (
+        0.5
+        * slice[:, id, :, :]
+        * (
+            slice[:, iu, :, :] * slice[:, iu, :, :]
+            + slice[:, iv, :, :] * slice[:, iv, :, :]
+            + slice[:, iw, :, :] * slice[:, iw, :, :]
+        )
+        / (mz * mz)
+    )
+
+
+def _ekin_block(block, id, iu, iv, iw, scale):
+    """
+    Kinetic energy of one (t, nvar, y, x) block. The result is accumulated in place in a
+    preallocated output buffer, using a single scratch buffer for the squares.
+    """
+    out = np.empty((block.shape[0],) + block.shape[2:], dtype=block.dtype)
+    tmp = np.empty_like(out)
+    np.multiply(block[:, iu], block[:, iu], out=out)
+    np.multiply(block[:, iv], block[:, iv], out=tmp)
+    out += tmp
+    np.multiply(block[:, iw], block[:, iw], out=tmp)
+    out += tmp
+    out *= block[:, id]
+    out *= scale
+    return out
+
+
+def ekin_fused(slice, id, iu, iv, iw, mz):
+    """
+    Kinetic energy computed in one task per global_t block with map_blocks.
+    Returns an array with the same shape and chunks as ekin_naive.
+
+    Arguments:
+        slice: Dask array (t, nvar, y, x) taken from global_t at a given z.
+        id, iu, iv, iw (int): Indices of the density and the three momentum variables.
+        mz (int): Z dimension of the global grid.
+    """
+    # the variables of a rank are shipped together, so this is a no-op for deisa arrays
+    if slice.numblocks[1] > 1:
+        slice = slice.rechunk({1: -1})
+
+    return slice.map_blocks(
+        _ekin_block, id, iu, iv, iw, 0.5 / (mz * mz),
+        drop_axis=1,
+        dtype=slice.dtype,
+    )
+
+
+def fft2_power(ekin):
+    """
+    Power spectrum |fft2|^2 of each (y, x) plane of ekin.
+    Each timestep is gathered in a single chunk before the fft.
+
+    Arguments:
+        ekin: Dask array (t, y, x).
+    """
+    ekin_rechunked = ekin.rechunk({0: 1, 1: -1, 2: -1})  # no chunking along dim 0, 1, and 2
+    ekin_fft2 = da.fft.fft2(ekin_rechunked)  # fft over the last two axes
+    return da.absolute(ekin_fft2) ** 2
+
+
+def fft2_slab_power(ekin):
+    """
+    Power spectrum |fft2|^2 of each (y, x) plane of ekin, computed as a slab decomposed fft.
+    Rows are transformed with y kept in the simulation's chunks, then the array is transposed
+    once so that columns are transformed with x back in the simulation's chunks. No task ever
+    holds a whole plane, and the output keeps the x chunks of ekin.
+
+    Arguments:
+        ekin: Dask array (t, y, x).
+    """
+    x_chunks = ekin.chunks[2]
+
+    # row ffts, only ranks sharing the same y range exchange data (no-op if x is not split)
+    rows = ekin.rechunk({2: -1})
+    rows = da.fft.fft(rows, axis=2)
+
+    # single transpose: gather y, split x again, then column ffts
+    columns = rows.rechunk({1: -1, 2: x_chunks})
+    columns = da.fft.fft(columns, axis=1)
+    return da.absolute(columns) ** 2
+
+
+@lru_cache(maxsize=None)
+def radial_bins(ny, nx):
+    """
+    Isotropic binning of a (ny, nx) fft plane, computed once per plane shape.
+    Bin i holds the wavenumbers kbins[i] <= |k| < kbins[i + 1], with kbins = 0.5, 1.5, ...
+    up to min(nx, ny) // 2 + 0.5. Points outside every bin get the index nbins.
+
+    Returns (kbin, kvals, kbins): the (ny, nx) bin index, the bin centers and the bin edges.
+
+    Arguments:
+        ny (int): Y dimension of the plane.
+        nx (int): X dimension of the plane.
+    """
+    ky = np.fft.fftfreq(ny) * ny
+    kx = np.fft.fftfreq(nx) * nx
+    knrm = np.sqrt(ky[:, None] ** 2 + kx[None, :] ** 2)
+    kbins = np.arange(0.5, min(nx, ny) // 2 + 1, 1.0)
+    kvals = 0.5 * (kbins[1:] + kbins[:-1])
+    nbins = len(kvals)
+
+    kbin = np.digitize(knrm, kbins) - 1
+    kbin[(kbin < 0) | (kbin >= nbins)] = nbins
+    return kbin, kvals, kbins
+
+
+def _radial_sum_block(power, kbin, nbins):
+    """
+    Sum of the (t, y, x) power block per timestep and |k| bin, with a single bincount.
+    Returns a (t, 1, 1, nbins) block.
+    """
+    nt = power.shape[0]
+    flat = kbin.ravel()
+    inside = flat < nbins
+    # one offset range of nbins per timestep, so all timesteps are binned at once
+    index = (np.arange(nt)[:, None] * nbins + flat[inside][None, :]).ravel()
+    weights = power.reshape(nt, -1)[:, inside].ravel()
+    sums = np.bincount(index, weights=weights, minlength=nt * nbins)
+    return sums.reshape(nt, 1, 1, nbins)
+
+
+def radial_spectrum(power):
+    """
+    Isotropic energy spectrum of the fourier amplitudes: mean power over each |k| annulus
+    times the annulus area. The binning is done on the workers, block by block, so only a
+    (t, nbins) array has to be gathered.
+
+    Returns (spectrum, kvals), with spectrum a dask array (t, nbins) and kvals the bin centers.
+
+    Arguments:
+        power: Dask array (t, y, x) of fourier amplitudes, with any chunking.
+    """
+    nt, ny, nx = power.shape
+    kbin, kvals, kbins = radial_bins(ny, nx)
+    nbins = len(kvals)
+
+    kbin_blocks = da.from_array(kbin, chunks=power.chunks[1:])
+    partial_sums = da.blockwise(
+        _radial_sum_block, "tyxk",
+        power, "tyx",
+        kbin_blocks, "yx",
+        new_axes={"k": nbins},
+        adjust_chunks={"y": 1, "x": 1},
+        nbins=nbins,
+        dtype=power.dtype,
+    )
+    sums = partial_sums.sum(axis=(1, 2))
+
+    counts = np.bincount(kbin.ravel(), minlength=nbins + 1)[:nbins]
+    scale = np.pi * (kbins[1:] ** 2 - kbins[:-1] ** 2) / np.maximum(counts, 1)
+    return sums * scale, kvals
+
+
+def _histogram_block(block, lo, hi, bins):
+    """
+    Histogram of each timestep of a (t, y, x) block between lo[t] and hi[t].
+    Returns a (t, 1, 1, bins) block.
+    """
+    out = np.empty((block.shape[0], 1, 1, bins), dtype=np.int64)
+    for i in range(block.shape[0]):
+        out[i, 0, 0], _ = np.histogram(block[i], bins=bins, range=(lo[i], hi[i]))
+    return out
+
+
+def histogram_per_timestep(field, bins=64):
+    """
+    Histogram of each timestep of field, with bins evenly spaced between the min and the max
+    of that timestep. Blocks are binned on the workers, only a (t, bins) array is gathered.
+
+    Arguments:
+        field: Dask array (t, y, x).
+        bins (int): Number of bins.
+    """
+    lo = field.min(axis=(1, 2))
+    hi = field.max(axis=(1, 2))
+    partial_counts = da.blockwise(
+        _histogram_block, "tyxb",
+        field, "tyx",
+        lo, "t",
+        hi, "t",
+        new_axes={"b": bins},
+        adjust_chunks={"y": 1, "x": 1},
+        bins=bins,
+        dtype=np.int64,
+    )
+    return partial_counts.sum(axis=(1, 2))
+
+
+EKIN_KERNELS = {
+    "naive": ekin_naive,
+    "fused": ekin_fused,
+}
+
+FFT_KERNELS = {
+    "plane": fft2_power,
+    "slab": fft2_slab_power,
+}
@@ -0,0 +1,69 @@
+import csv
+import threading
+import time
+
+MEMORY_FIELDS = ["unix_time", "worker", "process", "managed", "unmanaged", "unmanaged_old", "unmanaged_recent",
+                 "spilled", "memory_limit"]
+
+
+def _worker_memory(dask_scheduler) -> list:
+    """
+    Memory of every worker as last reported to the scheduler, run on the scheduler.
+    """
+    rows = []
+    for ws in dask_scheduler.workers.values():
+        memory = ws.memory
+        # managed was managed_in_memory and spilled managed_spilled before distributed 2022.11
+        rows.append([
+            ws.address,
+            memory.process,
+            getattr(memory, "managed", getattr(memory, "managed_in_memory", None)),
+            memory.unmanaged,
+            memory.unmanaged_old,
+            memory.unmanaged_recent,
+            getattr(memory, "spilled", getattr(memory, "managed_spilled", None)),
+            ws.memory_limit,
+        ])
+    return rows
+
+
+class WorkerMemorySampler:
+    """
+    Samples the memory of every worker (process, managed, unmanaged and spilled, in bytes) from a
+    background thread, and writes the samples as a CSV file of MEMORY_FIELDS when the block ends.
+    Unlike distributed.diagnostics.MemorySampler, the workers are not summed.
+
+    Arguments:
+        client: Client of the cluster.
+        filename (str): Path of the CSV file.
+        interval (float): Sampling interval in seconds.
+    """
+    def __init__(self, client, filename: str, interval: float = 0.5):
+        self.client = client
+        self.filename = filename
+        self.interval = interval
+        self.rows = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def sample(self):
+        now = time.time()
+        self.rows.extend([now] + row for row in self.client.run_on_scheduler(_worker_memory))
+
+    def _run(self):
+        while True:
+            self.sample()
+            if self._stop.wait(self.interval):
+                break
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        with open(self.filename, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(MEMORY_FIELDS)
+            writer.writerows(self.rows)
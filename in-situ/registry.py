@@ -0,0 +1,265 @@
+import dask.array as da
+
+from kernels import radial_spectrum, histogram_per_timestep
+
+# Index of each variable in global_t, see the memory_selection of the datasets in templates/template.yml
+VARIABLES = {"d": 0, "E": 1, "mx": 2, "my": 3, "mz": 4, "Bx": 5, "By": 6, "Bz": 7, "dX": 8}
+
+DEFAULT_ANALYTICS = "ekin,sum_over_xy,fourier"
+
+ANALYTICS = {}
+
+
+class Analytics:
+    """
+    A named analytics kernel and the part of global_t it reads.
+
+    Arguments:
+        name (str): Name used to select the analytics.
+        fn: Function (selection) -> dask array with time as first axis.
+        variables (tuple): Names of the global_t variables read by fn, see VARIABLES.
+        planes: Function (context) -> tuple of the z planes read by fn.
+        label (str): Label of the "[Analytics] time <label>:" line.
+        result (str): Name of the result in results.txt.
+    """
+    def __init__(self, name, fn, variables, planes, label, result):
+        self.name = name
+        self.fn = fn
+        self.variables = tuple(variables)
+        self.planes = planes
+        self.label = label
+        self.result = result
+
+
+def register(name, variables, planes=None, label=None, result=None):
+    """
+    Decorator registering an analytics kernel. By default it reads the plane at context.z_pos and
+    it is labelled and saved under its name.
+
+    Arguments:
+        name (str): Name used to select the analytics.
+        variables (tuple): Names of the global_t variables read by the kernel, see VARIABLES.
+        planes: Function (context) -> tuple of the z planes read by the kernel.
+        label (str): Label of the "[Analytics] time <label>:" line.
+        result (str): Name of the result in results.txt.
+    """
+    unknown = set(variables) - set(VARIABLES)
+    if unknown:
+        raise ValueError(f"Unknown variables {sorted(unknown)} for analytics {name}")
+
+    def decorator(fn):
+        ANALYTICS[name] = Analytics(
+            name, fn, variables,
+            planes if planes is not None else lambda context: (context.z_pos,),
+            label if label is not None else name,
+            result if result is not None else name,
+        )
+        return fn
+
+    return decorator
+
+
+def get_analytics(names):
+    """
+    Registered analytics with the given names, in the given order.
+
+    Arguments:
+        names (list): Names of the analytics.
+    """
+    unknown = [name for name in names if name not in ANALYTICS]
+    if unknown:
+        raise ValueError(f"Unknown analytics {unknown}. Available: {sorted(ANALYTICS)}")
+    return [ANALYTICS[name] for name in names]
+
+
+class Context:
+    """
+    Run parameters shared by the analytics kernels.
+
+    Arguments:
+        mz (int): Z dimension of the global grid.
+        z_pos (int): Default z plane of the analytics.
+        ekin_kernel: Function used to compute the kinetic energy, see kernels.EKIN_KERNELS.
+        fft_kernel: Function used to compute the fourier amplitudes, see kernels.FFT_KERNELS.
+        persist: Function applied to the intermediate results shared by several analytics,
+            e.g. client.persist. Defaults to no persist.
+    """
+    def __init__(self, mz, z_pos, ekin_kernel, fft_kernel, persist=None):
+        self.mz = mz
+        self.z_pos = z_pos
+        self.ekin_kernel = ekin_kernel
+        self.fft_kernel = fft_kernel
+        self.persist = persist if persist is not None else lambda x: x
+
+
+class Selection:
+    """
+    Part of global_t read by a set of analytics, as a (t, variables, planes, y, x) dask array.
+    Intermediate results shared by several analytics are cached, see cached.
+
+    Arguments:
+        array: Dask array (t, len(variables), len(planes), y, x).
+        variables (list): Names of the selected variables, in array order.
+        planes (list): Selected z planes, in array order.
+        context (Context): Run parameters.
+    """
+    def __init__(self, array, variables, planes, context):
+        self.array = array
+        self.variables = list(variables)
+        self.planes = list(planes)
+        self.context = context
+        self._cache = {}
+
+    def index(self, variable):
+        """Index of a variable in the selection."""
+        return self.variables.index(variable)
+
+    def plane(self, z):
+        """All the selected variables at plane z, as a (t, variables, y, x) dask array."""
+        return self.array[:, :, self.planes.index(z)]
+
+    def field(self, variable, z):
+        """A single variable at plane z, as a (t, y, x) dask array."""
+        return self.array[:, self.index(variable), self.planes.index(z)]
+
+    def cached(self, key, build):
+        """Result of build(), computed once per selection."""
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    def timestep(self, t):
+        """Selection restricted to the t-th selected timestep, with its own cache."""
+        return Selection(self.array[t:t + 1], self.variables, self.planes, self.context)
+
+
+class _TracingSelection(Selection):
+    """
+    Selection over every variable and plane that records the ones an analytics actually reads.
+    """
+    def __init__(self, array, context):
+        super().__init__(array, list(VARIABLES), range(array.shape[2]), context)
+        self.read_variables = set()
+        self.read_planes = set()
+
+    def index(self, variable):
+        self.read_variables.add(variable)
+        return super().index(variable)
+
+    def plane(self, z):
+        self.read_planes.add(z)
+        return super().plane(z)
+
+    def field(self, variable, z):
+        self.read_planes.add(z)
+        return super().field(variable, z)
+
+
+def trace_reads(template, analytics, context):
+    """
+    Variables and z planes read by the expressions the analytics build, in global_t order.
+    Each analytics is built on a lazy placeholder with the shape and chunks of global_t, nothing
+    is computed. Raises a ValueError if an analytics reads variables or planes it did not declare.
+
+    Arguments:
+        template: Dask array with the shape and chunks of global_t (t, nvar, z, y, x).
+        analytics (list): Analytics to run.
+        context (Context): Run parameters.
+    """
+    placeholder = da.zeros(template.shape, chunks=template.chunks, dtype=template.dtype)
+    # never persist while tracing
+    tracing_context = Context(context.mz, context.z_pos, context.ekin_kernel, context.fft_kernel)
+
+    variables, planes = set(), set()
+    for a in analytics:
+        tracing = _TracingSelection(placeholder, tracing_context)
+        a.fn(tracing)
+        undeclared = (tracing.read_variables - set(a.variables)) | (tracing.read_planes - set(a.planes(context)))
+        if undeclared:
+            raise ValueError(f"Analytics {a.name} reads undeclared variables or planes {sorted(undeclared, key=str)}")
+        variables |= tracing.read_variables
+        planes |= tracing.read_planes
+
+    return sorted(variables, key=VARIABLES.get), sorted(planes)
+
+
+def select(global_t, analytics, context, t_stride=1, template=None):
+    """
+    Selects from global_t only the union of the variables and z planes read by the analytics.
+    The reads are traced from the expressions the analytics build (see trace_reads) and pushed
+    down as a single basic slice on global_t, so Deisa only has to ship the blocks intersecting
+    them. A block holds every variable, so only the planes reduce the blocks shipped. The exact
+    variables and planes are then projected out block by block, before any transfer between
+    workers.
+
+    Arguments:
+        global_t: Deisa array (t, nvar, z, y, x).
+        analytics (list): Analytics to run.
+        context (Context): Run parameters.
+        t_stride (int): Stride between the analysed timesteps.
+        template: Dask array with the shape and chunks of global_t, defaults to global_t.
+    """
+    if template is None:
+        template = global_t
+    variables, planes = trace_reads(template, analytics, context)
+    indices = [VARIABLES[v] for v in variables]
+
+    array = global_t[0:template.shape[0]:t_stride, indices[0]:indices[-1] + 1, planes[0]:planes[-1] + 1]
+    array = array[:, [i - indices[0] for i in indices]]
+    array = array[:, :, [z - planes[0] for z in planes]]
+    return Selection(array, variables, planes, context)
+
+
+EKIN_VARIABLES = ("d", "mx", "my", "mz")
+
+
+def _ekin(selection):
+    context = selection.context
+
+    def build():
+        ekin = context.ekin_kernel(
+            selection.plane(context.z_pos),
+            selection.index("d"), selection.index("mx"), selection.index("my"), selection.index("mz"),
+            context.mz,
+        )
+        return context.persist(ekin)
+
+    return selection.cached("ekin", build)
+
+
+@register("ekin", EKIN_VARIABLES, result="res2")
+def ekin(selection):
+    return _ekin(selection)
+
+
+@register("sum_over_xy", EKIN_VARIABLES, label="sum over xy", result="res3")
+def sum_over_xy(selection):
+    return _ekin(selection).sum(axis=(1, 2))
+
+
+@register("fourier", EKIN_VARIABLES, result="res4")
+def fourier(selection):
+    return selection.cached("fourier", lambda: selection.context.fft_kernel(_ekin(selection)))
+
+
+@register("spectrum", EKIN_VARIABLES)
+def spectrum(selection):
+    spectrum, _ = radial_spectrum(fourier(selection))
+    return spectrum
+
+
+@register("slice_mean", ("d", "E"))
+def slice_mean(selection):
+    z = selection.context.z_pos
+    return da.stack([selection.field(v, z).mean(axis=(1, 2)) for v in ("d", "E")], axis=1)
+
+
+@register("histogram", ("d",))
+def histogram(selection):
+    return histogram_per_timestep(selection.field("d", selection.context.z_pos), bins=64)
+
+
+@register("minmax", ("d",))
+def minmax(selection):
+    d = selection.field("d", selection.context.z_pos)
+    return da.stack([d.min(axis=(1, 2)), d.max(axis=(1, 2))], axis=1)
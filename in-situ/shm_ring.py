@@ -0,0 +1,170 @@
+import os
+import sys
+import time
+import weakref
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+
+
+class ShmRing:
+    """
+    Ring of fixed size blocks in a POSIX shared memory segment, used to hand the blocks of a
+    simulation rank to the Dask worker running on the same node without serialization.
+    The producer copies each block once into a free slot and the consumer maps it as a numpy
+    array without copying. A slot is only reused once the consumer released it, which happens
+    automatically when the array returned by get and every array derived from it are garbage
+    collected.
+
+    Arguments:
+        name (str): Name of the shared memory segment.
+        block_shape (tuple): Shape of a block.
+        dtype: Numpy dtype of the blocks.
+        slots (int): Number of slots.
+        create (bool): Create the segment (True) or attach to an existing one (False).
+    """
+    def __init__(self, name: str, block_shape: tuple, dtype="float64", slots: int = 4, create: bool = False):
+        if slots < 1:
+            raise ValueError("slots must be greater than or equal to 1")
+        self.name = name
+        self.block_shape = tuple(block_shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = slots
+        self.create = create
+
+        header_nbytes = 2 * slots * np.dtype(np.int64).itemsize
+        block_nbytes = int(np.prod(self.block_shape)) * self.dtype.itemsize
+        size = header_nbytes + slots * block_nbytes
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        elif sys.version_info >= (3, 13):
+            self.shm = shared_memory.SharedMemory(name=name, size=size, track=False)
+        else:
+            # only the creator unlinks the segment, see https://bugs.python.org/issue39959. A shared
+            # tracker may be the creator's one, unregistering would drop its registration
+            shared = _tracker_shared()
+            self.shm = shared_memory.SharedMemory(name=name, size=size)
+            if not shared:
+                resource_tracker.unregister(self.shm._name, "shared_memory")
+
+        # header: last step written and last step released, per slot
+        header = np.ndarray((2, slots), dtype=np.int64, buffer=self.shm.buf)
+        if create:
+            header[:] = -1
+        self._written = header[0]
+        self._released = header[1]
+        self._blocks = np.ndarray((slots,) + self.block_shape, dtype=self.dtype,
+                                  buffer=self.shm.buf, offset=header_nbytes)
+
+    def put(self, block, step: int, timeout: float = None):
+        """
+        Copies the block of a timestep into its slot, waiting for the slot to be released.
+
+        Arguments:
+            block: Numpy array of shape block_shape.
+            step (int): Timestep of the block.
+            timeout (float, optional): Maximum wait in seconds. If None, waits forever.
+        """
+        slot = step % self.slots
+        _wait(lambda: self._written[slot] == self._released[slot], timeout,
+              f"slot {slot} of {self.name} was not released")
+        self._blocks[slot] = block
+        self._written[slot] = step
+
+    def get(self, step: int, timeout: float = None):
+        """
+        Read-only numpy view of the block of a timestep, waiting for it to be written.
+        The slot is released when the view and every array derived from it are garbage collected.
+
+        Arguments:
+            step (int): Timestep of the block.
+            timeout (float, optional): Maximum wait in seconds. If None, waits forever.
+        """
+        slot = step % self.slots
+        _wait(lambda: self._written[slot] == step, timeout,
+              f"step {step} was not written to {self.name}")
+        # views derived from the returned one reference the owner, not the returned view
+        owner = _SlotOwner(self._blocks[slot])
+        weakref.finalize(owner, self.release, step)
+        view = np.asarray(owner)
+        view.flags.writeable = False
+        return view
+
+    def release(self, step: int):
+        """
+        Marks the slot of a timestep as free.
+
+        Arguments:
+            step (int): Timestep of the block.
+        """
+        self._released[step % self.slots] = step
+
+    def close(self):
+        """
+        Detaches from the segment, and removes it if this ring created it.
+        """
+        del self._written, self._released, self._blocks
+        self.shm.close()
+        if self.create:
+            self.shm.unlink()
+
+
+class _SlotOwner:
+    """
+    Base of the arrays returned by ShmRing.get, alive as long as any array mapping the slot.
+    """
+    def __init__(self, block):
+        self._block = block
+        self.__array_interface__ = block.__array_interface__
+
+
+# whether the resource tracker of this process was inherited from its parent through fork
+_tracker_forked = False
+
+
+def _after_fork():
+    global _tracker_forked
+    _tracker_forked = resource_tracker._resource_tracker._fd is not None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def _tracker_shared() -> bool:
+    """
+    Whether the resource tracker of this process was started by another one. The processes started
+    by multiprocessing (and so the Dask workers of a nanny) share the tracker of their parent.
+    """
+    tracker = resource_tracker._resource_tracker
+    return tracker._fd is not None and (tracker._pid is None or _tracker_forked)
+
+
+def _wait(condition, timeout, message):
+    start = time.time()
+    while not condition():
+        if timeout is not None and time.time() - start > timeout:
+            raise TimeoutError(message)
+        time.sleep(1e-4)
+
+
+# rings attached by this process, so a worker maps each segment once
+_rings = {}
+
+
+def read_block(name: str, step: int, block_shape: tuple, dtype="float64", slots: int = 4, timeout: float = None):
+    """
+    Task reading the block of a timestep from a ring, to be run on the worker co-located with the
+    producer (e.g. client.submit(read_block, ..., workers=[address])). The returned array is a
+    view on the shared memory segment.
+
+    Arguments:
+        name (str): Name of the shared memory segment.
+        step (int): Timestep of the block.
+        block_shape (tuple): Shape of a block.
+        dtype: Numpy dtype of the blocks.
+        slots (int): Number of slots.
+        timeout (float, optional): Maximum wait in seconds. If None, waits forever.
+    """
+    if name not in _rings:
+        _rings[name] = ShmRing(name, block_shape, dtype, slots)
+    return _rings[name].get(step, timeout)
@@ -0,0 +1,52 @@
+import time
+from collections import deque
+
+
+def stream_timesteps(client, build_outputs, nt, max_inflight=2, controller=None):
+    """
+    Runs the analytics one timestep at a time and yields the results as soon as they are ready.
+    At most max_inflight timesteps are submitted at once, so the workers only hold the intermediate
+    results of a few timesteps instead of the whole run. The futures of a timestep are released once
+    its results are gathered, the source blocks are not: they stay on the workers until their
+    producer releases them (e.g. SyntheticDeisa.release). With a controller, the next timestep
+    submitted is controller.stride timesteps after the previous one, so the consumer can change the
+    stride between two yields.
+
+    Yields (t, results, elapsed) with results a dict output name -> numpy result of the timestep,
+    and elapsed the time between submission and gather.
+
+    Arguments:
+        client: Dask client.
+        build_outputs: Function (t) -> dict output name -> lazy dask result of the t-th timestep.
+        nt (int): Number of timesteps.
+        max_inflight (int): Maximum number of timesteps submitted at the same time.
+        controller (optional): Object with a stride attribute, e.g. stride.AdaptiveStride.
+            If None, every timestep is analysed.
+    """
+    if max_inflight < 1:
+        raise ValueError("max_inflight must be greater than or equal to 1")
+
+    inflight = deque()
+    t = 0
+    while t < nt:
+        outputs = build_outputs(t)
+        # one compute call per timestep, so intermediate results are shared between the outputs
+        futures = client.compute(list(outputs.values()))
+        inflight.append((t, list(outputs), time.time(), futures))
+
+        if len(inflight) == max_inflight:
+            yield _gather_oldest(client, inflight)
+
+        t += controller.stride if controller is not None else 1
+
+    while inflight:
+        yield _gather_oldest(client, inflight)
+
+
+def _gather_oldest(client, inflight):
+    # once popped, the futures are only referenced here, so the scheduler releases the data of
+    # this timestep as soon as we return
+    t, names, submitted, futures = inflight.popleft()
+    results = dict(zip(names, client.gather(futures)))
+    elapsed = time.time() - submitted
+    return t, results, elapsed
@@ -0,0 +1,76 @@
+import time
+
+
+class AdaptiveStride:
+    """
+    Controls the stride between analysed timesteps so that the lag between the latest simulated
+    timestep and the latest analysed one stays under a target. The stride doubles while the lag is
+    above the target and halves once the lag is back under half of the target.
+
+    Arguments:
+        target_lag (int): Maximum number of timesteps the analytics may lag behind the simulation.
+        max_stride (int): Upper bound of the stride.
+        stride (int): Initial stride.
+    """
+    def __init__(self, target_lag: int, max_stride: int, stride: int = 1):
+        if target_lag < 1:
+            raise ValueError("target_lag must be greater than or equal to 1")
+        if not 1 <= stride <= max_stride:
+            raise ValueError("stride must be between 1 and max_stride")
+        self.target_lag = target_lag
+        self.max_stride = max_stride
+        self.stride = stride
+        self.decisions = []
+
+    def update(self, latest_step: int, analysed_step: int) -> int:
+        """
+        Updates the stride from the latest simulated and analysed timesteps and returns it.
+        Every update is recorded in self.decisions, changes are also printed.
+
+        Arguments:
+            latest_step (int): Latest timestep produced by the simulation.
+            analysed_step (int): Latest timestep analysed.
+        """
+        lag = latest_step - analysed_step
+        previous = self.stride
+        if lag > self.target_lag:
+            self.stride = min(self.stride * 2, self.max_stride)
+        elif lag < self.target_lag // 2:
+            self.stride = max(self.stride // 2, 1)
+
+        self.decisions.append((time.time(), latest_step, analysed_step, lag, self.stride))
+        if self.stride != previous:
+            print(f"[Analytics] stride {previous} -> {self.stride} (lag {lag}, target {self.target_lag})", flush=True)
+        return self.stride
+
+    def save(self, filename: str):
+        """
+        Writes the recorded decisions as a csv file.
+
+        Arguments:
+            filename (str): Path of the csv file.
+        """
+        with open(filename, "w") as f:
+            f.write("unix_time,latest_step,analysed_step,lag,stride\n")
+            for decision in self.decisions:
+                f.write(",".join(str(v) for v in decision) + "\n")
+
+
+def _latest_step_on_scheduler(dask_scheduler, name):
+    latest = -1
+    for key, ts in dask_scheduler.tasks.items():
+        if isinstance(key, tuple) and key[0] == name and ts.state == "memory":
+            latest = max(latest, key[1])
+    return latest
+
+
+def latest_available_step(client, array):
+    """
+    Latest timestep of a Deisa array whose blocks have reached the cluster, or -1 if none did.
+    The bridges publish the blocks of timestep t under the keys (array.name, t, ...).
+
+    Arguments:
+        client: Dask client.
+        array: Dask array returned by Deisa, before any selection.
+    """
+    return client.run_on_scheduler(_latest_step_on_scheduler, name=array.name)
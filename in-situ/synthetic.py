@@ -0,0 +1,221 @@
+import os
+import sys
+import time
+import threading
+import numpy as np
+import dask.array as da
+from dask.base import tokenize
+from dask.distributed import Client, LocalCluster
+from distributed.utils_comm import WrappedKey
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "experiment_code"))
+from decomposition import grid_dims, mpi_dims
+
+NVAR = 9
+
+
+def synthetic_block(t, rank, block_shape, seed=0):
+    """
+    Block of a rank at timestep t.
+    """
+    rng = np.random.default_rng((seed, t, rank))
+    block = rng.standard_normal((1,) + block_shape)
+    block[:, 0] = 1.0 + 0.1 * np.abs(block[:, 0])  # density stays positive
+    return block
+
+
+def _published_block(block):
+    return block
+
+
+def block_layout(mpi_np: int, problem_size: int, nvar: int = NVAR):
+    """
+    (mx, my, mz) ranks and block shape (nvar, z, y, x) of a rank, using the decomposition of
+    produce_config_files.
+    """
+    nx, ny, nz = grid_dims(problem_size)
+    mx, my, mz = mpi_dims(mpi_np)
+    return (mx, my, mz), (nvar, nz // mz, ny // my, nx // mx)
+
+
+def synthetic_global_t(block_name: str, mpi_np: int, problem_size: int, timesteps: int, nvar: int = NVAR):
+    """
+    Dask array shaped like the global_t Deisa array of an experiment: (t, nvar, z, y, x) with one
+    block per rank and timestep. Like the blocks sent by the Deisa bridges, each block is the data
+    published under the key (block_name, t, rank) by a SyntheticProducer, the array holds no data.
+    A graph reading timestep t can only be submitted once the producer published it.
+
+    Arguments:
+        block_name (str): Name of the keys of the published blocks.
+        mpi_np (int): Number of simulated ranks. Must be a power of 2.
+        problem_size (int): Problem size.
+        timesteps (int): Number of timesteps.
+        nvar (int): Number of variables.
+    """
+    (mx, my, mz), block_shape = block_layout(mpi_np, problem_size, nvar)
+    _, bz, by, bx = block_shape
+    chunks = ((1,) * timesteps, (nvar,), (bz,) * mz, (by,) * my, (bx,) * mx)
+
+    name = "synthetic-global_t-" + tokenize(block_name, mpi_np, problem_size, timesteps, nvar)
+    dsk = {}
+    for t in range(timesteps):
+        for iz in range(mz):
+            for iy in range(my):
+                for ix in range(mx):
+                    rank = (iz * my + iy) * mx + ix
+                    dsk[(name, t, 0, iz, iy, ix)] = (_published_block, WrappedKey((block_name, t, rank)))
+    return da.Array(dsk, name, chunks, dtype=np.float64)
+
+
+class SyntheticProducer(threading.Thread):
+    """
+    Stand-in for the simulation ranks and their Deisa bridges, running in a thread of the
+    analytics: the blocks of timestep t are generated at start + t / rate and scattered, each
+    rank to its own worker, under the keys (name, t, rank). The blocks of a timestep stay on the
+    workers until released.
+
+    Arguments:
+        client: Client of the cluster.
+        name (str): Name of the keys of the blocks.
+        mpi_np (int): Number of simulated ranks.
+        block_shape (tuple): Shape (nvar, z, y, x) of the block of a rank.
+        timesteps (int): Number of timesteps.
+        rate (float): Timesteps produced per second.
+        seed (int): Seed of the random data.
+    """
+    def __init__(self, client, name: str, mpi_np: int, block_shape: tuple, timesteps: int, rate: float,
+                 seed: int = 0):
+        super().__init__(daemon=True)
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0")
+        self.client = client
+        self.name = name
+        self.mpi_np = mpi_np
+        self.block_shape = block_shape
+        self.timesteps = timesteps
+        self.rate = rate
+        self.seed = seed
+        self.latest = -1
+        self.error = None
+        self.futures = {}  # timestep -> futures of its blocks
+        self._produced = threading.Condition()
+        self._stopped = threading.Event()
+
+    def run(self):
+        try:
+            workers = sorted(self.client.scheduler_info()["workers"])
+            start = time.time()
+            for t in range(self.timesteps):
+                if self._stopped.wait(max(start + t / self.rate - time.time(), 0)):
+                    return
+                blocks = {}
+                for rank in range(self.mpi_np):
+                    blocks.setdefault(workers[rank % len(workers)], {})[(self.name, t, rank)] = \
+                        synthetic_block(t, rank, self.block_shape, self.seed)
+                futures = []
+                for worker, worker_blocks in blocks.items():
+                    futures.extend(self.client.scatter(worker_blocks, workers=[worker], direct=True).values())
+                with self._produced:
+                    self.futures[t] = futures
+                    self.latest = t
+                    self._produced.notify_all()
+        except Exception as e:
+            with self._produced:
+                self.error = e
+                self._produced.notify_all()
+
+    def wait_for_step(self, t: int, timeout: float = None):
+        """
+        Waits until the blocks of timestep t are published.
+        """
+        with self._produced:
+            if not self._produced.wait_for(lambda: self.latest >= t or self.error is not None, timeout):
+                raise TimeoutError(f"timestep {t} was not produced after {timeout}s")
+        if self.error is not None:
+            raise RuntimeError("the synthetic producer failed") from self.error
+
+    def release(self, t: int):
+        """
+        Releases the blocks of the timesteps up to t, the workers drop them once no task reads them.
+        """
+        with self._produced:
+            for step in [step for step in self.futures if step <= t]:
+                del self.futures[step]
+
+    def stop(self):
+        self._stopped.set()
+        if self.is_alive():
+            self.join()
+        self.futures.clear()
+
+
+class SyntheticArrays(dict):
+    """
+    Arrays returned by SyntheticDeisa.get_deisa_arrays, a dict with the Deisa arrays interface.
+    """
+    def check_contract(self):
+        # every block is published, there is no bridge to notify
+        pass
+
+
+class SyntheticDeisa:
+    """
+    Stand-in for Deisa that feeds bench_deisa.py with a synthetic simulation, so the analytics can
+    be benchmarked on a single machine without OAR, Singularity or the compiled simulation.
+    The producer starts when the arrays are requested. As the blocks only exist once produced, the
+    analytics wait for the timesteps they read before submitting their graphs, see wait_for_step.
+
+    Arguments:
+        scheduler_file_name (str): Path to the scheduler file, or "local" to start a LocalCluster.
+        nb_workers (int): Number of Dask workers to wait for (or to start with "local").
+        mpi_np (int): Number of simulated ranks. Must be a power of 2.
+        problem_size (int): Problem size.
+        timesteps (int): Number of timesteps.
+        rate (float): Timesteps produced per second.
+    """
+    def __init__(self, scheduler_file_name: str, nb_workers: int, mpi_np: int = 32, problem_size: int = 0,
+                 timesteps: int = 500, rate: float = 10.0):
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0")
+        if scheduler_file_name == "local":
+            self.cluster = LocalCluster(n_workers=nb_workers, threads_per_worker=1)
+            self.client = Client(self.cluster)
+        else:
+            self.cluster = None
+            self.client = Client(scheduler_file=scheduler_file_name)
+        self.client.wait_for_workers(nb_workers)
+
+        self.mpi_np = mpi_np
+        self.problem_size = problem_size
+        self.timesteps = timesteps
+        self.rate = rate
+        self.producer = None
+
+    def get_client(self):
+        return self.client
+
+    def get_deisa_arrays(self):
+        _, block_shape = block_layout(self.mpi_np, self.problem_size)
+        name = "synthetic-block-" + tokenize(self.mpi_np, self.problem_size, self.timesteps, self.rate, time.time())
+        self.producer = SyntheticProducer(self.client, name, self.mpi_np, block_shape, self.timesteps, self.rate)
+        self.producer.start()
+        return SyntheticArrays(global_t=synthetic_global_t(name, self.mpi_np, self.problem_size, self.timesteps))
+
+    def latest_step(self) -> int:
+        """
+        Latest timestep produced so far, or -1 if the producer did not start.
+        """
+        return self.producer.latest if self.producer is not None else -1
+
+    def wait_for_step(self, t: int, timeout: float = None):
+        self.producer.wait_for_step(t, timeout)
+
+    def release(self, t: int):
+        self.producer.release(t)
+
+    def close(self):
+        if self.producer is not None:
+            self.producer.stop()
+        self.client.close()
+        if self.cluster is not None:
+            self.cluster.close()
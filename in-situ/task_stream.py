@@ -0,0 +1,65 @@
+import csv
+
+from dask.core import flatten, get_dependencies
+from dask.utils import key_split
+
+TASK_FIELDS = ["key", "prefix", "worker", "thread", "status", "nbytes", "action", "start", "stop", "source"]
+DEPENDENCY_FIELDS = ["key", "dependency"]
+
+
+def save_task_stream(filename: str, records: list):
+    """
+    Writes task stream records as a CSV file, one row per start/stop of a task (compute, transfer
+    of its inputs, disk read or write), with the task fields repeated on each of its rows.
+
+    Arguments:
+        filename (str): Path of the CSV file.
+        records (list): Task stream records, as returned by distributed.get_task_stream.
+    """
+    with open(filename, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=TASK_FIELDS)
+        writer.writeheader()
+        for record in records:
+            for startstop in record["startstops"]:
+                writer.writerow({
+                    "key": str(record["key"]),
+                    "prefix": key_split(record["key"]),
+                    "worker": record.get("worker"),
+                    "thread": record.get("thread"),
+                    "status": record.get("status"),
+                    "nbytes": record.get("nbytes"),
+                    "action": startstop["action"],
+                    "start": startstop["start"],
+                    "stop": startstop["stop"],
+                    "source": startstop.get("source"),
+                })
+
+
+def save_dependencies(filename: str, collections: list, records: list):
+    """
+    Writes the dependencies of the tasks of the task stream as a CSV file, one row per
+    (key, dependency), the keys being formatted as in save_task_stream. The graph of each
+    collection is culled to the tasks it computes before being materialized, e.g. the tasks of a
+    single timestep in streaming mode, instead of the whole global_t graph it refers to.
+
+    Arguments:
+        filename (str): Path of the CSV file.
+        collections (list): Dask collections whose graphs were computed or persisted.
+        records (list): Task stream records of the computations, see save_task_stream.
+    """
+    keys = {str(record["key"]) for record in records}
+    seen = set()
+    with open(filename, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(DEPENDENCY_FIELDS)
+        for collection in collections:
+            graph = collection.__dask_graph__()
+            if hasattr(graph, "cull"):
+                graph = graph.cull(set(flatten(collection.__dask_keys__())))
+            graph = dict(graph)
+            for key in graph:
+                if key in seen or str(key) not in keys:
+                    continue
+                seen.add(key)
+                for dependency in get_dependencies(graph, key):
+                    writer.writerow([str(key), str(dependency)])
@@ -0,0 +1,29 @@
+def output_task_times(records, outputs):
+    """
+    Compute time of each output of a single compute call, from the task stream of that call.
+    Every task is attributed to the first output, in the given order, whose graph contains it,
+    so a task shared by several outputs (e.g. ekin for the sum and the fft) is only counted once.
+    The time of an output is the sum of the compute time of its tasks, without the transfers of
+    their inputs. The tasks of the outputs run concurrently, so these are not wall times: they
+    add up to the compute time of the whole call, summed over the worker threads.
+
+    Returns a dict output name -> time in seconds (0.0 if none of its tasks ran).
+
+    Arguments:
+        records (list): Task stream records, as returned by distributed.get_task_stream.
+        outputs (dict): Output name -> dask collection, in computation order.
+    """
+    owner = {}
+    for name, collection in outputs.items():
+        for key in collection.__dask_graph__():
+            owner.setdefault(str(key), name)
+
+    times = dict.fromkeys(outputs, 0.0)
+    for record in records:
+        name = owner.get(str(record["key"]))
+        if name is None:
+            continue
+        for startstop in record["startstops"]:
+            if startstop["action"] == "compute":
+                times[name] += startstop["stop"] - startstop["start"]
+    return times
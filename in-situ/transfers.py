@@ -0,0 +1,69 @@
+import csv
+
+from dask.utils import key_split
+
+TRANSFER_FIELDS = ["transfer", "direction", "worker", "peer", "start", "stop", "duration", "total", "bandwidth",
+                   "prefix", "step", "nbytes"]
+
+
+def _step(key):
+    """
+    Chunk index along the first axis of an array key, the timestep for the arrays chunked by
+    timestep. None for the other keys.
+    """
+    if isinstance(key, tuple) and len(key) > 1 and isinstance(key[1], int):
+        return key[1]
+    return None
+
+
+def transfer_rows(logs: dict, direction: str, first_id: int = 0) -> list:
+    """
+    Flat rows of the transfer logs of the workers, one per transfer, task prefix and step, with the
+    bytes of the keys of that prefix and step in nbytes. The fields of the transfer (worker, peer,
+    start, stop, duration, total, bandwidth) are repeated on each of its rows.
+
+    Arguments:
+        logs (dict): Worker address -> transfer_incoming_log or transfer_outgoing_log of the worker,
+            as returned by client.run.
+        direction (str): incoming or outgoing.
+        first_id (int): Id of the first transfer, the transfers are numbered in the rows.
+    """
+    rows = []
+    transfer = first_id
+    for worker, log in logs.items():
+        for entry in log:
+            nbytes = {}
+            for key, size in entry["keys"].items():
+                group = (key_split(key), _step(key))
+                nbytes[group] = nbytes.get(group, 0) + (size or 0)
+            for (prefix, step), size in nbytes.items():
+                rows.append({
+                    "transfer": transfer,
+                    "direction": direction,
+                    "worker": worker,
+                    "peer": entry["who"],
+                    "start": entry["start"],
+                    "stop": entry["stop"],
+                    "duration": entry["duration"],
+                    "total": entry["total"],
+                    "bandwidth": entry["bandwidth"],
+                    "prefix": prefix,
+                    "step": step,
+                    "nbytes": size,
+                })
+            transfer += 1
+    return rows
+
+
+def save_transfers(filename: str, incoming: dict, outgoing: dict):
+    """
+    Writes the incoming and outgoing transfer logs of the workers as a CSV file of transfer_rows.
+    Every transfer is in both logs, received by worker from peer in the incoming rows and sent by
+    worker to peer in the outgoing rows.
+    """
+    rows = transfer_rows(incoming, "incoming")
+    rows += transfer_rows(outgoing, "outgoing", first_id=rows[-1]["transfer"] + 1 if rows else 0)
+    with open(filename, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=TRANSFER_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)